@@ -1,6 +1,6 @@
 {
     "name": "Logistics Management System",
-    "version": "1.0.0",
+    "version": "1.1.0",
     "summary": "Logistics Management System",
     "description": "Minimal Logistics Management System module: Lead, Warehouse, Inventory, Dispatch, Fleet, Tracking, Finance overview.",
     "author": "Dev",
@@ -8,6 +8,7 @@
     "depends": [
         "crm",
         "base",
+        "bus",
         "mail",
         "stock",
         "account",
@@ -24,20 +25,43 @@
         'data/sequence_proof_delivery.xml',
         'data/sequence_eway_bill.xml',
         'data/sequence_contract.xml',
+        'data/ir_cron_data.xml',
+        'data/lms_alert_data.xml',
+        'wizard/lms_import_views.xml',
         'views/contract_management_views.xml',
         'views/eway_bill_view.xml',
         "views/trip_sheet_views.xml",
         'views/route_dispatch_views.xml',
         'views/lorry_receipt_views.xml',
-        'views/proof_delivery_views.xml'
+        'views/proof_delivery_views.xml',
+        'views/fleet_vehicle_views.xml',
+        'views/lms_location_views.xml',
+        'views/lms_utilization_views.xml',
+        'views/lms_operations_views.xml',
+        'views/lms_alert_views.xml',
+        'views/lms_job_views.xml',
+        'wizard/load_planner_views.xml',
 
     ],
     'assets': {
+        # only the loader ships with every backend page, the dashboard and
+        # its section views are fetched when opened. Page startup in the
+        # browser is followed by the client.backend_startup timing of
+        # /lms/metrics, compare it before and after changing these lists.
         'web.assets_backend': [
+            'lms/static/src/js/dashboard_loader.js',
+        ],
+        'lms.assets_dashboard': [
+            'lms/static/src/js/section_actions.js',
             'lms/static/src/js/dashboard.js',
             'lms/static/src/xml/dashboard.xml',
             'lms/static/src/css/dashboard.css',
         ],
+        'lms.assets_dashboard_section': [
+            'lms/static/src/js/section_view.js',
+            'lms/static/src/xml/section_view.xml',
+            'lms/static/src/css/section_view.css',
+        ],
     },
     'web_icon': 'lms,static/description/icon.png',
     "installable": True,
@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+import hmac
+import math
+
+from werkzeug.exceptions import NotFound
+
+from odoo import http
+from odoo.http import request
+
+from ..models.lms_dashboard import STAT_SECTIONS
+from ..tools.instrumentation import asset_prometheus, prometheus, record
+
+# Timings the dashboard measures in the browser; others are dropped so
+# clients cannot grow the sample windows of the workers
+CLIENT_TIMINGS = frozenset(STAT_SECTIONS) | {'stats', 'dashboard_bundle', 'section_open', 'backend_startup'}
+
+
+class LMSMetricsController(http.Controller):
+
+    @http.route('/lms/metrics', type='http', auth='public', methods=['GET'], readonly=True)
+    def metrics(self, token=None, **kw):
+        """Rolling percentiles of the dashboard sections and asset sizes, for Prometheus.
+
+        Scrapers authenticate with ``lms.metrics_token``, as a bearer token
+        or a ``token`` parameter; logged in administrators need none. The
+        figures are those of the worker answering the request.
+        """
+        expected = request.env['ir.config_parameter'].sudo().get_param('lms.metrics_token')
+        authorization = request.httprequest.headers.get('Authorization', '')
+        if authorization.startswith('Bearer '):
+            token = authorization[len('Bearer '):]
+        allowed = bool(expected and token and hmac.compare_digest(expected, token))
+        if not allowed and not request.env.user.has_group('base.group_system'):
+            raise NotFound()
+        return request.make_response(prometheus(request.env.cr.dbname) + asset_prometheus('lms'), headers=[
+            ('Content-Type', 'text/plain; version=0.0.4; charset=utf-8'),
+            ('Cache-Control', 'no-store'),
+        ])
+
+    @http.route('/lms/metrics/client', type='json', auth='user')
+    def client_timings(self, timings=None):
+        """Record the timings measured by the dashboard in the browser: {section: milliseconds}"""
+        if not isinstance(timings, dict):
+            return False
+        for section, wall_ms in timings.items():
+            if section not in CLIENT_TIMINGS or not isinstance(wall_ms, (int, float)) or isinstance(wall_ms, bool):
+                continue
+            if not math.isfinite(wall_ms) or wall_ms < 0:
+                continue
+            record(request.env.cr.dbname, 'client.%s' % section, {
+                'section': 'client.%s' % section,
+                'wall_ms': round(wall_ms, 2),
+                'queries': None,
+                'sql_ms': None,
+            })
+        return True
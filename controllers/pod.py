@@ -0,0 +1,45 @@
+# -*- coding: utf-8 -*-
+from werkzeug.exceptions import NotFound
+
+from odoo import http
+from odoo.http import request
+
+from ..models.proof_delivery import POD_BINARY_FIELDS
+
+
+class ProofOfDeliveryController(http.Controller):
+
+    def _get_pod(self, pod_id, field_name):
+        if field_name not in POD_BINARY_FIELDS:
+            raise NotFound()
+        pod = request.env['proof.delivery'].browse(pod_id).exists()
+        if not pod:
+            raise NotFound()
+        pod.check_access('read')
+        return pod
+
+    @http.route('/lms/pod/<int:pod_id>/<string:field_name>', type='http', auth='user', methods=['GET', 'HEAD'])
+    def pod_content(self, pod_id, field_name, download=False, **kw):
+        """Stream a POD file straight from the filestore.
+
+        Responses carry an ETag and Last-Modified and honour Range,
+        If-None-Match and If-Modified-Since, so large scans resume and
+        revalidate without being read into memory.
+        """
+        pod = self._get_pod(pod_id, field_name)
+        filename = pod.pod_filename if field_name == 'pod_document' else None
+        stream = request.env['ir.binary']._get_stream_from(
+            pod, field_name, filename=filename or '%s-%s' % (pod.name, field_name),
+        )
+        return stream.get_response(as_attachment=bool(download))
+
+    @http.route('/lms/pod/<int:pod_id>/<string:field_name>/thumbnail', type='http', auth='user', methods=['GET', 'HEAD'])
+    def pod_thumbnail(self, pod_id, field_name, unique=None, **kw):
+        pod = self._get_pod(pod_id, field_name)
+        thumbnail = pod._get_thumbnail_attachment(field_name)
+        if thumbnail:
+            stream = request.env['ir.binary']._get_stream_from(thumbnail, 'raw')
+        else:
+            stream = request.env['ir.binary']._get_placeholder_stream()
+        # the url changes with every upload, so it may be cached for good
+        return stream.get_response(immutable=bool(unique))
@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+import logging
+
+from odoo import api, SUPERUSER_ID
+from odoo.tools.sql import column_exists
+
+_logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 500
+
+
+def migrate(cr, version):
+    """Move POD files stored in proof_delivery columns into the filestore.
+
+    Databases created before the fields were declared ``attachment=True``
+    may still hold the files inline; they are copied to attachments in
+    batches and the columns are dropped.
+    """
+    env = api.Environment(cr, SUPERUSER_ID, {})
+    Attachment = env['ir.attachment']
+    for field_name in ('pod_document', 'signature'):
+        if not column_exists(cr, 'proof_delivery', field_name):
+            continue
+        cr.execute(f"SELECT id FROM proof_delivery WHERE {field_name} IS NOT NULL ORDER BY id")
+        pod_ids = [row[0] for row in cr.fetchall()]
+        _logger.info("Moving %s %s files of proof.delivery to the filestore", len(pod_ids), field_name)
+        for start in range(0, len(pod_ids), BATCH_SIZE):
+            batch = pod_ids[start:start + BATCH_SIZE]
+            cr.execute(
+                f"SELECT id, {field_name} FROM proof_delivery WHERE id = ANY(%s)", [batch],
+            )
+            # inline binaries are stored base64 encoded
+            Attachment.create([{
+                'name': field_name,
+                'res_model': 'proof.delivery',
+                'res_field': field_name,
+                'res_id': pod_id,
+                'type': 'binary',
+                'datas': bytes(value),
+            } for pod_id, value in cr.fetchall()])
+            Attachment.invalidate_model()
+        cr.execute(f"ALTER TABLE proof_delivery DROP COLUMN {field_name}")
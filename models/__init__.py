@@ -2,10 +2,23 @@
 
 from . import models
 from . import lms_module
+from . import lms_expiry
+from . import lms_state_machine
+from . import lms_numbering
+from . import lms_job
+from . import lms_live
+from . import lms_location
+from . import lms_utilization
+from . import lms_operations
+from . import lms_alert
+from . import lms_finance
+from . import lms_dashboard_snapshot
 from . import lms_dashboard
 from . import trip_sheet
 from . import route_dispatch
 from . import lorry_receipt
 from . import proof_delivery
 from . import eway_bill
-from . import contract_management
\ No newline at end of file
+from . import contract_management
+from . import res_users
+from . import ir_http
@@ -1,14 +1,22 @@
 # models/contract_management.py
-from odoo import models, fields, api
-from datetime import date
+from odoo import models, fields, api, tools, _
 
 class LogisticsContract(models.Model):
     _name = "logistics.contract"
     _description = "Logistics Contract"
-    _inherit = ['mail.thread', 'mail.activity.mixin']
+    _inherit = ['mail.thread', 'mail.activity.mixin', 'lms.expiry.mixin', 'lms.state.machine.mixin', 'lms.numbering.mixin']
+    _lms_sequence_codes = ('logistics.contract',)
+    _lms_expiry_field = 'end_date'
+    _lms_expiry_message = "⚠️ %(count)s contracts expired automatically: %(names)s."
+    _lms_transitions = {
+        'activate': {'from': ('draft',), 'to': 'active',
+                     'error': "Only draft contracts can be activated."},
+        'terminate': {'from': ('draft', 'active'), 'to': 'terminated',
+                      'error': "Only draft or active contracts can be terminated."},
+    }
 
     name = fields.Char(string="Contract No.", required=True, copy=False, readonly=True,
-                       default=lambda self: self.env['ir.sequence'].next_by_code('logistics.contract'))
+                       default=lambda self: _('New'))
     partner_id = fields.Many2one('res.partner', string="Party", required=True)
     contract_type = fields.Selection([
         ('customer', 'Customer Contract'),
@@ -18,7 +26,7 @@ class LogisticsContract(models.Model):
         ('fuel', 'Fuel Supply'),
     ], string="Type", required=True)
     start_date = fields.Date(string="Start Date", required=True)
-    end_date = fields.Date(string="End Date", required=True)
+    end_date = fields.Date(string="End Date", required=True, index=True)
     amount = fields.Float(string="Contract Value")
     status = fields.Selection([
         ('draft', 'Draft'),
@@ -33,14 +41,19 @@ class LogisticsContract(models.Model):
 
     is_expired = fields.Boolean(string="Expired", compute="_compute_is_expired", store=True)
 
-    @api.depends('end_date')
+    def init(self):
+        super().init()
+        tools.create_index(self.env.cr, 'logistics_contract_lms_active_end_idx', self._table,
+                           ['end_date'], where="status = 'active'")
+
+    @api.depends('end_date', 'status')
     def _compute_is_expired(self):
-        today = date.today()
+        today = fields.Date.today()
         for record in self:
-            record.is_expired = record.end_date and record.end_date < today
+            record.is_expired = record.status == 'expired' or bool(record.end_date and record.end_date < today)
 
     def action_activate(self):
-        self.write({'status': 'active'})
+        return self._lms_run_transition('activate')
 
     def action_terminate(self):
-        self.write({'status': 'terminated'})
+        return self._lms_run_transition('terminate')
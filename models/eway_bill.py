@@ -1,30 +1,77 @@
 # -*- coding: utf-8 -*-
-from odoo import models, fields, api
-from datetime import datetime
+import logging
+import threading
+import time
+from datetime import timedelta
+
+from odoo import models, fields, api, tools, _
+from odoo.exceptions import ValidationError
+
+from ..tools.eway_portal import PORTAL_CLIENTS, UNREGISTERED, PortalError, submit_batch, validate_batch
+
+_logger = logging.getLogger(__name__)
+
+# Defaults of the lms.eway_portal* parameters
+PORTAL_DEFAULTS = {
+    'lms.eway_portal': 'mock',
+    'lms.eway_portal_concurrency': 8,
+    'lms.eway_portal_rate': 10,
+    'lms.eway_portal_retries': 3,
+    'lms.eway_portal_backoff': 0.5,
+    'lms.eway_batch_size': 500,
+}
+# Cron runs giving a queued bill a transient error before it is marked failed
+MAX_PORTAL_ATTEMPTS = 5
+# Seconds a generation run works before handing over to a new cron run
+GENERATION_TIME_BUDGET = 240
+# Delay before a new run retries the bills deferred by a transient error
+GENERATION_RETRY_DELAY = timedelta(minutes=1)
 
 class EWayBill(models.Model):
     _name = "eway.bill"
     _description = "E-Way Bill"
-    _inherit = ['mail.thread', 'mail.activity.mixin']
+    _inherit = ['mail.thread', 'mail.activity.mixin', 'lms.expiry.mixin', 'lms.state.machine.mixin', 'lms.numbering.mixin']
+    _lms_sequence_codes = ('eway.bill',)
     _order = 'id desc'
+    _lms_expiry_field = 'valid_upto'
+    _lms_expiry_message = "⚠️ %(count)s E-Way Bills expired automatically: %(names)s."
+    _lms_transitions = {
+        'activate': {'from': ('draft',), 'to': 'active',
+                     'message': "✅ E-Way Bill activated.",
+                     'error': "Only draft E-Way Bills can be activated."},
+        'expire': {'from': ('active',), 'to': 'expired',
+                   'message': "⚠️ E-Way Bill marked as expired.",
+                   'error': "Only active E-Way Bills can be expired."},
+        'cancel': {'from': ('draft', 'active'), 'to': 'cancelled',
+                   'message': "🚫 E-Way Bill cancelled.",
+                   'error': "Only draft or active E-Way Bills can be cancelled."},
+    }
 
     name = fields.Char(
         string="Reference",
         required=True,
         copy=False,
         readonly=True,
-        default=lambda self: self.env['ir.sequence'].next_by_code('eway.bill')
+        default=lambda self: _('New')
     )
     dispatch_id = fields.Many2one(
         'route.dispatch',
         string="Route Dispatch",
         ondelete="cascade",
+        index='btree_not_null',
         tracking=True
     )
+    lr_id = fields.Many2one(
+        'lorry.receipt',
+        string="Lorry Receipt",
+        ondelete="set null",
+        index='btree_not_null',
+    )
     ewaybill_no = fields.Char(
         string="E-Way Bill Number",
-        required=True,
-        tracking=True
+        copy=False,
+        tracking=True,
+        help="Typed in, or filled by the portal for generated bills",
     )
     generated_date = fields.Datetime(
         string="Generated Date",
@@ -33,12 +80,13 @@ class EWayBill(models.Model):
     )
     valid_upto = fields.Datetime(
         string="Valid Upto",
+        index=True,
         tracking=True
     )
     vehicle_no = fields.Char(string="Vehicle No")
     transporter_name = fields.Char(string="Transporter Name")
     transporter_gstin = fields.Char(string="Transporter GSTIN")
-    total_distance = fields.Float(string="Distance (KM)")
+    total_distance = fields.Float(string="Distance (KM)", compute="_compute_total_distance", store=True, readonly=False)
     status = fields.Selection([
         ('draft', 'Draft'),
         ('active', 'Active'),
@@ -48,6 +96,15 @@ class EWayBill(models.Model):
 
     remarks = fields.Text(string="Remarks")
 
+    # Portal generation
+    portal_state = fields.Selection([
+        ('queued', 'Queued'),
+        ('generated', 'Generated'),
+        ('failed', 'Failed'),
+    ], string="Portal Status", copy=False, readonly=True, tracking=True)
+    portal_error = fields.Text(string="Portal Error", copy=False, readonly=True)
+    portal_attempts = fields.Integer(string="Portal Attempts", copy=False, readonly=True)
+
     # Computed field for expiry
     is_expired = fields.Boolean(
         string="Is Expired",
@@ -55,35 +112,199 @@ class EWayBill(models.Model):
         store=True
     )
 
-    @api.depends('valid_upto')
+    def init(self):
+        super().init()
+        # active bills by validity, the expiry cron and the alerts scan them
+        tools.create_index(self.env.cr, 'eway_bill_lms_active_validity_idx', self._table,
+                           ['valid_upto'], where="status = 'active'")
+        # the activity stream pages through the latest changes
+        tools.create_index(self.env.cr, 'eway_bill_lms_write_date_idx', self._table, ['write_date', 'id'])
+        # the generation cron picks the queued bills in order
+        tools.create_index(self.env.cr, 'eway_bill_lms_queued_idx', self._table, ['id'],
+                           where="portal_state = 'queued'")
+
+    @api.constrains('status', 'ewaybill_no')
+    def _check_ewaybill_no(self):
+        for record in self:
+            if record.status == 'active' and not record.ewaybill_no:
+                raise ValidationError(_("E-Way Bill %s needs its number to be active.", record.name))
+
+    @api.depends('valid_upto', 'status')
     def _compute_is_expired(self):
+        now = fields.Datetime.now()
         for record in self:
-            record.is_expired = bool(record.valid_upto and record.valid_upto < datetime.now())
+            record.is_expired = record.status == 'expired' or bool(record.valid_upto and record.valid_upto < now)
+
+    @api.depends('dispatch_id.distance_km')
+    def _compute_total_distance(self):
+        for record in self:
+            record.total_distance = record.dispatch_id.distance_km or record.total_distance
 
 
     # -----------------------------
     # STATUS UPDATE BUTTON ACTIONS
     # -----------------------------
     def action_activate(self):
-        for record in self:
-            if record.status == 'draft':
-                record.status = 'active'
-                record.message_post(body="✅ E-Way Bill activated.")
-            else:
-                raise ValueError("Only draft E-Way Bills can be activated.")
+        return self._lms_run_transition('activate')
 
     def action_expire(self):
-        for record in self:
-            if record.status in ['active']:
-                record.status = 'expired'
-                record.message_post(body="⚠️ E-Way Bill marked as expired.")
-            else:
-                raise ValueError("Only active E-Way Bills can be expired.")
+        return self._lms_run_transition('expire')
 
     def action_cancel(self):
-        for record in self:
-            if record.status in ['draft', 'active']:
-                record.status = 'cancelled'
-                record.message_post(body="🚫 E-Way Bill cancelled.")
+        return self._lms_run_transition('cancel')
+
+    # -----------------------------
+    # PORTAL GENERATION
+    # -----------------------------
+    @api.model
+    def _queue_generation(self, lrs):
+        """Queue the generation of a bill for each LR of ``lrs`` without an open one.
+
+        :return: the queued bills
+        """
+        lrs = lrs.filtered(lambda lr: lr.status != 'cancelled')
+        covered = self.search([('lr_id', 'in', lrs.ids), ('status', 'in', ('draft', 'active'))]).lr_id
+        company = self.env.company
+        bills = self.create([{
+            'lr_id': lr.id,
+            'dispatch_id': lr.dispatch_id.id,
+            'vehicle_no': (lr.dispatch_id.vehicle_id or lr.vehicle_id).license_plate,
+            'transporter_name': company.name,
+            'transporter_gstin': company.vat,
+            'total_distance': lr.dispatch_id.distance_km,
+            'portal_state': 'queued',
+        } for lr in lrs - covered])
+        if bills:
+            self.env.ref('lms.ir_cron_lms_generate_eway_bills')._trigger()
+        return bills
+
+    def action_retry_generation(self):
+        """Queue the failed bills again"""
+        failed = self.filtered(lambda bill: bill.portal_state == 'failed' and bill.status == 'draft')
+        failed.write({'portal_state': 'queued', 'portal_error': False, 'portal_attempts': 0})
+        if failed:
+            self.env.ref('lms.ir_cron_lms_generate_eway_bills')._trigger()
+        return True
+
+    @api.model
+    def _get_portal_settings(self):
+        """The lms.eway_portal* parameters, keyed without their prefix"""
+        params = self.env['ir.config_parameter'].sudo()
+        settings = {key[len('lms.eway_'):]: value for key, value in PORTAL_DEFAULTS.items()}
+        for param in params.search([('key', '=like', 'lms.eway\\_%')]):
+            settings[param.key[len('lms.eway_'):]] = param.value
+        return settings
+
+    def _portal_key(self):
+        """Idempotency key of the bill, stable across retries and cron runs"""
+        uuid = self.env['ir.config_parameter'].sudo().get_param('database.uuid')
+        return '%s:eway.bill:%s' % (uuid, self.id)
+
+    def _portal_request(self):
+        lr = self.lr_id
+        return {
+            'key': self._portal_key(),
+            'doc_no': lr.name or self.name,
+            'doc_date': fields.Datetime.to_string(lr.date),
+            'consignor': lr.consignor,
+            'consignee': lr.consignee,
+            'consignor_gstin': lr.consignor_gstin or UNREGISTERED,
+            'consignee_gstin': lr.consignee_gstin or UNREGISTERED,
+            'from_place': lr.source_location,
+            'to_place': lr.destination_location,
+            'distance_km': self.total_distance,
+            'weight_kg': lr.total_weight,
+            'vehicle_no': self.vehicle_no,
+            'transporter_gstin': self.transporter_gstin,
+        }
+
+    @api.model
+    def _cron_generate(self):
+        """Generate the queued bills, a batch at a time with a commit per batch.
+
+        Batches are claimed with SKIP LOCKED so concurrent runs share the
+        queue; a run past its time budget hands the rest to a new run, and a
+        run leaving bills queued after a transient error schedules a retry.
+        """
+        settings = self._get_portal_settings()
+        client = PORTAL_CLIENTS[settings['portal']](settings)
+        batch_size = int(settings['batch_size'])
+        auto_commit = not getattr(threading.current_thread(), 'testing', False)
+        started = time.monotonic()
+        # bills deferred by a transient error stay queued for the next run
+        last_id = 0
+        deferred = False
+        while True:
+            self.env.cr.execute("""
+                SELECT id FROM eway_bill
+                 WHERE portal_state = 'queued' AND id > %s
+              ORDER BY id
+                 LIMIT %s
+                   FOR UPDATE SKIP LOCKED
+            """, [last_id, batch_size])
+            bills = self.browse(row[0] for row in self.env.cr.fetchall())
+            if not bills:
+                break
+            last_id = max(bills.ids)
+            deferred = bool(bills._generate(client, settings)) or deferred
+            if auto_commit:
+                self.env.cr.commit()
+            self.env.invalidate_all()
+            if time.monotonic() - started > GENERATION_TIME_BUDGET:
+                self.env.ref('lms.ir_cron_lms_generate_eway_bills')._trigger()
+                return
+        if deferred:
+            self.env.ref('lms.ir_cron_lms_generate_eway_bills')._trigger(
+                fields.Datetime.now() + GENERATION_RETRY_DELAY
+            )
+
+    def _generate(self, client, settings):
+        """Validate the bills locally, submit the valid ones and record the answers.
+
+        Returns the bills left queued by a transient error.
+        """
+        requests = {bill.id: bill._portal_request() for bill in self}
+        errors = validate_batch(list(requests.values()))
+        invalid = self.filtered(lambda bill: requests[bill.id]['key'] in errors)
+        for bill in invalid:
+            bill.write({
+                'portal_state': 'failed',
+                'portal_error': "\n".join(errors[requests[bill.id]['key']]),
+            })
+
+        valid = self - invalid
+        results = submit_batch(
+            client, [requests[bill.id] for bill in valid],
+            concurrency=int(settings['portal_concurrency']),
+            rate=float(settings['portal_rate']),
+            max_retries=int(settings['portal_retries']),
+            backoff=float(settings['portal_backoff']),
+        ) if valid else {}
+        generated = deferred = self.browse()
+        for bill in valid:
+            result = results[requests[bill.id]['key']]
+            attempts = bill.portal_attempts + 1
+            if not isinstance(result, PortalError):
+                bill.write({
+                    'ewaybill_no': result['ewaybill_no'],
+                    'generated_date': result['generated_at'],
+                    'valid_upto': result['valid_upto'],
+                    'portal_state': 'generated',
+                    'portal_error': False,
+                    'portal_attempts': attempts,
+                })
+                generated |= bill
             else:
-                raise ValueError("Only draft or active E-Way Bills can be cancelled.")
+                # transient errors stay queued for a later run
+                retry = result.retryable and attempts < MAX_PORTAL_ATTEMPTS
+                bill.write({
+                    'portal_state': 'queued' if retry else 'failed',
+                    'portal_error': str(result),
+                    'portal_attempts': attempts,
+                })
+                if retry:
+                    deferred |= bill
+        generated._lms_apply_transition('activate')
+        _logger.info("E-way bills: %s generated, %s rejected locally, %s refused or deferred by the portal",
+                     len(generated), len(invalid), len(valid) - len(generated))
+        return deferred
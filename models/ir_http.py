@@ -0,0 +1,19 @@
+# -*- coding: utf-8 -*-
+from odoo import models
+
+from .res_users import LMS_ROLE_MENUS, LMS_ROLE_SECTIONS
+
+
+class IrHttp(models.AbstractModel):
+    _inherit = 'ir.http'
+
+    def session_info(self):
+        """Ship the LMS role with the session so the dashboard needs no lookup"""
+        result = super().session_info()
+        user = self.env.user
+        if user._is_internal():
+            role = user._get_lms_role()
+            result['lms_role'] = role
+            result['lms_sections'] = LMS_ROLE_SECTIONS[role]
+            result['lms_menus'] = LMS_ROLE_MENUS[role]
+        return result
@@ -0,0 +1,271 @@
+# -*- coding: utf-8 -*-
+from datetime import timedelta
+
+from odoo import models, fields, api, tools
+
+# How each kind of rule is shown on the dashboard
+ALERT_TYPES = {
+    'maintenance': {'icon': '⚠️', 'title': "%(count)s vehicles due for maintenance", 'time': "Action required"},
+    'delayed_pickings': {'icon': '🚨', 'title': "%(count)s delayed shipments", 'time': "Urgent attention needed"},
+    'unpaid_invoices': {'icon': '📋', 'title': "%(count)s pending invoices", 'time': "Review required"},
+    'low_stock': {'icon': '📉', 'title': "%(count)s products low in stock", 'time': "Reorder recommended"},
+    'expiring_ewaybills': {'icon': '📄', 'title': "%(count)s e-way bills expiring soon", 'time': "Extend or close"},
+    'expiring_contracts': {'icon': '📑', 'title': "%(count)s contracts expiring soon", 'time': "Renewal due"},
+    'overdue_pods': {'icon': '📬', 'title': "%(count)s PODs awaiting verification", 'time': "Follow up"},
+}
+SEVERITY_ORDER = {'danger': 0, 'warning': 1, 'info': 2}
+DEFAULT_SNOOZE_HOURS = 24
+
+
+class LMSAlertRule(models.Model):
+    """A condition checked by the alert cron, producing one alert per company"""
+    _name = 'lms.alert.rule'
+    _description = 'LMS Alert Rule'
+    _order = 'sequence, id'
+
+    name = fields.Char(string="Name", required=True, translate=True)
+    sequence = fields.Integer(default=10)
+    active = fields.Boolean(default=True)
+    rule_type = fields.Selection([
+        ('maintenance', 'Vehicles in Maintenance'),
+        ('delayed_pickings', 'Delayed Shipments'),
+        ('unpaid_invoices', 'Unpaid Customer Invoices'),
+        ('low_stock', 'Low Stock'),
+        ('expiring_ewaybills', 'Expiring E-Way Bills'),
+        ('expiring_contracts', 'Expiring Contracts'),
+        ('overdue_pods', 'Overdue PODs'),
+    ], string="Checks", required=True)
+    severity = fields.Selection([
+        ('info', 'Info'),
+        ('warning', 'Warning'),
+        ('danger', 'Danger'),
+    ], string="Severity", required=True, default='warning')
+    threshold_days = fields.Integer(
+        string="Days",
+        help="Expiring documents: days ahead. Overdue PODs and unpaid invoices: days past the "
+             "delivery or due date (0 counts every unpaid invoice).",
+    )
+    min_quantity = fields.Float(
+        string="Low Stock Quantity", default=10,
+        help="Stock below which a product is low, unless its own threshold is set",
+    )
+    interval_minutes = fields.Integer(string="Check Every (min)", default=15, required=True)
+    next_check = fields.Datetime(string="Next Check", copy=False)
+    last_check = fields.Datetime(string="Last Check", readonly=True, copy=False)
+    alert_ids = fields.One2many('lms.alert', 'rule_id', string="Alerts")
+
+    # === Evaluation ===
+    @api.model
+    def _cron_evaluate(self):
+        """Evaluate the rules that are due"""
+        now = fields.Datetime.now()
+        rules = self.search(['|', ('next_check', '=', False), ('next_check', '<=', now)])
+        for rule in rules:
+            rule._evaluate(now)
+
+    def _evaluate(self, now=None):
+        """Count the matching records of each company and sync the stored alerts"""
+        now = now or fields.Datetime.now()
+        for rule in self:
+            counts = getattr(rule, '_count_%s' % rule.rule_type)(now)
+            # alerts are only created by the rules, whoever checks them
+            rule.sudo().alert_ids.with_context(active_test=False)._sync(rule, counts)
+            rule.write({
+                'last_check': now,
+                'next_check': now + timedelta(minutes=max(1, rule.interval_minutes)),
+            })
+
+    def action_check_now(self):
+        self._evaluate()
+        return True
+
+    def _group_by_company(self, model_name, domain):
+        """{company id or False: record count} of ``domain``"""
+        Model = self.env[model_name].sudo().with_context(active_test=True)
+        if 'company_id' not in Model._fields:
+            return {False: Model.search_count(domain)}
+        return {company.id: count for company, count in Model._read_group(domain, ['company_id'], ['__count'])}
+
+    def _count_maintenance(self, now):
+        return self._group_by_company('fleet.vehicle', [('vehicle_status', '=', 'maintenance')])
+
+    def _count_delayed_pickings(self, now):
+        return self._group_by_company('stock.picking', [
+            ('state', 'in', ['assigned', 'confirmed']),
+            ('scheduled_date', '<', now),
+        ])
+
+    def _count_unpaid_invoices(self, now):
+        domain = [
+            ('move_type', '=', 'out_invoice'),
+            ('state', '=', 'posted'),
+            ('payment_state', '!=', 'paid'),
+        ]
+        if self.threshold_days:
+            domain.append(('invoice_date_due', '<', now.date() - timedelta(days=self.threshold_days)))
+        return self._group_by_company('account.move', domain)
+
+    def _count_expiring_ewaybills(self, now):
+        return self._group_by_company('eway.bill', [
+            ('status', '=', 'active'),
+            ('valid_upto', '>=', now),
+            ('valid_upto', '<', now + timedelta(days=self.threshold_days or 1)),
+        ])
+
+    def _count_expiring_contracts(self, now):
+        today = now.date()
+        return self._group_by_company('logistics.contract', [
+            ('status', '=', 'active'),
+            ('end_date', '>=', today),
+            ('end_date', '<=', today + timedelta(days=self.threshold_days or 30)),
+        ])
+
+    def _count_overdue_pods(self, now):
+        return self._group_by_company('proof.delivery', [
+            ('status', 'in', ['draft', 'delivered']),
+            ('delivery_date', '<', now - timedelta(days=self.threshold_days or 2)),
+        ])
+
+    def _count_low_stock(self, now):
+        """Products with some stock, below their own threshold or the rule's.
+
+        Stock comes from one grouped query over the quants of internal
+        locations instead of computing ``qty_available`` for the catalog.
+        """
+        groups = self.env['stock.quant'].sudo()._read_group(
+            [('location_id.usage', '=', 'internal')],
+            ['company_id', 'product_id'],
+            ['quantity:sum'],
+        )
+        counts = {}
+        for company, product, quantity in groups:
+            threshold = product.product_tmpl_id.lms_low_stock_threshold or self.min_quantity
+            if 0 < quantity < threshold and product.active:
+                counts[company.id] = counts.get(company.id, 0) + 1
+        return counts
+
+
+class LMSAlert(models.Model):
+    """Result of an alert rule for one company, read by the dashboard"""
+    _name = 'lms.alert'
+    _description = 'LMS Alert'
+    _inherit = ['lms.kpi.source.mixin']
+    _order = 'id desc'
+    _rec_name = 'title'
+    _lms_kpi_sections = ('alerts',)
+    _lms_kpi_fields = ('state', 'count', 'title', 'snoozed_until', 'severity', 'company_id')
+
+    rule_id = fields.Many2one('lms.alert.rule', string="Rule", required=True, ondelete='cascade', index=True)
+    rule_type = fields.Selection(related='rule_id.rule_type', store=True)
+    company_id = fields.Many2one('res.company', string="Company", index=True)
+    severity = fields.Selection(related='rule_id.severity', store=True)
+    count = fields.Integer(string="Count", readonly=True)
+    title = fields.Char(string="Alert", readonly=True)
+    state = fields.Selection([
+        ('active', 'Active'),
+        ('acknowledged', 'Acknowledged'),
+        ('snoozed', 'Snoozed'),
+        ('resolved', 'Resolved'),
+    ], string="Status", default='active', required=True, readonly=True)
+    snoozed_until = fields.Datetime(string="Snoozed Until", readonly=True)
+    acknowledged_count = fields.Integer(string="Acknowledged Count", readonly=True)
+    acknowledged_by = fields.Many2one('res.users', string="Acknowledged By", readonly=True)
+    acknowledged_date = fields.Datetime(string="Acknowledged On", readonly=True)
+
+    _sql_constraints = [
+        ('rule_company_uniq', 'unique(rule_id, company_id)', 'Only one alert per rule and company is allowed.'),
+    ]
+
+    def init(self):
+        super().init()
+        # the dashboard reads the alerts to show, and snoozed ones coming back
+        tools.create_index(self.env.cr, 'lms_alert_lms_open_idx', self._table,
+                           ['company_id', 'snoozed_until'], where="state IN ('active', 'snoozed')")
+
+    def _sync(self, rule, counts):
+        """Bring the alerts of ``rule`` (self) in line with ``counts`` ({company id: count})"""
+        now = fields.Datetime.now()
+        by_company = {alert.company_id.id: alert for alert in self}
+        to_create = []
+        for company_id, count in counts.items():
+            alert = by_company.pop(company_id or False, None)
+            title = ALERT_TYPES[rule.rule_type]['title'] % {'count': count}
+            if not count:
+                if alert and alert.state != 'resolved':
+                    alert.write({'state': 'resolved', 'count': 0, 'title': title})
+                continue
+            if not alert:
+                to_create.append({'rule_id': rule.id, 'company_id': company_id or False,
+                                  'count': count, 'title': title})
+                continue
+            vals = {}
+            if alert.count != count:
+                vals.update(count=count, title=title)
+            # a resolved alert firing again, an acknowledged one getting worse
+            # or a snoozed one waking up is back
+            if (alert.state == 'resolved'
+                    or (alert.state == 'acknowledged' and count > alert.acknowledged_count)
+                    or (alert.state == 'snoozed' and alert.snoozed_until and alert.snoozed_until <= now)):
+                vals.update(state='active', snoozed_until=False)
+            if vals:
+                alert.write(vals)
+        for alert in by_company.values():
+            if alert.state != 'resolved':
+                alert.write({'state': 'resolved', 'count': 0})
+        if to_create:
+            self.create(to_create)
+
+    @api.model
+    def _get_dashboard_alerts(self, company_ids):
+        """Alerts to show for ``company_ids``, most severe first, in the dashboard format"""
+        now = fields.Datetime.now()
+        alerts = self.sudo().search([
+            ('company_id', 'in', list(company_ids) + [False]),
+            '|', ('state', '=', 'active'), '&', ('state', '=', 'snoozed'), ('snoozed_until', '<=', now),
+        ])
+        alerts = alerts.sorted(lambda alert: (SEVERITY_ORDER.get(alert.severity, 3), -alert.count))
+        return [{
+            'id': 'alert_%s' % alert.id,
+            'alert_id': alert.id,
+            'type': alert.severity,
+            'icon': ALERT_TYPES[alert.rule_type]['icon'],
+            'title': alert.title,
+            'time': ALERT_TYPES[alert.rule_type]['time'],
+        } for alert in alerts]
+
+    # === Actions ===
+    def action_acknowledge(self):
+        """Hide the alerts until their count grows"""
+        for alert in self:
+            alert.write({
+                'state': 'acknowledged',
+                'acknowledged_count': alert.count,
+                'acknowledged_by': self.env.uid,
+                'acknowledged_date': fields.Datetime.now(),
+            })
+        return True
+
+    def action_snooze(self, hours=DEFAULT_SNOOZE_HOURS):
+        """Hide the alerts for ``hours``"""
+        self.filtered(lambda alert: alert.state != 'resolved').write({
+            'state': 'snoozed',
+            'snoozed_until': fields.Datetime.now() + timedelta(hours=float(hours)),
+        })
+        return True
+
+    def action_reopen(self):
+        self.filtered(lambda alert: alert.state in ('acknowledged', 'snoozed')).write({
+            'state': 'active',
+            'snoozed_until': False,
+        })
+        return True
+
+
+class ProductTemplate(models.Model):
+    _inherit = 'product.template'
+
+    lms_low_stock_threshold = fields.Float(
+        string="Low Stock Threshold",
+        help="Quantity on hand below which the LMS low stock alert counts this product; "
+             "0 uses the quantity of the alert rule.",
+    )
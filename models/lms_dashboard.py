@@ -1,103 +1,407 @@
 # -*- coding: utf-8 -*-
 
-from odoo import models, fields, api
-from datetime import datetime, timedelta
+import json
+import logging
+import pytz
+from collections import defaultdict
+from contextlib import contextmanager
+
+from odoo import models, fields, api, tools, _
+from odoo.exceptions import AccessError, UserError
+from odoo.http import request
+from odoo.tools import SQL
+from datetime import datetime, time, timedelta
 from dateutil.relativedelta import relativedelta
 
+from .lms_dashboard_snapshot import KPI_SECTIONS
+from ..tools.instrumentation import SectionProbe
+
+# Bucket sizes supported by get_shipment_trends
+TREND_GRANULARITIES = {
+    'day': relativedelta(days=1),
+    'week': relativedelta(weeks=1),
+    'month': relativedelta(months=1),
+}
+# Breakdowns supported by get_shipment_trends, mapped to the grouped field
+TREND_SPLITS = {
+    'picking_type': 'picking_type_id',
+    'state': 'state',
+}
+MAX_TREND_PERIODS = 400
+# Days of the utilization shown with the fleet status, today included
+FLEET_UTILIZATION_DAYS = 7
+MAX_UTILIZATION_DAYS = 366
+DEFAULT_SLOW_SECTION_MS = 500
+# Cards of the OWL dashboard served by get_section_stats, with the role section granting them
+STAT_SECTIONS = {
+    'leads': 'lead',
+    'warehouse': 'warehouse',
+    'dispatch': 'trip_sheet',
+    'fleet': 'fleet_overview',
+    'finance': 'finance_overview',
+}
+# Window actions shown inside the dashboard per role section, with the view
+# opened first (None keeps the action's own order)
+SECTION_ACTIONS = {
+    'lead': ('crm.crm_lead_action_pipeline', None),
+    'warehouse': ('stock.action_warehouse_form', None),
+    'trip_sheet': ('lms.action_trip_sheet', None),
+    'route_dispatch': ('lms.action_route_dispatch', None),
+    'lr': ('lms.action_lorry_receipt', None),
+    'pod': ('lms.action_proof_delivery', None),
+    'ewaybill': ('lms.action_eway_bill', None),
+    'fleet_overview': ('fleet.fleet_vehicle_action', None),
+    'vehicle_costs': ('fleet.fleet_costs_reporting_action', None),
+    'odoometer': ('fleet.fleet_vehicle_odometer_action', None),
+    'route_optimization': ('lms.action_route_optimization', None),
+    'rfq': ('purchase.purchase_rfq', None),
+    'finance_overview': ('account.open_account_journal_dashboard_kanban', None),
+    'customer_invoices': ('account.action_move_out_invoice_type', None),
+    'customer_credit_notes': ('account.action_move_out_refund_type', None),
+    'customer_payments': ('account.action_account_payments', None),
+    'accounting_journals': ('account.action_account_journal_form', None),
+    'accounting_journals_entries': ('account.action_move_journal_line', None),
+    'vendor_payments': ('account.action_move_in_invoice_type', None),
+    'sales': ('sale.report_all_channels_sales_action', 'graph'),
+    'sales_persons': ('sale.action_order_report_salesperson', 'graph'),
+    'sales_products': ('sale.action_order_report_products', 'graph'),
+    'overview': ('stock.stock_picking_type_action', None),
+    'warehouse_analysis': ('stock_enterprise.stock_report_action_performance', 'graph'),
+    'contract': ('lms.action_logistics_contract', None),
+    'packages': ('stock.action_package_view', 'kanban'),
+    'package_types': ('stock.action_package_type_view', None),
+    'packaging': ('product.action_packaging_view', 'list'),
+}
+
+# Sources of the activity stream by event kind: the model, the role section
+# granting it, the status shown, and the paths used by the vehicle and
+# driver filters (drivers are contacts; employees go through their work contact)
+ACTIVITY_SOURCES = {
+    'picking': {'model': 'stock.picking', 'section': 'warehouse', 'status': 'state', 'icon': '📦',
+                'label': "Shipment", 'company': 'own'},
+    'invoice': {'model': 'account.move', 'section': 'finance_overview', 'status': 'payment_state', 'icon': '💰',
+                'label': "Invoice", 'company': 'own',
+                'domain': [('move_type', '=', 'out_invoice'), ('payment_state', '=', 'paid')]},
+    'vehicle': {'model': 'fleet.vehicle', 'section': 'fleet_overview', 'status': 'vehicle_status', 'icon': '🔧',
+                'label': "Vehicle", 'company': 'shared', 'vehicle': 'id',
+                'domain': [('vehicle_status', '=', 'maintenance')]},
+    'trip': {'model': 'trip.sheet', 'section': 'trip_sheet', 'status': 'status', 'icon': '🚛',
+             'label': "Trip Sheet", 'vehicle': 'vehicle_id', 'driver': 'driver_id'},
+    'dispatch': {'model': 'route.dispatch', 'section': 'route_dispatch', 'status': 'status', 'icon': '🚚',
+                 'label': "Dispatch", 'vehicle': 'vehicle_id', 'driver': 'driver_id.work_contact_id'},
+    'lr': {'model': 'lorry.receipt', 'section': 'lr', 'status': 'status', 'icon': '🧾',
+           'label': "Lorry Receipt", 'vehicle': 'vehicle_id', 'driver': 'driver_id.work_contact_id'},
+    'pod': {'model': 'proof.delivery', 'section': 'pod', 'status': 'status', 'icon': '✅',
+            'label': "POD", 'vehicle': 'dispatch_id.vehicle_id', 'driver': 'dispatch_id.driver_id.work_contact_id'},
+    'ewaybill': {'model': 'eway.bill', 'section': 'ewaybill', 'status': 'status', 'icon': '📄',
+                 'label': "E-Way Bill", 'vehicle': 'dispatch_id.vehicle_id',
+                 'driver': 'dispatch_id.driver_id.work_contact_id'},
+}
+MAX_ACTIVITY_PAGE = 100
+
+_logger = logging.getLogger(__name__)
+
 
 class LMSDashboard(models.Model):
     _name = 'lms.dashboard'
     _description = 'Logistics Management Dashboard'
 
     @api.model
-    def get_dashboard_data(self):
+    def get_dashboard_data(self, force_refresh=False):
         """
-        Fetch all dashboard data in a single RPC call for better performance
+        Fetch all dashboard data in a single RPC call.
+
+        KPIs are served from the per-company snapshot maintained by
+        lms.dashboard.snapshot; pass force_refresh=True to compute live numbers.
+        The recent activities and shipment trends are read for the current
+        user, as they depend on the role, access rights and timezone of the
+        reader.
+        """
+        with self._lms_instrumented('get_dashboard_data') as diagnostics:
+            if force_refresh:
+                kpis = self._compute_kpis(KPI_SECTIONS)
+            else:
+                with self._lms_section_probe('snapshot'):
+                    kpis = dict(self.env['lms.dashboard.snapshot']._get_kpis(self.env.company))
+            with self._lms_section_probe('activities'):
+                kpis['activities'] = self._get_recent_activities()
+            with self._lms_section_probe('trends'):
+                kpis['trends'] = self._get_shipment_trends(7)
+            data = self._format_dashboard_data(kpis)
+        if diagnostics is not None:
+            data['diagnostics'] = diagnostics
+        return data
+
+    @api.model
+    def _compute_kpis(self, sections):
+        """Compute the given KPI sections, returning {section: values}"""
+        kpis = {}
+        for section in sections:
+            with self._lms_section_probe('kpi.%s' % section):
+                kpis[section] = getattr(self, '_kpi_%s' % section)()
+        return kpis
+
+    # === Instrumentation ===
+    @contextmanager
+    def _lms_instrumented(self, rpc):
+        """Collect the section probes run during ``rpc`` and log them as one JSON line.
+
+        Yields the list of samples to return to the client in debug mode, or
+        None outside debug mode.
         """
+        samples = []
+        outer = self.env.cr.cache.get('lms.dashboard.samples')
+        self.env.cr.cache['lms.dashboard.samples'] = samples
+        debug = bool(request and request.session.debug)
+        try:
+            yield samples if debug else None
+        finally:
+            if outer is None:
+                self.env.cr.cache.pop('lms.dashboard.samples', None)
+            else:
+                self.env.cr.cache['lms.dashboard.samples'] = outer
+                outer.extend(samples)
+        _logger.info("lms.dashboard.rpc %s", json.dumps({'rpc': rpc, 'uid': self.env.uid, 'sections': samples}))
+
+    @contextmanager
+    def _lms_section_probe(self, section):
+        """Measure ``section`` into the rolling stats, warning when it is slow"""
+        with SectionProbe(self.env.cr, section) as probe:
+            yield
+        sample = probe.sample
+        samples = self.env.cr.cache.get('lms.dashboard.samples')
+        if samples is not None:
+            samples.append(sample)
+        threshold = self.env['ir.config_parameter'].sudo().get_param('lms.dashboard_slow_section_ms')
+        if sample['wall_ms'] > float(threshold or DEFAULT_SLOW_SECTION_MS):
+            _logger.warning("lms.dashboard.slow_section %s", json.dumps(sample))
+
+    def _format_dashboard_data(self, kpis):
+        """Flatten KPI sections into the payload expected by the dashboard"""
+        shipments = kpis.get('shipments') or {}
+        fleet = kpis.get('fleet') or {}
+        revenue = kpis.get('revenue') or {}
+        customers = kpis.get('customers') or {}
+        receivable = (kpis.get('finance') or {}).get('receivable') or {}
+        fleet_status = fleet.get('fleetStatus') or {}
+
+        recent_activities = []
+        for activity in kpis.get('activities') or []:
+            activity = dict(activity)
+            activity['time'] = self._format_relative_time(
+                fields.Datetime.to_datetime(activity.pop('date', False))
+            )
+            recent_activities.append(activity)
+
+        return {
+            'activeShipments': shipments.get('activeShipments', 0),
+            'shipmentsChange': shipments.get('shipmentsChange', 0),
+            'fleetVehicles': fleet.get('fleetVehicles', 0),
+            'fleetUtilization': fleet_status.get('utilization', 0),
+            'monthlyRevenue': revenue.get('monthlyRevenue', 0) / 1000000,  # Convert to millions
+            'revenueChange': revenue.get('revenueChange', 0),
+            'activeCustomers': customers.get('activeCustomers', 0),
+            'newCustomersThisWeek': customers.get('newCustomersThisWeek', 0),
+            'shipmentTrends': kpis.get('trends') or [],
+            'fleetStatus': fleet_status,
+            'recentActivities': recent_activities,
+            'alerts': kpis.get('alerts') or [],
+            'receivablesAging': receivable.get('buckets') or {},
+        }
+
+    def _company_domain(self, shared=False):
+        """Restrict a search to the companies the KPIs are computed for"""
+        company_ids = self.env.companies.ids
+        if shared:
+            company_ids = company_ids + [False]
+        return [('company_id', 'in', company_ids)]
+
+    # === KPI sections ===
+    def _kpi_shipments(self):
         today = fields.Date.today()
         first_day_of_month = today.replace(day=1)
-        last_month = today - relativedelta(months=1)
-        last_month_first_day = last_month.replace(day=1)
-        
+        last_month_first_day = (today - relativedelta(months=1)).replace(day=1)
+
         # Active Shipments
         active_shipments = self.env['stock.picking'].search_count([
             ('state', 'in', ['assigned', 'confirmed', 'waiting'])
-        ])
-        
+        ] + self._company_domain())
+
         # Previous month shipments for comparison
         last_month_shipments = self.env['stock.picking'].search_count([
             ('state', 'in', ['assigned', 'confirmed', 'waiting']),
             ('create_date', '>=', last_month_first_day),
             ('create_date', '<', first_day_of_month)
-        ])
-        
-        shipments_change = self._calculate_percentage_change(
-            active_shipments, last_month_shipments
+        ] + self._company_domain())
+
+        return {
+            'activeShipments': active_shipments,
+            'shipmentsChange': self._calculate_percentage_change(
+                active_shipments, last_month_shipments
+            ),
+        }
+
+    def _kpi_fleet(self):
+        return {
+            'fleetVehicles': self.env['fleet.vehicle'].search_count(self._company_domain(shared=True)),
+            'fleetStatus': self._get_fleet_status(),
+        }
+
+    def _kpi_revenue(self):
+        today = fields.Date.today()
+        first_day_of_month = today.replace(day=1)
+        last_month_first_day = (today - relativedelta(months=1)).replace(day=1)
+
+        # Revenue of this month and the previous one, in company currency
+        groups = self.env['account.move']._read_group(
+            [
+                ('move_type', '=', 'out_invoice'),
+                ('state', '=', 'posted'),
+                ('invoice_date', '>=', last_month_first_day),
+            ] + self._company_domain(),
+            ['invoice_date:month'],
+            ['amount_total_signed:sum'],
         )
-        
-        # Fleet Vehicles
-        fleet_vehicles = self.env['fleet.vehicle'].search_count([])
-        
-        # Fleet Status Distribution
-        fleet_status = self._get_fleet_status()
-        
-        # Monthly Revenue
-        invoices = self.env['account.move'].search([
-            ('move_type', '=', 'out_invoice'),
-            ('state', '=', 'posted'),
-            ('invoice_date', '>=', first_day_of_month),
-        ])
-        monthly_revenue = sum(invoices.mapped('amount_total'))
-        
-        # Previous month revenue
-        last_month_invoices = self.env['account.move'].search([
-            ('move_type', '=', 'out_invoice'),
-            ('state', '=', 'posted'),
-            ('invoice_date', '>=', last_month_first_day),
-            ('invoice_date', '<', first_day_of_month),
-        ])
-        last_month_revenue = sum(last_month_invoices.mapped('amount_total'))
-        
-        revenue_change = self._calculate_percentage_change(
-            monthly_revenue, last_month_revenue
+        totals = {month: amount for month, amount in groups}
+        monthly_revenue = totals.get(first_day_of_month, 0.0)
+        last_month_revenue = totals.get(last_month_first_day, 0.0)
+
+        return {
+            'monthlyRevenue': monthly_revenue,
+            'revenueChange': self._calculate_percentage_change(
+                monthly_revenue, last_month_revenue
+            ),
+        }
+
+    def _kpi_customers(self):
+        week_ago = fields.Date.today() - timedelta(days=7)
+        customer_domain = [('customer_rank', '>', 0)] + self._company_domain(shared=True)
+
+        return {
+            'activeCustomers': self.env['res.partner'].search_count(customer_domain),
+            'newCustomersThisWeek': self.env['res.partner'].search_count(
+                customer_domain + [('create_date', '>=', week_ago)]
+            ),
+        }
+
+    def _kpi_alerts(self):
+        return self._get_alerts()
+
+    def _kpi_finance(self):
+        return self.env['lms.finance']._compute_aggregates(self.env.companies.ids)
+
+    # === OWL dashboard cards ===
+    @api.model
+    def get_section_stats(self, sections):
+        """
+        Stats of the requested dashboard cards in a single round trip.
+
+        ``sections`` lists the cards the client wants; cards outside the user's
+        LMS role or over models the user cannot read are left out of the result.
+        """
+        with self._lms_instrumented('get_section_stats') as diagnostics:
+            stats = {}
+            for section in sections or []:
+                if section not in STAT_SECTIONS or not self.env.user._lms_has_access(STAT_SECTIONS[section]):
+                    continue
+                try:
+                    with self._lms_section_probe('stats.%s' % section):
+                        stats[section] = getattr(self, '_stats_%s' % section)()
+                except AccessError:
+                    _logger.debug("Dashboard card %s skipped: no access", section)
+        if diagnostics is not None:
+            stats['diagnostics'] = diagnostics
+        return stats
+
+    @api.model
+    def get_section_actions(self):
+        """Definitions of the actions behind the sections the user may open.
+
+        Fetched once by the client and cached, so switching sections renders
+        the views in place instead of loading a web client per tab. Sections
+        whose action is not installed, restricted to other groups or over a
+        model the user cannot read are left out.
+        """
+        actions = {}
+        for section, (xmlid, view_type) in SECTION_ACTIONS.items():
+            if not self.env.user._lms_has_access(section):
+                continue
+            record = self.env.ref(xmlid, raise_if_not_found=False)
+            if not record or (record.sudo().groups_id and not record.sudo().groups_id & self.env.user.groups_id):
+                continue
+            action = self.env['ir.actions.actions']._for_xml_id(xmlid)
+            res_model = action.get('res_model')
+            if res_model and (res_model not in self.env or not self.env[res_model].has_access('read')):
+                continue
+            views = action.get('views') or []
+            if view_type and any(view[1] == view_type for view in views):
+                action['views'] = sorted(views, key=lambda view: view[1] != view_type)
+            actions[section] = action
+        return actions
+
+    def _stats_leads(self):
+        groups = self.env['crm.lead']._read_group([], ['stage_id'], ['__count'])
+        total = won = lost = 0
+        for stage, count in groups:
+            total += count
+            name = stage.with_context(lang='en_US').name if stage else ''
+            if name == 'Won':
+                won += count
+            elif name == 'Lost':
+                lost += count
+        return {
+            'total': total,
+            'won': won,
+            'lost': lost,
+            'in_progress': total - won - lost,
+        }
+
+    def _stats_warehouse(self):
+        Quant = self.env['stock.quant']
+        if 'value' in Quant._fields and Quant._fields['value'].store:
+            [(stock_value,)] = Quant._read_group([('quantity', '>', 0)], [], ['value:sum'])
+        else:
+            groups = Quant._read_group([('quantity', '>', 0)], ['product_id'], ['quantity:sum'])
+            stock_value = sum(product.standard_price * quantity for product, quantity in groups)
+        return {
+            'total_products': self.env['product.product'].search_count([]),
+            'stock_value': stock_value or 0,
+            'pending_transfers': self.env['stock.picking'].search_count([
+                ('state', 'in', ['assigned', 'confirmed', 'waiting']),
+            ]),
+        }
+
+    def _stats_dispatch(self):
+        return {
+            'active_trips': self.env['trip.sheet'].search_count([('status', '=', 'in_progress')]),
+            'pending_lr': self.env['lorry.receipt'].search_count([('status', '=', 'draft')]),
+            'pending_pod': self.env['proof.delivery'].search_count([('status', '=', 'draft')]),
+        }
+
+    def _stats_fleet(self):
+        groups = self.env['fleet.vehicle'].with_context(active_test=False)._read_group(
+            [], ['active'], ['__count'],
         )
-        
-        # Active Customers
-        active_customers = self.env['res.partner'].search_count([
-            ('customer_rank', '>', 0)
-        ])
-        
-        # New customers this week
-        week_ago = today - timedelta(days=7)
-        new_customers_this_week = self.env['res.partner'].search_count([
-            ('customer_rank', '>', 0),
-            ('create_date', '>=', week_ago)
-        ])
-        
-        # Shipment Trends (last 7 days)
-        shipment_trends = self._get_shipment_trends(7)
-        
-        # Recent Activities
-        recent_activities = self._get_recent_activities()
-        
-        # Alerts
-        alerts = self._get_alerts()
-        
+        counts = dict(groups)
+        total = sum(counts.values())
+        active = counts.get(True, 0)
         return {
-            'activeShipments': active_shipments,
-            'shipmentsChange': shipments_change,
-            'fleetVehicles': fleet_vehicles,
-            'fleetUtilization': fleet_status.get('utilization', 0),
-            'monthlyRevenue': monthly_revenue / 1000000,  # Convert to millions
-            'revenueChange': revenue_change,
-            'activeCustomers': active_customers,
-            'newCustomersThisWeek': new_customers_this_week,
-            'shipmentTrends': shipment_trends,
-            'fleetStatus': fleet_status,
-            'recentActivities': recent_activities,
-            'alerts': alerts,
+            'total_vehicles': total,
+            'active_vehicles': active,
+            'maintenance_due': total - active,
         }
-    
+
+    def _stats_finance(self):
+        self.env['account.move'].check_access('read')
+        aggregates = self.env['lms.finance']._get_company_aggregates(self.env.companies).values()
+        receivables = [finance.get('receivable') or {} for finance in aggregates]
+        payables = [finance.get('payable') or {} for finance in aggregates]
+        return {
+            'unpaid_invoices': sum(side.get('count', 0) for side in receivables),
+            'unpaid_amount': sum(side.get('amount', 0) for side in receivables),
+            'pending_bills': sum(side.get('count', 0) for side in payables),
+        }
+
     def _calculate_percentage_change(self, current, previous):
         """Calculate percentage change between two values"""
         if previous == 0:
@@ -105,10 +409,12 @@ class LMSDashboard(models.Model):
         return round(((current - previous) / previous) * 100, 1)
     
     def _get_fleet_status(self):
-        """Get fleet vehicle status distribution"""
-        vehicles = self.env['fleet.vehicle'].search([])
-        total = len(vehicles)
-        
+        """Vehicle status distribution, and the share of the last days the fleet spent on trips"""
+        Vehicle = self.env['fleet.vehicle']
+        domain = self._company_domain(shared=True)
+        counts = dict(Vehicle._read_group(domain, ['vehicle_status'], ['__count']))
+        total = sum(counts.values())
+
         if total == 0:
             return {
                 'active': 0,
@@ -116,156 +422,237 @@ class LMSDashboard(models.Model):
                 'idle': 0,
                 'utilization': 0
             }
-        
-        # Count by state
-        active_count = len(vehicles.filtered(lambda v: v.vehicle_status == 'active'))
-        maintenance_count = len(vehicles.filtered(lambda v: v.vehicle_status == 'maintenance'))
+
+        active_count = counts.get('active', 0)
+        maintenance_count = counts.get('maintenance', 0)
         idle_count = total - active_count - maintenance_count
-        
+
+        Utilization = self.env['lms.vehicle.utilization']
+        today = datetime.now(Utilization._get_timezone()).date()
+        utilization = Utilization._get_utilization(
+            today - timedelta(days=FLEET_UTILIZATION_DAYS - 1), today, Vehicle.search(domain),
+        )['fleet']['utilization']
+
         return {
             'active': round((active_count / total) * 100),
             'maintenance': round((maintenance_count / total) * 100),
             'idle': round((idle_count / total) * 100),
-            'utilization': round((active_count / total) * 100)
+            'utilization': round(utilization)
+        }
+
+    @api.model
+    def get_fleet_utilization(self, date_from, date_to, vehicle_ids=None):
+        """Busy hours and utilization per vehicle and fleet-wide over [date_from, date_to].
+
+        Days are those of ``lms.utilization_timezone``; a vehicle is busy
+        while one of its trip sheets is in progress or completed, overlapping
+        trips counting once.
+        """
+        date_from = fields.Date.to_date(date_from)
+        date_to = fields.Date.to_date(date_to)
+        if not date_from or not date_to or date_from > date_to:
+            raise UserError(_("Choose a valid utilization period."))
+        if (date_to - date_from).days >= MAX_UTILIZATION_DAYS:
+            raise UserError(_("Utilization periods are limited to %s days.", MAX_UTILIZATION_DAYS))
+        domain = self._company_domain(shared=True)
+        if vehicle_ids:
+            domain.append(('id', 'in', vehicle_ids))
+        vehicles = self.env['fleet.vehicle'].search(domain)
+        result = self.env['lms.vehicle.utilization']._get_utilization(date_from, date_to, vehicles)
+        return {
+            'vehicles': [
+                dict(result['vehicles'][vehicle.id], vehicle_id=vehicle.id, name=vehicle.display_name)
+                for vehicle in vehicles
+            ],
+            'fleet': result['fleet'],
         }
     
+    @api.model
+    def get_shipment_trends(self, granularity='day', periods=7, split_by=None):
+        """
+        Shipment counts per day, week or month over the last ``periods`` buckets.
+
+        Buckets follow the user's timezone, are computed with a single grouped
+        query and are zero-filled. ``split_by`` ('picking_type' or 'state')
+        adds a per-bucket breakdown.
+        """
+        if granularity not in TREND_GRANULARITIES:
+            raise UserError(_("Unsupported trend granularity: %s", granularity))
+        if split_by and split_by not in TREND_SPLITS:
+            raise UserError(_("Unsupported trend breakdown: %s", split_by))
+        periods = max(1, min(int(periods), MAX_TREND_PERIODS))
+
+        tz = pytz.timezone(self.env.context.get('tz') or self.env.user.tz or 'UTC')
+        step = TREND_GRANULARITIES[granularity]
+        today = datetime.now(tz).date()
+        if granularity == 'week':
+            current = today - timedelta(days=today.weekday())
+        elif granularity == 'month':
+            current = today.replace(day=1)
+        else:
+            current = today
+        first = current - step * (periods - 1)
+        stop = current + step
+
+        def to_utc(day):
+            local = tz.localize(datetime.combine(day, time.min))
+            return local.astimezone(pytz.utc).replace(tzinfo=None)
+
+        groupby = ['scheduled_date:%s' % granularity]
+        if split_by:
+            groupby.append(TREND_SPLITS[split_by])
+        groups = self.env['stock.picking'].with_context(tz=tz.zone)._read_group(
+            [
+                ('scheduled_date', '>=', to_utc(first)),
+                ('scheduled_date', '<', to_utc(stop)),
+            ] + self._company_domain(),
+            groupby,
+            ['__count'],
+        )
+
+        counts = defaultdict(int)
+        breakdown = defaultdict(lambda: defaultdict(int))
+        series = {}
+        for group in groups:
+            bucket = group[0]
+            if isinstance(bucket, datetime):
+                bucket = bucket.date()
+            counts[bucket] += group[-1]
+            if split_by:
+                key, label = self._trend_series_key(split_by, group[1])
+                series.setdefault(key, label)
+                breakdown[bucket][key] += group[-1]
+
+        buckets = []
+        day = first
+        while day < stop:
+            bucket = {
+                'date': day.strftime('%Y-%m-%d'),
+                'count': counts.get(day, 0),
+            }
+            if split_by:
+                bucket['series'] = {key: breakdown[day].get(key, 0) for key in series}
+            buckets.append(bucket)
+            day += step
+
+        return {
+            'granularity': granularity,
+            'timezone': tz.zone,
+            'series': [{'key': key, 'label': label} for key, label in series.items()],
+            'buckets': buckets,
+        }
+
+    def _trend_series_key(self, split_by, value):
+        """Return a JSON friendly (key, label) for a grouped breakdown value"""
+        if split_by == 'state':
+            selection = dict(self.env['stock.picking']._fields['state']._description_selection(self.env))
+            return value or 'none', selection.get(value, value or _('None'))
+        if not value:
+            return 'none', _('None')
+        return str(value.id), value.display_name
+
     def _get_shipment_trends(self, days=7):
         """Get shipment trends for the last N days"""
-        trends = []
-        today = fields.Date.today()
-        
-        for i in range(days - 1, -1, -1):
-            date = today - timedelta(days=i)
-            count = self.env['stock.picking'].search_count([
-                ('scheduled_date', '>=', date.strftime('%Y-%m-%d 00:00:00')),
-                ('scheduled_date', '<=', date.strftime('%Y-%m-%d 23:59:59')),
-            ])
-            trends.append({
-                'date': date.strftime('%Y-%m-%d'),
-                'count': count
-            })
-        
-        return trends
-    
+        return self.get_shipment_trends('day', days)['buckets']
+
     def _get_recent_activities(self):
-        """Get recent system activities"""
-        activities = []
-        
-        # Recent shipments
-        recent_pickings = self.env['stock.picking'].search(
-            [],
-            order='create_date desc',
-            limit=2
-        )
-        
-        for picking in recent_pickings:
-            activities.append({
-                'id': f'picking_{picking.id}',
-                'icon': '📦',
-                'title': f'New shipment created: {picking.name}',
-                'time': self._format_relative_time(picking.create_date)
-            })
-        
-        # Recent paid invoices
-        recent_invoices = self.env['account.move'].search([
-            ('move_type', '=', 'out_invoice'),
-            ('payment_state', '=', 'paid')
-        ], order='write_date desc', limit=2)
-        
-        for invoice in recent_invoices:
-            activities.append({
-                'id': f'invoice_{invoice.id}',
-                'icon': '💰',
-                'title': f'Invoice {invoice.name} paid',
-                'time': self._format_relative_time(invoice.write_date)
+        """The latest events of the activity stream"""
+        return self.get_activity_stream(limit=4)['events']
+
+    @api.model
+    def get_activity_stream(self, limit=20, cursor=None, kinds=None, vehicle_id=None, driver_id=None):
+        """Latest changes of the LMS documents, newest first, one page at a time.
+
+        Every source the user's role and access rights allow is merged in a
+        single query ordered by (write date, kind, id). ``cursor`` is the
+        ``next_cursor`` of the previous page: pages are read from the
+        indexes past that key, however deep the user scrolls.
+
+        :param kinds: optional list of ACTIVITY_SOURCES keys to keep
+        :param vehicle_id: keep the events of that fleet.vehicle
+        :param driver_id: keep the events of that driver (res.partner)
+        :return: {'events': [...], 'next_cursor': cursor or False}
+        """
+        limit = max(1, min(int(limit), MAX_ACTIVITY_PAGE))
+        if cursor:
+            cursor = (datetime.fromisoformat(cursor['date']), cursor['kind'], int(cursor['id']))
+
+        branches = []
+        for kind, source in ACTIVITY_SOURCES.items():
+            if kinds and kind not in kinds:
+                continue
+            if (vehicle_id and 'vehicle' not in source) or (driver_id and 'driver' not in source):
+                continue
+            if not self.env.user._lms_has_access(source['section']):
+                continue
+            Model = self.env[source['model']]
+            if not Model.has_access('read'):
+                continue
+            domain = list(source.get('domain', []))
+            if 'company' in source:
+                domain += self._company_domain(shared=source['company'] == 'shared')
+            if vehicle_id:
+                domain.append((source['vehicle'], '=', vehicle_id))
+            if driver_id:
+                domain.append((source['driver'], '=', driver_id))
+            query = Model._search(domain, order='write_date desc, id desc', limit=limit + 1)
+            write_date = SQL.identifier(Model._table, 'write_date')
+            record_id = SQL.identifier(Model._table, 'id')
+            if cursor:
+                query.add_where(self._activity_keyset(kind, cursor, write_date, record_id))
+            branches.append(SQL("(%s)", query.select(
+                SQL("%s AS date", write_date),
+                SQL("%s AS kind", kind),
+                SQL("%s AS id", record_id),
+                SQL("%s AS name", SQL.identifier(Model._table, 'name')),
+                SQL("%s AS status", SQL.identifier(Model._table, source['status'])),
+            )))
+        if not branches:
+            return {'events': [], 'next_cursor': False}
+
+        self.env.cr.execute(SQL(
+            "SELECT date, kind, id, name, status FROM (%s) stream ORDER BY date DESC, kind DESC, id DESC LIMIT %s",
+            SQL(" UNION ALL ").join(branches), limit + 1,
+        ))
+        rows = self.env.cr.fetchall()
+        page = rows[:limit]
+
+        labels = {}
+        events = []
+        for date, kind, record_id, name, status in page:
+            source = ACTIVITY_SOURCES[kind]
+            if kind not in labels:
+                field = self.env[source['model']]._fields[source['status']]
+                labels[kind] = dict(field._description_selection(self.env))
+            events.append({
+                'id': '%s_%s' % (kind, record_id),
+                'kind': kind,
+                'res_model': source['model'],
+                'res_id': record_id,
+                'icon': source['icon'],
+                'title': '%s %s: %s' % (source['label'], name, labels[kind].get(status, status or '')),
+                'date': fields.Datetime.to_string(date),
             })
-        
-        # Recent vehicle updates
-        recent_vehicles = self.env['fleet.vehicle'].search(
-            [],
-            order='write_date desc',
-            limit=1
-        )
-        
-        for vehicle in recent_vehicles:
-            if vehicle.vehicle_status == 'maintenance':
-                activities.append({
-                    'id': f'vehicle_{vehicle.id}',
-                    'icon': '🔧',
-                    'title': f'Maintenance scheduled for {vehicle.name}',
-                    'time': self._format_relative_time(vehicle.write_date)
-                })
-        
-        return activities[:4]
-    
+        next_cursor = False
+        if len(rows) > limit:
+            date, kind, record_id = page[-1][:3]
+            next_cursor = {'date': date.isoformat(), 'kind': kind, 'id': record_id}
+        return {'events': events, 'next_cursor': next_cursor}
+
+    @api.model
+    def _activity_keyset(self, kind, cursor, write_date, record_id):
+        """Condition keeping the events of ``kind`` after ``cursor`` in the stream order"""
+        cursor_date, cursor_kind, cursor_id = cursor
+        if kind < cursor_kind:
+            return SQL("%s <= %s", write_date, cursor_date)
+        if kind > cursor_kind:
+            return SQL("%s < %s", write_date, cursor_date)
+        return SQL("(%s, %s) < (%s, %s)", write_date, record_id, cursor_date, cursor_id)
+
     def _get_alerts(self):
-        """Get system alerts and notifications"""
-        alerts = []
-        
-        # Vehicles due for maintenance
-        maintenance_vehicles = self.env['fleet.vehicle'].search_count([
-            ('vehicle_status', '=', 'maintenance')
-        ])
-        
-        if maintenance_vehicles > 0:
-            alerts.append({
-                'id': 'maintenance_alert',
-                'type': 'warning',
-                'icon': '⚠️',
-                'title': f'{maintenance_vehicles} vehicles due for maintenance',
-                'time': 'Action required'
-            })
-        
-        # Delayed shipments
-        today = fields.Datetime.now()
-        delayed_shipments = self.env['stock.picking'].search_count([
-            ('state', 'in', ['assigned', 'confirmed']),
-            ('scheduled_date', '<', today)
-        ])
-        
-        if delayed_shipments > 0:
-            alerts.append({
-                'id': 'delayed_shipments',
-                'type': 'danger',
-                'icon': '🚨',
-                'title': f'{delayed_shipments} delayed shipments',
-                'time': 'Urgent attention needed'
-            })
-        
-        # Pending invoices
-        pending_invoices = self.env['account.move'].search_count([
-            ('move_type', '=', 'out_invoice'),
-            ('state', '=', 'posted'),
-            ('payment_state', '!=', 'paid')
-        ])
-        
-        if pending_invoices > 0:
-            alerts.append({
-                'id': 'pending_invoices',
-                'type': 'info',
-                'icon': '📋',
-                'title': f'{pending_invoices} pending invoices',
-                'time': 'Review required'
-            })
-        
-        # Low stock alerts (if using inventory)
-        low_stock_products = self.env['product.product'].search_count([
-            ('type', '=', 'product'),
-            ('qty_available', '<', 10),
-            ('qty_available', '>', 0)
-        ])
-        
-        if low_stock_products > 0:
-            alerts.append({
-                'id': 'low_stock',
-                'type': 'warning',
-                'icon': '📉',
-                'title': f'{low_stock_products} products low in stock',
-                'time': 'Reorder recommended'
-            })
-        
-        return alerts
-    
+        """Stored alerts of the dashboard companies, evaluated by the alert rules cron"""
+        return self.env['lms.alert']._get_dashboard_alerts(self.env.companies.ids)
+
     def _format_relative_time(self, dt):
         """Format datetime as relative time string"""
         if not dt:
@@ -294,7 +681,16 @@ class LMSDashboard(models.Model):
 
 
 class FleetVehicle(models.Model):
-    _inherit = 'fleet.vehicle'
+    _name = 'fleet.vehicle'
+    _inherit = ['fleet.vehicle', 'lms.kpi.source.mixin', 'lms.live.counter.mixin']
+    _lms_kpi_sections = ('fleet',)
+    _lms_kpi_fields = ('vehicle_status', 'active', 'company_id')
+    # the fleet card counts archived vehicles as the ones due for maintenance
+    _lms_live_counters = {
+        ('fleet', 'total_vehicles'): ('active', (True, False)),
+        ('fleet', 'active_vehicles'): ('active', (True,)),
+        ('fleet', 'maintenance_due'): ('active', (False,)),
+    }
     
     vehicle_status = fields.Selection([
         ('active', 'Active'),
@@ -302,9 +698,19 @@ class FleetVehicle(models.Model):
         ('idle', 'Idle')
     ], string='Vehicle Status', default='active', tracking=True)
 
+    # Load planning
+    lms_capacity_weight = fields.Float(string="Payload Capacity (KG)", help="0 uses the default dispatch capacity")
+    lms_capacity_packages = fields.Integer(string="Package Capacity", help="0 means no package limit")
+
 
 class StockPicking(models.Model):
-    _inherit = 'stock.picking'
+    _name = 'stock.picking'
+    _inherit = ['stock.picking', 'lms.kpi.source.mixin', 'lms.live.counter.mixin']
+    _lms_kpi_sections = ('shipments',)
+    _lms_kpi_fields = ('state', 'company_id')
+    _lms_live_counters = {
+        ('warehouse', 'pending_transfers'): ('state', ('assigned', 'confirmed', 'waiting')),
+    }
     
     # Add any custom fields for shipment tracking if needed
     is_delayed = fields.Boolean(
@@ -313,10 +719,70 @@ class StockPicking(models.Model):
         store=True
     )
     
+    def init(self):
+        super().init()
+        # open pickings: active shipment counts and delayed shipment alerts
+        tools.create_index(self.env.cr, 'stock_picking_lms_open_idx', self._table,
+                           ['company_id', 'scheduled_date'], where="state IN ('waiting', 'confirmed', 'assigned')")
+        # shipment trends bucket every picking of a company by scheduled date
+        tools.create_index(self.env.cr, 'stock_picking_lms_company_scheduled_idx', self._table,
+                           ['company_id', 'scheduled_date'])
+        # the activity stream pages through the latest changes
+        tools.create_index(self.env.cr, 'stock_picking_lms_write_date_idx', self._table, ['write_date', 'id'])
+
+    def _compute_state(self):
+        # the state follows the moves and never goes through write()
+        with self._lms_live_track():
+            super()._compute_state()
+
     @api.depends('scheduled_date', 'state')
     def _compute_is_delayed(self):
         for picking in self:
             if picking.scheduled_date and picking.state in ['assigned', 'confirmed']:
                 picking.is_delayed = picking.scheduled_date < fields.Datetime.now()
             else:
-                picking.is_delayed = False
\ No newline at end of file
+                picking.is_delayed = False
+
+
+class AccountMove(models.Model):
+    _name = 'account.move'
+    _inherit = ['account.move', 'lms.kpi.source.mixin']
+    _lms_kpi_sections = ('revenue', 'finance')
+    _lms_kpi_fields = ('state', 'payment_state', 'move_type', 'invoice_date', 'invoice_date_due', 'company_id')
+
+    def init(self):
+        super().init()
+        # paid customer invoices in the activity stream, latest first
+        tools.create_index(self.env.cr, 'account_move_lms_paid_invoice_idx', self._table, ['write_date', 'id'],
+                           where="move_type = 'out_invoice' AND payment_state = 'paid'")
+        # open invoices and bills aggregated by lms.finance
+        tools.create_index(self.env.cr, 'account_move_lms_open_invoice_idx', self._table,
+                           ['company_id', 'invoice_date_due'],
+                           where="state = 'posted' AND payment_state IN ('not_paid', 'partial')")
+
+    # payments are reconciled without writing on the move, the residual
+    # and payment state are recomputed instead
+    def _compute_amount(self):
+        before = self._lms_invoice_values('amount_residual')
+        super()._compute_amount()
+        self._lms_mark_changed_dirty(before, 'amount_residual')
+
+    def _compute_payment_state(self):
+        before = self._lms_invoice_values('payment_state')
+        super()._compute_payment_state()
+        self._lms_mark_changed_dirty(before, 'payment_state')
+
+    def _lms_invoice_values(self, fname):
+        """{move id: value of ``fname``} of the stored invoices, before a recompute"""
+        return {move.id: move[fname] for move in self if move.id and move.is_invoice(include_receipts=True)}
+
+    def _lms_mark_changed_dirty(self, before, fname):
+        """Mark the KPIs of the invoices whose ``fname`` moved away from ``before`` dirty"""
+        self.filtered(lambda move: move.id in before and move[fname] != before[move.id])._lms_mark_kpis_dirty()
+
+
+class ResPartner(models.Model):
+    _name = 'res.partner'
+    _inherit = ['res.partner', 'lms.kpi.source.mixin']
+    _lms_kpi_sections = ('customers',)
+    _lms_kpi_fields = ('customer_rank', 'active', 'company_id')
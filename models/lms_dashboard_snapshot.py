@@ -0,0 +1,269 @@
+# -*- coding: utf-8 -*-
+import logging
+import threading
+import time
+from collections import defaultdict
+from datetime import timedelta
+
+from psycopg2 import errors as pg_errors
+
+from odoo import models, fields, api
+
+_logger = logging.getLogger(__name__)
+
+# KPI sections served by lms.dashboard.get_dashboard_data, in the order they are computed.
+# The recent activities and shipment trends depend on the role and timezone of the
+# reader and are not part of them.
+KPI_SECTIONS = ('shipments', 'fleet', 'revenue', 'customers', 'alerts', 'finance')
+
+# Worker-local cache of served KPIs: {(dbname, company_id): (token, expires_at, data)}.
+# The token is the snapshot row's write_date, so every worker drops its entry
+# as soon as the row is refreshed, whatever worker did it.
+_KPI_CACHE = {}
+_KPI_CACHE_LOCK = threading.Lock()
+
+# Worker-local time the refresh crons were last triggered: {(dbname, cron xmlid): monotonic time}
+_LAST_TRIGGER = {}
+
+DEFAULT_CACHE_TTL = 60
+# Seconds between a change and the refresh of the sections it made dirty;
+# the changes made meanwhile are refreshed together
+REFRESH_DELAY = 10
+SNAPSHOT_CRON = 'lms.ir_cron_lms_dashboard_snapshot'
+DIRTY_CRON = 'lms.ir_cron_lms_dashboard_snapshot_dirty'
+
+
+class LMSDashboardSnapshot(models.Model):
+    """KPIs of a company, computed by the refresh crons and served as they are.
+
+    Changes to the source records never touch the snapshot row: they insert
+    the sections they affect in the unlogged ``lms_dashboard_snapshot_dirty``
+    table and trigger the dirty sections cron, so business transactions
+    neither wait on a refresh nor on each other. Readers always get the
+    last computed snapshot.
+    """
+    _name = 'lms.dashboard.snapshot'
+    _description = 'LMS Dashboard KPI Snapshot'
+    _rec_name = 'company_id'
+
+    company_id = fields.Many2one('res.company', string="Company", required=True, ondelete='cascade')
+    data = fields.Json(string="KPI Data")
+    computed_at = fields.Datetime(string="Computed At", readonly=True)
+    computed_on = fields.Date(string="Computed On", readonly=True)
+
+    _sql_constraints = [
+        ('company_uniq', 'unique(company_id)', 'Only one KPI snapshot per company is allowed.'),
+    ]
+
+    def init(self):
+        super().init()
+        # insert-only, without constraints: concurrent markers never wait on
+        # each other. Markers lost in a crash are caught up by the full refresh.
+        self.env.cr.execute("""
+            CREATE UNLOGGED TABLE IF NOT EXISTS lms_dashboard_snapshot_dirty (
+                company_id integer,
+                section varchar NOT NULL
+            )
+        """)
+
+    # === Serving ===
+    @api.model
+    def _get_kpis(self, company):
+        """Return the last computed KPI sections of ``company``.
+
+        The snapshot is only computed here the first time a company is
+        served; a snapshot of a previous day is served while the refresh
+        cron is triggered.
+        """
+        snapshot_id, token, computed_on = self._get_snapshot_row(company)
+        if computed_on and computed_on != fields.Date.today():
+            self._trigger_refresh(SNAPSHOT_CRON)
+
+        cache_key = (self.env.cr.dbname, company.id)
+        cached = _KPI_CACHE.get(cache_key)
+        if cached and cached[0] == token and cached[1] > time.monotonic():
+            return cached[2]
+
+        snapshot = self.sudo().browse(snapshot_id)
+        if not snapshot.data:
+            # nothing to serve yet
+            snapshot._refresh()
+
+        with _KPI_CACHE_LOCK:
+            _KPI_CACHE[cache_key] = (snapshot.write_date, time.monotonic() + self._get_cache_ttl(), snapshot.data)
+        return snapshot.data or {}
+
+    def _get_snapshot_row(self, company):
+        """Fetch (id, write_date, computed_on), creating the row on first use"""
+        query = """
+            SELECT id, write_date, computed_on
+              FROM lms_dashboard_snapshot
+             WHERE company_id = %s
+        """
+        self.env.cr.execute(query, [company.id])
+        row = self.env.cr.fetchone()
+        if row is None:
+            self.env.cr.execute("""
+                INSERT INTO lms_dashboard_snapshot (company_id, create_uid, create_date, write_uid, write_date)
+                VALUES (%s, %s, now() at time zone 'UTC', %s, now() at time zone 'UTC')
+                ON CONFLICT (company_id) DO NOTHING
+            """, [company.id, self.env.uid, self.env.uid])
+            self.env.cr.execute(query, [company.id])
+            row = self.env.cr.fetchone()
+        return row
+
+    @api.model
+    def _get_cache_ttl(self):
+        ttl = self.env['ir.config_parameter'].sudo().get_param('lms.dashboard_cache_ttl')
+        return int(ttl) if ttl else DEFAULT_CACHE_TTL
+
+    # === Refreshing ===
+    def _refresh(self, sections=None):
+        """Recompute ``sections`` (all when None) of each snapshot.
+
+        Snapshots locked by a concurrent refresh are skipped: that refresh will
+        serve fresh numbers shortly, and readers keep the previous payload.
+
+        :return: the snapshots refreshed
+        """
+        sections = tuple(sections) if sections else KPI_SECTIONS
+        refreshed = self.browse()
+        for snapshot in self:
+            try:
+                with self.env.cr.savepoint():
+                    self.env.cr.execute("""
+                        SELECT id FROM lms_dashboard_snapshot
+                         WHERE id = %s
+                           FOR NO KEY UPDATE SKIP LOCKED
+                    """, [snapshot.id])
+                    if not self.env.cr.fetchone():
+                        continue
+                    company = snapshot.company_id
+                    dashboard = self.env['lms.dashboard'].sudo().with_company(company).with_context(
+                        allowed_company_ids=company.ids,
+                    )
+                    data = dict(snapshot.data or {})
+                    data.update(dashboard._compute_kpis(sections))
+                    snapshot.write({
+                        'data': data,
+                        'computed_at': fields.Datetime.now(),
+                        'computed_on': fields.Date.today(),
+                    })
+                    snapshot.flush_recordset()
+                refreshed |= snapshot
+            except (pg_errors.SerializationFailure, pg_errors.LockNotAvailable):
+                _logger.info("KPI snapshot %s is being refreshed concurrently, serving previous data", snapshot.id)
+                snapshot.invalidate_recordset()
+        return refreshed
+
+    @api.model
+    def _cron_refresh_snapshots(self):
+        """Recompute the KPI snapshot of every company"""
+        for company in self.env['res.company'].search([]):
+            snapshot_id = self._get_snapshot_row(company)[0]
+            self.browse(snapshot_id)._refresh()
+
+    @api.model
+    def _cron_refresh_dirty(self):
+        """Recompute the sections marked dirty since the previous run"""
+        self.env.cr.execute("DELETE FROM lms_dashboard_snapshot_dirty RETURNING company_id, section")
+        shared = set()
+        pending = defaultdict(set)
+        for company_id, section in self.env.cr.fetchall():
+            if section in KPI_SECTIONS:
+                (pending[company_id] if company_id else shared).add(section)
+        companies = self.env['res.company'].search([] if shared else [('id', 'in', list(pending))])
+        for company in companies:
+            sections = shared | pending[company.id]
+            snapshot = self.browse(self._get_snapshot_row(company)[0])
+            if not snapshot._refresh(sorted(sections)):
+                # refreshed concurrently, maybe from an older state: run again
+                self._insert_dirty(sections, company.id)
+
+    # === Invalidation ===
+    @api.model
+    def _mark_dirty(self, sections, company_ids=None):
+        """Queue ``sections`` to be marked dirty when the transaction commits.
+
+        Markers are coalesced per transaction, so a batch write touching
+        thousands of records inserts each marker at most once.
+        """
+        pending = self.env.cr.precommit.data.get('lms.kpi.dirty')
+        if pending is None:
+            pending = self.env.cr.precommit.data['lms.kpi.dirty'] = {}
+            self.env.cr.precommit.add(self._flush_dirty)
+        for company_id in (company_ids or [None]):
+            pending.setdefault(company_id, set()).update(sections)
+
+    def _flush_dirty(self):
+        pending = self.env.cr.precommit.data.pop('lms.kpi.dirty', {})
+        all_sections = pending.pop(None, set())
+        if all_sections:
+            self._insert_dirty(all_sections)
+        for company_id, sections in pending.items():
+            if sections - all_sections:
+                self._insert_dirty(sections - all_sections, company_id)
+        self._trigger_refresh(DIRTY_CRON, REFRESH_DELAY)
+
+    @api.model
+    def _insert_dirty(self, sections, company_id=None):
+        """Mark ``sections`` of ``company_id`` (of every company when None) dirty"""
+        sections = sorted(sections)
+        self.env.cr.execute("""
+            INSERT INTO lms_dashboard_snapshot_dirty (company_id, section)
+            SELECT %s, unnest(%s::varchar[])
+        """, [company_id, sections])
+
+    @api.model
+    def _trigger_refresh(self, xmlid, delay=0):
+        """Trigger the refresh cron ``xmlid`` in ``delay`` seconds, at most once per delay and worker"""
+        key = (self.env.cr.dbname, xmlid)
+        now = time.monotonic()
+        if key in _LAST_TRIGGER and now - _LAST_TRIGGER[key] < max(delay, REFRESH_DELAY):
+            return
+        cron = self.env.ref(xmlid, raise_if_not_found=False)
+        if cron:
+            cron.sudo()._trigger(fields.Datetime.now() + timedelta(seconds=delay))
+            _LAST_TRIGGER[key] = now
+
+
+class LMSKpiSourceMixin(models.AbstractModel):
+    """Mark the dependent dashboard KPI sections dirty when records change.
+
+    Inheriting models declare the sections they feed and the fields whose
+    changes affect them.
+    """
+    _name = 'lms.kpi.source.mixin'
+    _description = 'LMS Dashboard KPI Source'
+
+    _lms_kpi_sections = ()
+    _lms_kpi_fields = ()
+
+    def _lms_mark_kpis_dirty(self):
+        if not self._lms_kpi_sections or not self:
+            return
+        company_ids = None
+        # records shared between companies affect every snapshot
+        if 'company_id' in self._fields and all(rec.company_id for rec in self.sudo()):
+            company_ids = self.sudo().company_id.ids
+        self.env['lms.dashboard.snapshot']._mark_dirty(self._lms_kpi_sections, company_ids)
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        records = super().create(vals_list)
+        records._lms_mark_kpis_dirty()
+        return records
+
+    def write(self, vals):
+        if not self._lms_kpi_fields or set(vals).isdisjoint(self._lms_kpi_fields):
+            return super().write(vals)
+        if 'company_id' in vals:
+            # the company the records leave needs a refresh too
+            self._lms_mark_kpis_dirty()
+        res = super().write(vals)
+        self._lms_mark_kpis_dirty()
+        return res
+
+    def unlink(self):
+        self._lms_mark_kpis_dirty()
+        return super().unlink()
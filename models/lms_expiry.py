@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+import logging
+import threading
+
+from odoo import models, fields, api
+
+_logger = logging.getLogger(__name__)
+
+EXPIRY_BATCH_SIZE = 1000
+
+
+class LMSExpiryMixin(models.AbstractModel):
+    """Batch expiry of documents whose validity date has passed.
+
+    Inheriting models set ``_lms_expiry_field`` (a Date or Datetime field) and
+    keep a stored ``is_expired`` compute depending on it and on ``status``.
+    """
+    _name = 'lms.expiry.mixin'
+    _description = 'LMS Document Expiry'
+
+    _lms_expiry_field = None
+    _lms_expiry_message = "%(count)s documents expired automatically: %(names)s."
+
+    def _lms_expiry_deadline(self):
+        field = self._fields[self._lms_expiry_field]
+        return fields.Date.today() if field.type == 'date' else fields.Datetime.now()
+
+    @api.model
+    def _cron_expire(self, batch_size=EXPIRY_BATCH_SIZE):
+        """Move active documents past their validity to ``expired``.
+
+        Records are fetched ``batch_size`` at a time with an indexed search,
+        updated with one write per batch and summarized in one chatter note per
+        batch; each batch is committed so memory stays bounded.
+        """
+        deadline = self._lms_expiry_deadline()
+        auto_commit = not getattr(threading.current_thread(), 'testing', False)
+        expired_count = 0
+
+        domain = [('status', '=', 'active'), (self._lms_expiry_field, '<', deadline)]
+        while True:
+            records = self.search(domain, limit=batch_size, order='id')
+            if not records:
+                break
+            records._lms_expire()
+            expired_count += len(records)
+            if auto_commit:
+                self.env.cr.commit()
+            self.env.invalidate_all()
+
+        # documents that never became active only need their flag refreshed
+        is_expired = self._fields['is_expired']
+        domain = [('is_expired', '=', False), (self._lms_expiry_field, '<', deadline)]
+        while True:
+            records = self.search(domain, limit=batch_size, order='id')
+            if not records:
+                break
+            self.env.add_to_compute(is_expired, records)
+            records.flush_recordset(['is_expired'])
+            if auto_commit:
+                self.env.cr.commit()
+            self.env.invalidate_all()
+
+        if expired_count:
+            _logger.info("%s: %d document(s) expired", self._name, expired_count)
+        return expired_count
+
+    def _lms_expire(self):
+        """Expire the records with one write and log one summary of the batch.
+
+        The summary is logged in the chatter of the current company, as the
+        expired documents have no common record to live on.
+        """
+        self.with_context(tracking_disable=True).write({'status': 'expired'})
+        self.env.company.partner_id._message_log(body=self._lms_expiry_message % {
+            'count': len(self),
+            'names': ", ".join(self.mapped('display_name')),
+        })
@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+from collections import defaultdict
+
+from odoo import models, fields, api, _
+from odoo.exceptions import AccessError
+
+# Aging buckets by days past the due date: (key, upper bound in days or None)
+AGING_BUCKETS = [('not_due', 0), ('0_30', 30), ('31_60', 60), ('61_90', 90), ('90_plus', None)]
+RECEIVABLE_TYPES = ('out_invoice', 'out_refund')
+PAYABLE_TYPES = ('in_invoice', 'in_refund')
+
+
+class LMSFinance(models.AbstractModel):
+    """Receivables and payables aggregated in the database.
+
+    Open posted invoices, bills and credit notes are summed per company,
+    currency, side and aging bucket with one grouped query; credit notes
+    count negatively. The per-company results are cached in the dashboard
+    snapshot, whose finance section is marked dirty whenever a move is
+    posted, paid or changed, so dashboards only receive the numbers.
+    """
+    _name = 'lms.finance'
+    _description = 'LMS Finance Aggregates'
+
+    @api.model
+    def _compute_aggregates(self, company_ids, today=None):
+        """Aggregates of the open moves of ``company_ids``.
+
+        :return: {'receivable'|'payable': {'count', 'amount' (company currency),
+                  'buckets': {bucket: amount}, 'currencies': {currency code:
+                  {'count', 'amount', 'buckets'}}}}
+        """
+        today = today or fields.Date.context_today(self)
+        self.env['account.move'].flush_model([
+            'company_id', 'currency_id', 'state', 'payment_state', 'move_type',
+            'invoice_date_due', 'invoice_date', 'date', 'amount_residual', 'amount_residual_signed',
+        ])
+        bucket_sql = "CASE %s ELSE '%s' END" % (
+            " ".join("WHEN age <= %d THEN '%s'" % (bound, key) for key, bound in AGING_BUCKETS if bound is not None),
+            AGING_BUCKETS[-1][0],
+        )
+        self.env.cr.execute("""
+            SELECT c.name,
+                   m.move_type IN %(receivable_types)s,
+                   {bucket_sql},
+                   COUNT(*),
+                   SUM(CASE WHEN m.move_type IN ('out_refund', 'in_refund')
+                            THEN -m.amount_residual ELSE m.amount_residual END),
+                   SUM(CASE WHEN m.move_type IN %(receivable_types)s
+                            THEN m.amount_residual_signed ELSE -m.amount_residual_signed END)
+              FROM account_move m
+              JOIN res_currency c ON c.id = m.currency_id,
+                   LATERAL (SELECT %(today)s - COALESCE(m.invoice_date_due, m.invoice_date, m.date) AS age) a
+             WHERE m.company_id = ANY(%(company_ids)s)
+               AND m.state = 'posted'
+               AND m.payment_state IN ('not_paid', 'partial')
+               AND m.move_type IN %(move_types)s
+          GROUP BY 1, 2, 3
+        """.format(bucket_sql=bucket_sql), {
+            'company_ids': list(company_ids),
+            'today': today,
+            'receivable_types': RECEIVABLE_TYPES,
+            'move_types': RECEIVABLE_TYPES + PAYABLE_TYPES,
+        })
+
+        def empty():
+            return {'count': 0, 'amount': 0.0, 'buckets': dict.fromkeys((key for key, _bound in AGING_BUCKETS), 0.0)}
+
+        result = {side: dict(empty(), currencies=defaultdict(empty)) for side in ('receivable', 'payable')}
+        for currency, receivable, bucket, count, amount, amount_company in self.env.cr.fetchall():
+            side = result['receivable' if receivable else 'payable']
+            side['count'] += count
+            side['amount'] += amount_company or 0.0
+            side['buckets'][bucket] += amount_company or 0.0
+            per_currency = side['currencies'][currency]
+            per_currency['count'] += count
+            per_currency['amount'] += amount or 0.0
+            per_currency['buckets'][bucket] += amount or 0.0
+        for side in result.values():
+            side['currencies'] = dict(side['currencies'])
+        return result
+
+    @api.model
+    def _get_company_aggregates(self, companies):
+        """{company id: aggregates} of ``companies``, read from their dashboard snapshots"""
+        Snapshot = self.env['lms.dashboard.snapshot'].sudo()
+        return {company.id: Snapshot._get_kpis(company).get('finance') or {} for company in companies}
+
+    @api.model
+    def get_aggregates(self):
+        """Finance aggregates of each company selected by the user, with its currency"""
+        if not self.env.user._lms_has_access('finance_overview') or not self.env['account.move'].has_access('read'):
+            raise AccessError(_("You are not allowed to see the finance overview."))
+        aggregates = self._get_company_aggregates(self.env.companies)
+        return {
+            company.id: {
+                'name': company.name,
+                'currency': company.currency_id.name,
+                'finance': aggregates[company.id],
+            }
+            for company in self.env.companies
+        }
@@ -0,0 +1,307 @@
+# -*- coding: utf-8 -*-
+import logging
+import threading
+import time
+import traceback
+from datetime import timedelta
+
+from odoo import models, fields, api, _
+from odoo.exceptions import UserError
+
+_logger = logging.getLogger(__name__)
+
+JOB_NOTIFICATION = 'lms.job/progress'
+DEFAULT_CHUNK_SIZE = 100
+# Bulk actions on more records than this run as a job, see lms.job_sync_limit
+DEFAULT_SYNC_LIMIT = 50
+# Chunks of a channel running at once, see lms.job_channel_limits
+DEFAULT_CHANNEL_LIMIT = 1
+# Delays before the retries of a failed chunk, its attempts are bounded by their number
+RETRY_DELAYS_MINUTES = (1, 5, 15)
+# Seconds a runner works before handing over to a new cron run
+RUNNER_TIME_BUDGET = 240
+# Chunks running for longer are assumed lost with their worker and run again
+STALE_CHUNK_MINUTES = 30
+# Finished jobs still shown on the dashboard
+RECENT_JOB_MINUTES = 10
+# Each runner cron processes one chunk at a time
+RUNNER_CRONS = ('lms.ir_cron_lms_job_runner', 'lms.ir_cron_lms_job_runner_2')
+
+
+class LMSJob(models.Model):
+    """A method of an LMS model run in the background on a set of records.
+
+    The records are split in chunks run by the runner crons, each chunk in
+    its own transaction, as the user who queued the job. Chunks failing are
+    retried with a delay and can be retried by hand once their attempts are
+    exhausted. Jobs of a channel (the model by default) only run as many
+    chunks at once as the channel limit allows.
+    """
+    _name = 'lms.job'
+    _description = 'LMS Background Job'
+    _order = 'id desc'
+
+    name = fields.Char(string="Job", required=True, readonly=True)
+    model_name = fields.Char(string="Model", required=True, readonly=True)
+    method = fields.Char(string="Method", required=True, readonly=True)
+    args = fields.Json(string="Arguments", readonly=True)
+    context = fields.Json(string="Context", readonly=True)
+    channel = fields.Char(string="Channel", required=True, readonly=True, index=True, default='root')
+    user_id = fields.Many2one('res.users', string="Queued By", required=True, readonly=True, index=True,
+                              default=lambda self: self.env.user)
+    state = fields.Selection([
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+        ('cancelled', 'Cancelled'),
+    ], string="Status", default='pending', required=True, readonly=True, index=True)
+    chunk_ids = fields.One2many('lms.job.chunk', 'job_id', string="Chunks", readonly=True)
+    record_count = fields.Integer(string="Records", readonly=True)
+    processed_count = fields.Integer(string="Processed", readonly=True)
+    skipped_count = fields.Integer(string="Skipped", readonly=True,
+                                   help="Records the action left as they were, e.g. not in the right status")
+    progress = fields.Float(string="Progress (%)", compute='_compute_progress')
+    date_done = fields.Datetime(string="Finished On", readonly=True)
+
+    @api.depends('processed_count', 'record_count')
+    def _compute_progress(self):
+        for job in self:
+            job.progress = job.record_count and round(job.processed_count / job.record_count * 100, 1)
+
+    # === Queueing ===
+    @api.model
+    def _enqueue(self, records, method, args=(), name=None, channel=None, chunk_size=DEFAULT_CHUNK_SIZE):
+        """Run ``method`` of ``records`` in the background, ``chunk_size`` records at a time"""
+        if method.startswith('__') or not callable(getattr(records, method, None)):
+            raise UserError(_("%(model)s has no method %(method)s.", model=records._name, method=method))
+        ids = records.ids
+        job = self.sudo().create({
+            'name': name or "%s.%s" % (records._name, method),
+            'model_name': records._name,
+            'method': method,
+            'args': list(args),
+            'context': {key: value for key, value in records.env.context.items()
+                        if key in ('lang', 'tz', 'allowed_company_ids')},
+            'channel': channel or records._name,
+            'user_id': records.env.uid,
+            'record_count': len(ids),
+            'chunk_ids': [(0, 0, {'sequence': index, 'res_ids': ids[start:start + chunk_size]})
+                          for index, start in enumerate(range(0, len(ids), chunk_size))],
+        })
+        job._trigger_runners()
+        job._notify_progress()
+        return job
+
+    @api.model
+    def _get_sync_limit(self):
+        limit = self.env['ir.config_parameter'].sudo().get_param('lms.job_sync_limit')
+        return int(limit) if limit else DEFAULT_SYNC_LIMIT
+
+    @api.model
+    def _get_channel_limits(self):
+        """{channel: chunks running at once}, from ``lms.job_channel_limits`` ("channel:n,...")"""
+        value = self.env['ir.config_parameter'].sudo().get_param('lms.job_channel_limits') or ''
+        limits = {}
+        for item in value.split(','):
+            channel, _sep, limit = item.strip().rpartition(':')
+            if channel and limit.isdigit():
+                limits[channel] = int(limit)
+        return limits
+
+    def _trigger_runners(self, at=None):
+        for xmlid in RUNNER_CRONS:
+            cron = self.env.ref(xmlid, raise_if_not_found=False)
+            if cron:
+                cron._trigger(at)
+
+    # === Running ===
+    @api.model
+    def _cron_run(self):
+        """Run pending chunks, one per transaction, until none is left or the time budget is spent"""
+        auto_commit = not getattr(threading.current_thread(), 'testing', False)
+        Chunk = self.env['lms.job.chunk']
+        Chunk._requeue_stale()
+        started = time.monotonic()
+        while True:
+            chunk = Chunk._claim()
+            if not chunk:
+                return
+            if auto_commit:
+                # other runners must see the chunk running before it ends
+                self.env.cr.commit()
+            chunk._run()
+            if auto_commit:
+                self.env.cr.commit()
+            self.env.invalidate_all()
+            if time.monotonic() - started > RUNNER_TIME_BUDGET:
+                self._trigger_runners()
+                return
+
+    def _update_state(self):
+        for job in self:
+            if job.state == 'cancelled':
+                continue
+            states = set(job.chunk_ids.mapped('state'))
+            if states & {'pending', 'running'}:
+                state = 'running' if states - {'pending'} else 'pending'
+            else:
+                state = 'failed' if 'failed' in states else 'done'
+            vals = {'state': state}
+            if state in ('done', 'failed') and not job.date_done:
+                vals['date_done'] = fields.Datetime.now()
+            job.write(vals)
+
+    # === Progress ===
+    def _progress_values(self):
+        self.ensure_one()
+        return {
+            'id': self.id,
+            'name': self.name,
+            'state': self.state,
+            'records': self.record_count,
+            'processed': self.processed_count,
+            'skipped': self.skipped_count,
+            'progress': self.progress,
+        }
+
+    def _notify_progress(self):
+        """Push the progress of the jobs to the users who queued them"""
+        self.env['bus.bus']._sendmany([
+            (job.user_id.partner_id, JOB_NOTIFICATION, job._progress_values())
+            for job in self
+        ])
+
+    @api.model
+    def get_my_jobs(self):
+        """Progress of the current user's jobs, running or just finished, for the dashboard"""
+        recent = fields.Datetime.now() - timedelta(minutes=RECENT_JOB_MINUTES)
+        jobs = self.sudo().search([
+            ('user_id', '=', self.env.uid),
+            '|', ('state', 'in', ('pending', 'running')), ('date_done', '>=', recent),
+        ], limit=20)
+        return [job._progress_values() for job in jobs]
+
+    # === Actions ===
+    def action_retry(self):
+        """Run the failed chunks again"""
+        chunks = self.chunk_ids.filtered(lambda chunk: chunk.state == 'failed')
+        chunks.write({'state': 'pending', 'attempts': 0, 'date_next': False, 'error': False})
+        jobs = chunks.job_id
+        jobs.write({'date_done': False})
+        jobs._update_state()
+        jobs._trigger_runners()
+        jobs._notify_progress()
+        return True
+
+    def action_cancel(self):
+        """Drop the chunks not run yet; a running chunk finishes"""
+        jobs = self.filtered(lambda job: job.state in ('pending', 'running', 'failed'))
+        jobs.chunk_ids.filtered(lambda chunk: chunk.state in ('pending', 'failed')).write({'state': 'cancelled'})
+        jobs.write({'state': 'cancelled', 'date_done': fields.Datetime.now()})
+        jobs._notify_progress()
+        return True
+
+
+class LMSJobChunk(models.Model):
+    _name = 'lms.job.chunk'
+    _description = 'LMS Background Job Chunk'
+    _order = 'job_id, sequence'
+
+    job_id = fields.Many2one('lms.job', string="Job", required=True, ondelete='cascade', index=True)
+    sequence = fields.Integer(string="Sequence")
+    res_ids = fields.Json(string="Record IDs")
+    state = fields.Selection([
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+        ('cancelled', 'Cancelled'),
+    ], string="Status", default='pending', required=True, index=True)
+    attempts = fields.Integer(string="Attempts")
+    date_next = fields.Datetime(string="Run After")
+    date_started = fields.Datetime(string="Started On")
+    error = fields.Text(string="Error")
+
+    @api.model
+    def _claim(self):
+        """Mark the next chunk whose channel has room running, and return it.
+
+        Claims are serialized with a transaction-level advisory lock, so the
+        channel limits hold with several runners.
+        """
+        self.env.cr.execute("SELECT pg_advisory_xact_lock(hashtext('lms.job.chunk.claim'))")
+        self.env.cr.execute("""
+            SELECT j.channel, COUNT(*)
+              FROM lms_job_chunk c
+              JOIN lms_job j ON j.id = c.job_id
+             WHERE c.state = 'running'
+          GROUP BY j.channel
+        """)
+        limits = self.env['lms.job']._get_channel_limits()
+        full = [channel for channel, running in self.env.cr.fetchall()
+                if running >= limits.get(channel, DEFAULT_CHANNEL_LIMIT)]
+        self.env.cr.execute("""
+            SELECT c.id
+              FROM lms_job_chunk c
+              JOIN lms_job j ON j.id = c.job_id
+             WHERE c.state = 'pending'
+               AND (c.date_next IS NULL OR c.date_next <= now() at time zone 'UTC')
+               AND j.state IN ('pending', 'running')
+               AND NOT j.channel = ANY(%s::varchar[])
+          ORDER BY c.job_id, c.sequence
+             LIMIT 1
+               FOR UPDATE OF c SKIP LOCKED
+        """, [full])
+        row = self.env.cr.fetchone()
+        chunk = self.browse(row[0] if row else ())
+        if chunk:
+            chunk.write({'state': 'running', 'date_started': fields.Datetime.now()})
+            chunk.job_id._update_state()
+        return chunk
+
+    @api.model
+    def _requeue_stale(self):
+        """Put back the chunks whose runner died while running them"""
+        stale = self.search([
+            ('state', '=', 'running'),
+            ('date_started', '<', fields.Datetime.now() - timedelta(minutes=STALE_CHUNK_MINUTES)),
+        ])
+        if stale:
+            _logger.warning("LMS jobs: requeueing %s stale chunks", len(stale))
+            stale.write({'state': 'pending'})
+
+    def _run(self):
+        """Run the job's method on the chunk's records, as the user who queued the job"""
+        self.ensure_one()
+        job = self.job_id
+        env = self.env(user=job.user_id.id, su=False, context=dict(job.context or {}, lms_job_id=job.id))
+        records = env[job.model_name].browse(self.res_ids).exists()
+        try:
+            with self.env.cr.savepoint():
+                result = getattr(records, job.method)(*(job.args or []))
+                records.flush_model()
+        except Exception:
+            self.env.invalidate_all()
+            attempts = self.attempts + 1
+            retry = attempts <= len(RETRY_DELAYS_MINUTES)
+            _logger.warning("LMS job %s: chunk %s failed (attempt %s)", job.id, self.sequence, attempts, exc_info=True)
+            date_next = retry and fields.Datetime.now() + timedelta(minutes=RETRY_DELAYS_MINUTES[attempts - 1])
+            self.write({
+                'state': 'pending' if retry else 'failed',
+                'attempts': attempts,
+                'date_next': date_next,
+                'error': traceback.format_exc(),
+            })
+            if retry:
+                job._trigger_runners(date_next)
+        else:
+            # transitions report the records they skipped
+            skipped = len(result['failed']) if isinstance(result, dict) and 'failed' in result else 0
+            self.write({'state': 'done', 'attempts': self.attempts + 1, 'error': False})
+            job.write({
+                'processed_count': job.processed_count + len(self.res_ids),
+                'skipped_count': job.skipped_count + skipped,
+            })
+        job._update_state()
+        job._notify_progress()
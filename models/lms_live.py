@@ -0,0 +1,146 @@
+# -*- coding: utf-8 -*-
+from collections import defaultdict
+from contextlib import contextmanager
+
+from odoo import models, api
+
+# Channel the dashboard asks for; it is expanded into the private channels below
+LIVE_CHANNEL = 'lms_dashboard'
+LIVE_NOTIFICATION = 'lms.dashboard/delta'
+
+
+class LMSLiveCounterMixin(models.AbstractModel):
+    """Push the changes of the dashboard card counters over the bus.
+
+    Inheriting models declare the counters they feed and the condition a
+    record must meet to be counted::
+
+        _lms_live_counters = {
+            ('dispatch', 'active_trips'): ('status', ('in_progress',)),
+        }
+
+    Creations, deletions and writes of the condition fields become +1/-1
+    deltas, summed per transaction and sent once it commits. Counters on
+    computed fields are not seen by ``write``: the compute method of the
+    inheriting model wraps itself in ``_lms_live_track`` instead.
+    """
+    _name = 'lms.live.counter.mixin'
+    _description = 'LMS Live Dashboard Counter'
+
+    _lms_live_counters = {}
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        records = super().create(vals_list)
+        if self._lms_live_counters:
+            records._lms_live_push({}, records._lms_live_values(self._lms_live_fields(stored_only=True)))
+        return records
+
+    def write(self, vals):
+        fnames = self._lms_live_fields(stored_only='company_id' not in vals)
+        if not self or (fnames.isdisjoint(vals) and 'company_id' not in vals):
+            return super().write(vals)
+        before = self._lms_live_values(fnames)
+        res = super().write(vals)
+        self._lms_live_push(before, self._lms_live_values(fnames))
+        return res
+
+    def unlink(self):
+        if self._lms_live_counters:
+            self._lms_live_push(self._lms_live_values(self._lms_live_fields()), {})
+        return super().unlink()
+
+    @contextmanager
+    def _lms_live_track(self):
+        """Push the counter changes made by the wrapped code, typically a compute method"""
+        fnames = self._lms_live_fields()
+        before = self._lms_live_values(fnames)
+        yield
+        self._lms_live_push(before, self._lms_live_values(fnames))
+
+    @api.model
+    def _lms_live_fields(self, stored_only=False):
+        """Names of the fields the counters depend on; ``stored_only`` leaves out computed ones"""
+        return {
+            fname for fname, _accepted in self._lms_live_counters.values()
+            if not (stored_only and self._fields[fname].compute)
+        }
+
+    def _lms_live_values(self, fnames):
+        """{record id: (company id, counters the record is part of)}"""
+        counters = {key: cond for key, cond in self._lms_live_counters.items() if cond[0] in fnames}
+        has_company = 'company_id' in self._fields
+        return {
+            record.id: (
+                record.company_id.id if has_company else False,
+                frozenset(key for key, (fname, accepted) in counters.items() if record[fname] in accepted),
+            )
+            for record in self.sudo().with_context(active_test=False)
+            if record.id  # onchange records are not counted
+        }
+
+    @api.model
+    def _lms_live_push(self, before, after):
+        deltas = defaultdict(lambda: defaultdict(int))
+        for record_id in set(before) | set(after):
+            old_company, old_keys = before.get(record_id, (False, frozenset()))
+            new_company, new_keys = after.get(record_id, (False, frozenset()))
+            if old_company == new_company and old_keys == new_keys:
+                continue
+            for key in old_keys:
+                deltas[old_company][key] -= 1
+            for key in new_keys:
+                deltas[new_company][key] += 1
+        if deltas:
+            self._lms_live_queue(deltas)
+
+    @api.model
+    def _lms_live_queue(self, deltas):
+        """Add ``deltas`` ({company id: {(section, counter): n}}) to the ones sent at commit"""
+        pending = self.env.cr.precommit.data.get('lms.live.deltas')
+        if pending is None:
+            pending = self.env.cr.precommit.data['lms.live.deltas'] = defaultdict(lambda: defaultdict(int))
+            self.env.cr.precommit.add(self._lms_live_flush)
+        for company_id, counters in deltas.items():
+            for key, delta in counters.items():
+                pending[company_id][key] += delta
+
+    def _lms_live_flush(self):
+        pending = self.env.cr.precommit.data.pop('lms.live.deltas', {})
+        notifications = []
+        for company_id, counters in pending.items():
+            stats = defaultdict(dict)
+            for (section, counter), delta in counters.items():
+                if delta:
+                    stats[section][counter] = delta
+            if stats:
+                notifications.append((
+                    self._lms_live_channel(company_id),
+                    LIVE_NOTIFICATION,
+                    {'company_id': company_id, 'stats': dict(stats)},
+                ))
+        if notifications:
+            self.env['bus.bus']._sendmany(notifications)
+
+    @api.model
+    def _lms_live_channel(self, company_id=False):
+        """Bus channel of the counters of ``company_id``, or of records shared by all companies"""
+        if company_id:
+            return (self.env['res.company'].browse(company_id), LIVE_CHANNEL)
+        return (self.env.ref('base.group_user'), LIVE_CHANNEL)
+
+
+class IrWebsocket(models.AbstractModel):
+    _inherit = 'ir.websocket'
+
+    def _build_bus_channel_list(self, channels):
+        """Give internal users asking for the LMS channel the ones of their companies"""
+        channels = list(channels)
+        if LIVE_CHANNEL in channels:
+            channels.remove(LIVE_CHANNEL)
+            user = self.env.user
+            if user and user._is_internal():
+                Live = self.env['lms.live.counter.mixin']
+                channels.append(Live._lms_live_channel())
+                channels.extend(Live._lms_live_channel(company.id) for company in user.company_ids)
+        return super()._build_bus_channel_list(channels)
@@ -0,0 +1,235 @@
+# -*- coding: utf-8 -*-
+import difflib
+
+from psycopg2.extras import execute_values
+
+from odoo import models, fields, api, tools
+
+from ..tools.route_solver import haversine_km
+
+MATCH_CUTOFF = 0.85
+
+
+def normalize_location_name(value):
+    """Comparable form of a free-text location: lower case, words only"""
+    value = ''.join(char if char.isalnum() else ' ' for char in (value or '').lower())
+    return ' '.join(value.split())
+
+
+class LMSLocation(models.Model):
+    _name = "lms.location"
+    _description = "Logistics Location"
+    _order = "name"
+
+    name = fields.Char(string="Location", required=True)
+    normalized_name = fields.Char(string="Match Key", compute="_compute_normalized_name", store=True, index=True)
+    partner_id = fields.Many2one('res.partner', string="Address")
+    latitude = fields.Float(string="Latitude", digits=(10, 7))
+    longitude = fields.Float(string="Longitude", digits=(10, 7))
+    active = fields.Boolean(string="Active", default=True)
+    distance_version = fields.Integer(
+        string="Distance Version", readonly=True, copy=False,
+        help="Bumped when a stored distance of the location changes, it keys the cached distances",
+    )
+
+    _sql_constraints = [
+        ('normalized_name_uniq', 'unique(normalized_name)', 'This location already exists.'),
+    ]
+
+    @api.depends('name')
+    def _compute_normalized_name(self):
+        for location in self:
+            location.normalized_name = normalize_location_name(location.name)
+
+    def write(self, vals):
+        res = super().write(vals)
+        if 'latitude' in vals or 'longitude' in vals:
+            # computed distances of moved locations are stale
+            self.env['lms.location.distance'].search([
+                ('source', '=', 'computed'),
+                '|', ('from_location_id', 'in', self.ids), ('to_location_id', 'in', self.ids),
+            ]).unlink()
+        return res
+
+    # === Matching ===
+    @api.model
+    def _match_names(self, names, create=False, cutoff=MATCH_CUTOFF):
+        """Resolve free-text names to locations.
+
+        Exact matches on the normalized name come first, then the closest
+        normalized name above ``cutoff``; unmatched names get a new location
+        when ``create`` is set.
+
+        :return: {name: lms.location record (possibly empty)}
+        """
+        keys = {name: normalize_location_name(name) for name in names if name and name.strip()}
+        self.env.cr.execute("SELECT normalized_name, id FROM lms_location WHERE active AND normalized_name IS NOT NULL")
+        known = dict(self.env.cr.fetchall())
+        candidates = list(known)
+
+        result = {}
+        to_create = {}
+        for name, key in keys.items():
+            location_id = known.get(key)
+            if location_id is None:
+                close = difflib.get_close_matches(key, candidates, n=1, cutoff=cutoff)
+                location_id = known[close[0]] if close else None
+            if location_id is None and create:
+                to_create.setdefault(key, name)
+            result[name] = location_id
+
+        if to_create:
+            created = self.create([{'name': name.strip()} for name in to_create.values()])
+            created_ids = dict(zip(to_create, created.ids))
+            for name, key in keys.items():
+                if result[name] is None:
+                    result[name] = created_ids.get(key)
+        return {name: self.browse(location_id or []) for name, location_id in result.items()}
+
+    @api.model
+    def _cron_link_locations(self):
+        """Link the free-text locations of dispatches and LRs to location records"""
+        for model_name in ('route.dispatch', 'lorry.receipt'):
+            Model = self.env[model_name].with_context(active_test=False)
+            for text_field, location_field in (('source_location', 'source_location_id'),
+                                               ('destination_location', 'destination_location_id')):
+                groups = Model._read_group(
+                    [(text_field, '!=', False), (location_field, '=', False)], [text_field],
+                )
+                names = [name for (name,) in groups]
+                for name, location in self._match_names(names, create=True).items():
+                    if location:
+                        Model.search([(text_field, '=', name), (location_field, '=', False)]).write({
+                            location_field: location.id,
+                        })
+
+
+class LMSLocationDistance(models.Model):
+    _name = "lms.location.distance"
+    _description = "Logistics Location Distance"
+    _rec_name = "from_location_id"
+
+    from_location_id = fields.Many2one('lms.location', string="From", required=True, ondelete='cascade')
+    to_location_id = fields.Many2one('lms.location', string="To", required=True, ondelete='cascade', index=True)
+    distance_km = fields.Float(string="Distance (KM)")
+    duration_hours = fields.Float(string="Duration (Hours)")
+    source = fields.Selection([
+        ('computed', 'Computed'),
+        ('manual', 'Manual'),
+    ], string="Source", default='manual', required=True)
+
+    _sql_constraints = [
+        ('pair_uniq', 'unique(from_location_id, to_location_id)', 'This distance is already recorded.'),
+    ]
+
+    @api.model
+    def _get_distance(self, from_location, to_location):
+        """(distance_km, duration_hours) between two locations, or None when unknown.
+
+        Pairs are symmetric. Lookups go through the registry's LRU ormcache,
+        then the stored matrix; missing pairs are computed from the
+        coordinates and stored for every worker when the transaction commits.
+        """
+        if not from_location or not to_location:
+            return None
+        if from_location == to_location:
+            return 0.0, 0.0
+        first, second = sorted((from_location, to_location), key=lambda location: location.id)
+        value, stored = self._get_pair_distance(
+            first.id, second.id, first.latitude, first.longitude, second.latitude, second.longitude,
+            first.distance_version, second.distance_version,
+        )
+        if value is not None and not stored:
+            self._queue_pair_distance(first.id, second.id, value)
+        return value
+
+    @tools.ormcache('first_id', 'second_id', 'first_lat', 'first_lon', 'second_lat', 'second_lon',
+                    'first_version', 'second_version')
+    def _get_pair_distance(self, first_id, second_id, first_lat, first_lon, second_lat, second_lon,
+                           first_version, second_version):
+        """(value, stored) of a pair; the value is None when the pair has no distance nor coordinates"""
+        # coordinates and distance versions are part of the key so moved locations
+        # and edited distances never hit stale entries, which age out of the LRU
+        self.env.cr.execute("""
+            SELECT distance_km, duration_hours
+              FROM lms_location_distance
+             WHERE from_location_id = %s AND to_location_id = %s
+        """, [first_id, second_id])
+        value = self.env.cr.fetchone()
+        if value is not None:
+            return tuple(value), True
+        if not (first_lat or first_lon) or not (second_lat or second_lon):
+            return None, False
+
+        settings = self.env['route.dispatch']._get_route_settings()
+        distance = round(haversine_km(first_lat, first_lon, second_lat, second_lon) * settings['road_factor'], 2)
+        return (distance, round(distance / settings['average_speed'], 2)), False
+
+    @api.model
+    def _queue_pair_distance(self, first_id, second_id, value):
+        """Store a computed distance when the transaction commits.
+
+        A cached pair keeps reporting itself unstored until its entry is
+        evicted, the insert of an already stored pair does nothing.
+        """
+        pending = self.env.cr.precommit.data.get('lms.location.distance')
+        if pending is None:
+            pending = self.env.cr.precommit.data['lms.location.distance'] = {}
+            self.env.cr.precommit.add(self._flush_pair_distances)
+        pending[(first_id, second_id)] = value
+
+    def _flush_pair_distances(self):
+        pending = self.env.cr.precommit.data.pop('lms.location.distance', {})
+        if not pending:
+            return
+        execute_values(self.env.cr._obj, """
+            INSERT INTO lms_location_distance
+                   (from_location_id, to_location_id, distance_km, duration_hours, source,
+                    create_uid, create_date, write_uid, write_date)
+            VALUES %s
+            ON CONFLICT (from_location_id, to_location_id) DO NOTHING
+        """, [
+            (first_id, second_id, distance, duration, 'computed', self.env.uid, self.env.uid)
+            for (first_id, second_id), (distance, duration) in pending.items()
+        ], template="(%s, %s, %s, %s, %s, %s, now() at time zone 'UTC', %s, now() at time zone 'UTC')")
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        # store each pair once, the lowest location id first
+        for vals in vals_list:
+            if vals.get('from_location_id', 0) > vals.get('to_location_id', 0):
+                vals['from_location_id'], vals['to_location_id'] = vals['to_location_id'], vals['from_location_id']
+        records = super().create(vals_list)
+        # pairs cached as unknown or computed are now stored
+        records._bump_distance_versions()
+        return records
+
+    def write(self, vals):
+        if 'from_location_id' in vals or 'to_location_id' in vals:
+            # the pairs the rows leave lose their stored distance
+            self._bump_distance_versions()
+        res = super().write(vals)
+        # cached pairs must be read again from the edited rows
+        self._bump_distance_versions()
+        return res
+
+    def unlink(self):
+        # the locations are read before their rows go away
+        self._bump_distance_versions()
+        return super().unlink()
+
+    def _bump_distance_versions(self):
+        """Move the cached distances of the locations of these pairs to new keys.
+
+        The registry cache cannot drop the entries of one method only, so the
+        versions of the locations key the entries instead.
+        """
+        location_ids = tuple(set(self.from_location_id.ids + self.to_location_id.ids))
+        if not location_ids:
+            return
+        self.env.cr.execute("""
+            UPDATE lms_location
+               SET distance_version = COALESCE(distance_version, 0) + 1
+             WHERE id IN %s
+        """, [location_ids])
+        self.env['lms.location'].browse(location_ids).invalidate_recordset(['distance_version'])
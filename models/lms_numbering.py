@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+import threading
+from collections import deque
+
+from odoo import models, api, _
+
+# Worker-local blocks of reserved sequence numbers for the gap tolerant mode:
+# {(dbname, sequence id, sequence write_date): deque of numbers}.
+# The write_date drops a block as soon as the sequence is reconfigured.
+_NUMBER_BLOCKS = {}
+_NUMBER_BLOCKS_LOCK = threading.Lock()
+
+
+class LMSNumberingMixin(models.AbstractModel):
+    """Assign document numbers in bulk when LMS records are created.
+
+    Inheriting models declare the codes of their ``ir.sequence``, the
+    preferred one first; later codes are older spellings still found in
+    some databases. Records created without a name, or with ``New``, get
+    their number from a single ``nextval`` round trip for the whole batch.
+
+    With ``lms.numbering_block_size`` set, every worker reserves blocks of
+    that many numbers and hands them out from memory. This is gap tolerant:
+    numbers of a block left unused when the worker stops are lost, and
+    concurrent workers issue numbers out of order.
+    """
+    _name = 'lms.numbering.mixin'
+    _description = 'LMS Document Numbering'
+
+    _lms_sequence_codes = ()
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        to_number = [vals for vals in vals_list if vals.get('name', _('New')) in (_('New'), 'New', False)]
+        if to_number and self._lms_sequence_codes:
+            for vals, name in zip(to_number, self._lms_next_names(len(to_number))):
+                vals['name'] = name
+        return super().create(vals_list)
+
+    @api.model
+    def _lms_get_sequence(self):
+        """The sequence numbering this model, created when missing"""
+        IrSequence = self.env['ir.sequence'].sudo()
+        company_id = self.env.company.id
+        sequences = IrSequence.search([
+            ('code', 'in', self._lms_sequence_codes),
+            ('company_id', 'in', [company_id, False]),
+        ], order='company_id')
+        if sequences:
+            # the preferred code first, then the company specific sequence
+            return min(sequences, key=lambda seq: (self._lms_sequence_codes.index(seq.code), not seq.company_id))
+        return IrSequence.create({
+            'name': self._description,
+            'code': self._lms_sequence_codes[0],
+            'padding': 5,
+            'company_id': False,
+        })
+
+    @api.model
+    def _lms_next_names(self, count):
+        """Return ``count`` new document numbers"""
+        sequence = self._lms_get_sequence()
+        if sequence.implementation != 'standard' or sequence.use_date_range:
+            # gapless and date range sequences lock their row, one at a time
+            return [sequence._next() for _i in range(count)]
+
+        block_size = int(self.env['ir.config_parameter'].sudo().get_param('lms.numbering_block_size') or 0)
+        if block_size > 0:
+            numbers = self._lms_take_from_block(sequence, count, block_size)
+        else:
+            numbers = self._lms_reserve_numbers(sequence, count)
+        return [sequence.get_next_char(number) for number in numbers]
+
+    @api.model
+    def _lms_reserve_numbers(self, sequence, count):
+        """Draw ``count`` numbers from the sequence with one nextval round trip"""
+        self.env.cr.execute(
+            "SELECT nextval(%s) FROM generate_series(1, %s)",
+            ['ir_sequence_%03d' % sequence.id, count],
+        )
+        return [number for (number,) in self.env.cr.fetchall()]
+
+    @api.model
+    def _lms_take_from_block(self, sequence, count, block_size):
+        key = (self.env.cr.dbname, sequence.id, sequence.write_date)
+        with _NUMBER_BLOCKS_LOCK:
+            block = _NUMBER_BLOCKS.get(key)
+            if block is None:
+                for stale in [k for k in _NUMBER_BLOCKS if k[:2] == key[:2]]:
+                    del _NUMBER_BLOCKS[stale]
+                block = _NUMBER_BLOCKS[key] = deque()
+            if len(block) < count:
+                needed = count - len(block)
+                block.extend(self._lms_reserve_numbers(sequence, -(-needed // block_size) * block_size))
+            return [block.popleft() for _i in range(count)]
@@ -0,0 +1,174 @@
+# -*- coding: utf-8 -*-
+import logging
+from datetime import timedelta
+
+from odoo import models, fields, api, tools
+
+from ..tools.utilization import day_start, local_day
+
+_logger = logging.getLogger(__name__)
+
+# Days rebuilt by one statement during a full rebuild
+REBUILD_CHUNK_DAYS = 31
+
+
+class LMSOperationsDaily(models.Model):
+    """Completed trips and dispatches summed per day, vehicle and driver.
+
+    Rows are recomputed from the source documents for every (day, vehicle)
+    touched by a transaction when it commits, so the table stays exact
+    without ever being scanned whole. Dispatch drivers are employees and
+    are reported through their work contact, like trip sheet drivers.
+    """
+    _name = 'lms.operations.daily'
+    _description = 'LMS Daily Operations'
+    _order = 'date desc, vehicle_id, driver_id'
+    _rec_name = 'date'
+
+    date = fields.Date(string="Date", required=True, index=True)
+    vehicle_id = fields.Many2one('fleet.vehicle', string="Vehicle", ondelete='cascade', index=True)
+    driver_id = fields.Many2one('res.partner', string="Driver", ondelete='set null', index='btree_not_null')
+    company_id = fields.Many2one(related='vehicle_id.company_id', store=True, index=True)
+    trip_count = fields.Integer(string="Trips")
+    trip_distance = fields.Float(string="Trip Distance (km)")
+    trip_hours = fields.Float(string="Trip Hours")
+    dispatch_count = fields.Integer(string="Dispatches")
+    dispatch_distance = fields.Float(string="Dispatch Distance (km)")
+    fuel_liters = fields.Float(string="Fuel Consumed (L)")
+    mileage = fields.Float(string="Mileage (KM/L)", aggregator='avg',
+                           help="Average of the mileage recorded on the dispatches")
+
+    def init(self):
+        super().init()
+        # one row per key, vehicles and drivers being optional on dispatches
+        tools.create_unique_index(self.env.cr, 'lms_operations_daily_key_uniq', self._table,
+                                  ['date', 'COALESCE(vehicle_id, 0)', 'COALESCE(driver_id, 0)'])
+
+    # === Refreshing ===
+    @api.model
+    def _refresh(self, date_from, date_to, vehicle_days=None):
+        """Recompute the rows of [date_from, date_to].
+
+        :param vehicle_days: optional set of (day, vehicle_id or 0) to limit
+                             the refresh to, within the date range
+        """
+        Utilization = self.env['lms.vehicle.utilization']
+        tz = Utilization._get_timezone()
+        self.env['trip.sheet'].flush_model()
+        self.env['route.dispatch'].flush_model()
+        params = {
+            'tz': tz.zone,
+            'date_from': date_from,
+            'date_to': date_to,
+            'start': day_start(date_from, tz),
+            'end': day_start(date_to + timedelta(days=1), tz),
+            'days': [day for day, _vehicle in vehicle_days or ()],
+            'vehicles': [vehicle for _day, vehicle in vehicle_days or ()],
+            'uid': self.env.uid,
+        }
+        keys = """
+            AND (%s, COALESCE(%s, 0)) IN (SELECT * FROM unnest(%%(days)s::date[], %%(vehicles)s::int[]))
+        """
+        self.env.cr.execute("""
+            DELETE FROM lms_operations_daily
+             WHERE date BETWEEN %(date_from)s AND %(date_to)s
+                   {keys}
+        """.format(keys=keys % ('date', 'vehicle_id') if vehicle_days is not None else ''), params)
+
+        trip_day = "(t.date_start AT TIME ZONE 'UTC' AT TIME ZONE %(tz)s)::date"
+        dispatch_day = "(d.dispatch_date AT TIME ZONE 'UTC' AT TIME ZONE %(tz)s)::date"
+        self.env.cr.execute("""
+            INSERT INTO lms_operations_daily
+                   (date, vehicle_id, driver_id, company_id, trip_count, trip_distance, trip_hours,
+                    dispatch_count, dispatch_distance, fuel_liters, mileage,
+                    create_uid, create_date, write_uid, write_date)
+            SELECT ops.day, ops.vehicle_id, ops.driver_id, MAX(v.company_id),
+                   SUM(ops.trip_count), SUM(ops.trip_distance), SUM(ops.trip_hours),
+                   SUM(ops.dispatch_count), SUM(ops.dispatch_distance), SUM(ops.fuel_liters), AVG(ops.mileage),
+                   %(uid)s, now() at time zone 'UTC', %(uid)s, now() at time zone 'UTC'
+              FROM (
+                    SELECT {trip_day} AS day, t.vehicle_id, t.driver_id,
+                           1 AS trip_count, COALESCE(t.total_distance, 0) AS trip_distance,
+                           COALESCE(t.duration_hours, 0) AS trip_hours,
+                           0 AS dispatch_count, 0 AS dispatch_distance, 0 AS fuel_liters, NULL::float AS mileage
+                      FROM trip_sheet t
+                     WHERE t.status = 'completed'
+                       AND t.date_start >= %(start)s AND t.date_start < %(end)s
+                           {trip_keys}
+                 UNION ALL
+                    SELECT {dispatch_day}, d.vehicle_id, e.work_contact_id,
+                           0, 0, 0,
+                           1, COALESCE(d.distance_km, 0), COALESCE(d.total_fuel, 0), NULLIF(d.mileage, 0)
+                      FROM route_dispatch d
+                 LEFT JOIN hr_employee e ON e.id = d.driver_id
+                     WHERE d.status = 'completed'
+                       AND d.dispatch_date >= %(start)s AND d.dispatch_date < %(end)s
+                           {dispatch_keys}
+                   ) ops
+         LEFT JOIN fleet_vehicle v ON v.id = ops.vehicle_id
+          GROUP BY ops.day, ops.vehicle_id, ops.driver_id
+            ON CONFLICT (date, COALESCE(vehicle_id, 0), COALESCE(driver_id, 0)) DO UPDATE
+               SET trip_count = EXCLUDED.trip_count,
+                   trip_distance = EXCLUDED.trip_distance,
+                   trip_hours = EXCLUDED.trip_hours,
+                   dispatch_count = EXCLUDED.dispatch_count,
+                   dispatch_distance = EXCLUDED.dispatch_distance,
+                   fuel_liters = EXCLUDED.fuel_liters,
+                   mileage = EXCLUDED.mileage,
+                   write_date = EXCLUDED.write_date
+        """.format(
+            trip_day=trip_day,
+            dispatch_day=dispatch_day,
+            trip_keys=keys % (trip_day, 't.vehicle_id') if vehicle_days is not None else '',
+            dispatch_keys=keys % (dispatch_day, 'd.vehicle_id') if vehicle_days is not None else '',
+        ), params)
+        self.invalidate_model()
+
+    @api.model
+    def _rebuild(self, date_from=None, date_to=None):
+        """Recompute the whole rollup, or the days in [date_from, date_to], a month at a time"""
+        tz = self.env['lms.vehicle.utilization']._get_timezone()
+        if not date_from or not date_to:
+            self.env.cr.execute("""
+                SELECT LEAST(t.first, d.first), GREATEST(t.last, d.last)
+                  FROM (SELECT MIN(date_start), MAX(date_start) FROM trip_sheet WHERE status = 'completed') t (first, last),
+                       (SELECT MIN(dispatch_date), MAX(dispatch_date) FROM route_dispatch WHERE status = 'completed') d (first, last)
+            """)
+            first, last = self.env.cr.fetchone()
+            if not first:
+                self.env.cr.execute("DELETE FROM lms_operations_daily")
+                return
+            date_from = date_from or local_day(first, tz)
+            date_to = date_to or local_day(last, tz)
+            self.env.cr.execute("DELETE FROM lms_operations_daily WHERE date < %s OR date > %s", [date_from, date_to])
+        chunk_start = date_from
+        while chunk_start <= date_to:
+            chunk_end = min(date_to, chunk_start + timedelta(days=REBUILD_CHUNK_DAYS - 1))
+            self._refresh(chunk_start, chunk_end)
+            _logger.info("LMS operations rollup rebuilt from %s to %s", chunk_start, chunk_end)
+            chunk_start = chunk_end + timedelta(days=1)
+
+    def action_rebuild(self):
+        """Server action entry point: rebuild the whole rollup"""
+        self.sudo()._rebuild()
+        return {'type': 'ir.actions.client', 'tag': 'soft_reload'}
+
+    # === Invalidation ===
+    @api.model
+    def _queue_records(self, records, date_field):
+        """Refresh at commit the (day, vehicle) rows ``records`` count in, as they are now"""
+        tz = self.env['lms.vehicle.utilization']._get_timezone()
+        pending = self.env.cr.precommit.data.get('lms.operations.dirty')
+        if pending is None:
+            pending = self.env.cr.precommit.data['lms.operations.dirty'] = set()
+            self.env.cr.precommit.add(self._flush_dirty)
+        for record in records.sudo():
+            moment = record[date_field]
+            if moment:
+                pending.add((local_day(moment, tz), record.vehicle_id.id or 0))
+
+    def _flush_dirty(self):
+        pending = self.env.cr.precommit.data.pop('lms.operations.dirty', set())
+        if pending:
+            days = [day for day, _vehicle in pending]
+            self._refresh(min(days), max(days), pending)
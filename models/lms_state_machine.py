@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+from odoo import models, _
+
+
+class LMSStateMachineMixin(models.AbstractModel):
+    """Batched status transitions for LMS documents.
+
+    Inheriting models declare their transitions in ``_lms_transitions``::
+
+        _lms_transitions = {
+            'start': {
+                'from': ('draft',),          # allowed source statuses
+                'to': 'in_progress',         # target status
+                'message': "Trip %(name)s started.",  # optional chatter note, translated
+                'error': "Only draft trips can be started.",  # optional, translated
+            },
+        }
+
+    The whole recordset is validated up front, the valid records are moved
+    with a single ``write`` and their chatter notes are inserted in bulk.
+    """
+    _name = 'lms.state.machine.mixin'
+    _description = 'LMS Status Transitions'
+
+    _lms_transitions = {}
+
+    def _lms_transition_values(self, transition):
+        """Extra values written along with the target status of ``transition``"""
+        return {}
+
+    def _lms_apply_transition(self, transition):
+        """Apply ``transition`` to every record allowed to take it.
+
+        :return: dict with ``done`` (the transitioned records) and ``failed``
+                 ({record id: reason}) instead of aborting on the first error
+        """
+        spec = self._lms_transitions[transition]
+        done = self.filtered(lambda rec: rec.status in spec['from'])
+        failed = {}
+        for record in self - done:
+            failed[record.id] = _(spec['error']) if spec.get('error') else _(
+                "%(name)s cannot go from %(status)s to %(target)s.",
+                name=record.display_name, status=record.status, target=spec['to'],
+            )
+
+        if done:
+            vals = dict(self._lms_transition_values(transition), status=spec['to'])
+            done.write(vals)
+            if spec.get('message') and hasattr(done, '_message_log_batch'):
+                message = _(spec['message'])
+                done._message_log_batch(bodies={
+                    record.id: message % {'name': record.name}
+                    for record in done
+                })
+        return {'done': done, 'failed': failed}
+
+    def _lms_should_enqueue(self):
+        """Whether a bulk action on these records should run as a background job"""
+        return not self.env.context.get('lms_job_id') and len(self) > self.env['lms.job']._get_sync_limit()
+
+    def _lms_enqueue(self, method, args=(), name=None):
+        """Queue ``method`` of the records as a background job and tell the user"""
+        job = self.env['lms.job']._enqueue(self, method, args, name=name)
+        return {
+            'type': 'ir.actions.client',
+            'tag': 'display_notification',
+            'params': {
+                'type': 'info',
+                'title': _("Running in the background"),
+                'message': _("%(job)s: %(count)s records queued, the LMS dashboard shows the progress.",
+                             job=job.name, count=job.record_count),
+                'sticky': False,
+            },
+        }
+
+    def _lms_run_transition(self, transition):
+        """Button entry point: apply ``transition`` and report skipped records.
+
+        Selections larger than ``lms.job_sync_limit`` are transitioned by a
+        background job instead.
+        """
+        if self._lms_should_enqueue():
+            return self._lms_enqueue('_lms_apply_transition', [transition],
+                                     name="%s: %s" % (self._description, transition))
+        result = self._lms_apply_transition(transition)
+        if not result['failed']:
+            return True
+        names = {record.id: record.display_name for record in self}
+        return {
+            'type': 'ir.actions.client',
+            'tag': 'display_notification',
+            'params': {
+                'type': 'warning',
+                'title': _("%(failed)s of %(total)s records skipped", failed=len(result['failed']), total=len(self)),
+                'message': "\n".join(
+                    "%s: %s" % (names[record_id], reason) for record_id, reason in result['failed'].items()
+                ),
+                'sticky': False,
+                'next': {'type': 'ir.actions.client', 'tag': 'soft_reload'},
+            },
+        }
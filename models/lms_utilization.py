@@ -0,0 +1,220 @@
+# -*- coding: utf-8 -*-
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+
+import pytz
+from psycopg2.extras import execute_values
+
+from odoo import models, fields, api
+
+from ..tools.utilization import busy_hours_by_day, day_start, local_day, trips_by_day
+
+# Days rolled up by one cron run while catching up, the cron retriggers itself for the rest
+ROLLUP_CHUNK_DAYS = 31
+DEFAULT_BACKFILL_DAYS = 365
+
+
+class LMSVehicleUtilization(models.Model):
+    """Daily rollup of the busy hours of every vehicle.
+
+    A row is kept per vehicle and local day with trips in progress or
+    completed on it; days without a row were idle. The rollup covers every
+    day up to ``lms.utilization_rollup_date`` and is kept exact for those
+    days when trip sheets change. Later days are computed from the trip
+    sheets when reported.
+    """
+    _name = 'lms.vehicle.utilization'
+    _description = 'LMS Vehicle Daily Utilization'
+    _order = 'date desc, vehicle_id'
+    _rec_name = 'vehicle_id'
+
+    vehicle_id = fields.Many2one('fleet.vehicle', string="Vehicle", required=True, ondelete='cascade', index=True)
+    date = fields.Date(string="Date", required=True, index=True)
+    busy_hours = fields.Float(string="Busy Hours", digits=(16, 2))
+    trip_count = fields.Integer(string="Trips")
+    utilization = fields.Float(string="Utilization (%)", digits=(16, 1), aggregator='avg')
+    company_id = fields.Many2one(related='vehicle_id.company_id', store=True, index=True)
+
+    _sql_constraints = [
+        ('vehicle_date_uniq', 'unique(vehicle_id, date)', 'Only one utilization row per vehicle and day is allowed.'),
+    ]
+
+    # === Configuration ===
+    @api.model
+    def _get_timezone(self):
+        """Timezone of the day boundaries, ``lms.utilization_timezone`` or UTC"""
+        name = self.env['ir.config_parameter'].sudo().get_param('lms.utilization_timezone')
+        return pytz.timezone(name or 'UTC')
+
+    @api.model
+    def _get_rollup_date(self):
+        """Last day covered by the rollup, or None before the first run"""
+        value = self.env['ir.config_parameter'].sudo().get_param('lms.utilization_rollup_date')
+        return fields.Date.to_date(value) if value else None
+
+    # === Computation ===
+    @api.model
+    def _compute_busy(self, date_from, date_to, vehicle_ids=None):
+        """Busy hours and trips of each vehicle and local day from the trip sheets.
+
+        Trips in progress are busy until now; draft and cancelled ones are
+        ignored.
+
+        :return: {(vehicle_id, day): (hours, trip count)} for days in [date_from, date_to]
+        """
+        tz = self._get_timezone()
+        where = "AND vehicle_id = ANY(%(vehicle_ids)s)" if vehicle_ids is not None else ""
+        self.env['trip.sheet'].flush_model(['vehicle_id', 'date_start', 'date_end', 'status'])
+        self.env.cr.execute("""
+            SELECT vehicle_id, date_start,
+                   COALESCE(date_end, CASE WHEN status = 'in_progress' THEN now() at time zone 'UTC' END)
+              FROM trip_sheet
+             WHERE status IN ('in_progress', 'completed')
+               AND date_start < %(end)s
+               AND COALESCE(date_end, now() at time zone 'UTC') > %(start)s
+                   {where}
+        """.format(where=where), {
+            'start': day_start(date_from, tz),
+            'end': day_start(date_to + timedelta(days=1), tz),
+            'vehicle_ids': list(vehicle_ids or ()),
+        })
+        intervals = defaultdict(list)
+        for vehicle_id, start, end in self.env.cr.fetchall():
+            if end:
+                intervals[vehicle_id].append((start, end))
+
+        busy = {}
+        for vehicle_id, trips in intervals.items():
+            counts = trips_by_day(trips, tz, date_from, date_to)
+            for day, hours in busy_hours_by_day(trips, tz, date_from, date_to).items():
+                busy[vehicle_id, day] = (hours, counts.get(day, 0))
+        return busy
+
+    @api.model
+    def _rollup(self, date_from, date_to, vehicle_ids=None):
+        """Recompute the rollup rows of [date_from, date_to], for ``vehicle_ids`` or every vehicle"""
+        busy = self._compute_busy(date_from, date_to, vehicle_ids)
+        where = "AND vehicle_id = ANY(%(vehicle_ids)s)" if vehicle_ids is not None else ""
+        self.env.cr.execute("""
+            DELETE FROM lms_vehicle_utilization
+             WHERE date BETWEEN %(date_from)s AND %(date_to)s
+                   {where}
+        """.format(where=where), {'date_from': date_from, 'date_to': date_to, 'vehicle_ids': list(vehicle_ids or ())})
+        if busy:
+            now = fields.Datetime.now()
+            # the company is a stored related field, filled here along with the row
+            vehicles = self.env['fleet.vehicle'].with_context(active_test=False).browse({key[0] for key in busy})
+            companies = {vehicle.id: vehicle.company_id.id or None for vehicle in vehicles.sudo()}
+            execute_values(self.env.cr._obj, """
+                INSERT INTO lms_vehicle_utilization
+                       (vehicle_id, date, busy_hours, trip_count, utilization, company_id,
+                        create_uid, create_date, write_uid, write_date)
+                VALUES %s
+                ON CONFLICT (vehicle_id, date) DO UPDATE
+                   SET busy_hours = EXCLUDED.busy_hours,
+                       trip_count = EXCLUDED.trip_count,
+                       utilization = EXCLUDED.utilization,
+                       write_date = EXCLUDED.write_date
+            """, [
+                (vehicle_id, day, round(hours, 2), trips, round(min(hours, 24) / 24 * 100, 1),
+                 companies.get(vehicle_id), self.env.uid, now, self.env.uid, now)
+                for (vehicle_id, day), (hours, trips) in busy.items()
+            ], page_size=1000)
+        self.invalidate_model()
+
+    @api.model
+    def _cron_rollup(self):
+        """Roll up the days closed since the last run, catching up a chunk at a time"""
+        tz = self._get_timezone()
+        yesterday = datetime.now(tz).date() - timedelta(days=1)
+        last = self._get_rollup_date()
+        if last is None:
+            backfill = int(self.env['ir.config_parameter'].sudo().get_param(
+                'lms.utilization_backfill_days', DEFAULT_BACKFILL_DAYS))
+            last = yesterday - timedelta(days=backfill)
+        if last >= yesterday:
+            return
+        date_from = last + timedelta(days=1)
+        date_to = min(yesterday, date_from + timedelta(days=ROLLUP_CHUNK_DAYS - 1))
+        self._rollup(date_from, date_to)
+        self.env['ir.config_parameter'].sudo().set_param('lms.utilization_rollup_date', fields.Date.to_string(date_to))
+        if date_to < yesterday:
+            self.env.ref('lms.ir_cron_lms_utilization_rollup')._trigger()
+
+    # === Invalidation ===
+    @api.model
+    def _queue_trips(self, trips):
+        """Recompute at commit the rolled up days touched by ``trips`` as they are now"""
+        tz = self._get_timezone()
+        now = fields.Datetime.now()
+        pending = self.env.cr.precommit.data.get('lms.utilization.dirty')
+        if pending is None:
+            pending = self.env.cr.precommit.data['lms.utilization.dirty'] = {}
+            self.env.cr.precommit.add(self._flush_dirty)
+        for trip in trips.sudo():
+            if not trip.vehicle_id or not trip.date_start:
+                continue
+            first = local_day(trip.date_start, tz)
+            last = local_day(max(trip.date_end or now, trip.date_start), tz)
+            span = pending.get(trip.vehicle_id.id)
+            pending[trip.vehicle_id.id] = (min(first, span[0]), max(last, span[1])) if span else (first, last)
+
+    def _flush_dirty(self):
+        pending = self.env.cr.precommit.data.pop('lms.utilization.dirty', {})
+        last = self._get_rollup_date()
+        if not pending or last is None:
+            return
+        spans = [(first, min(end, last)) for first, end in pending.values() if first <= last]
+        if spans:
+            self._rollup(min(span[0] for span in spans), max(span[1] for span in spans), list(pending))
+
+    # === Reporting ===
+    @api.model
+    def _get_utilization(self, date_from, date_to, vehicles):
+        """Busy hours of ``vehicles`` over the local days [date_from, date_to].
+
+        Rolled up days are read from the rollup and later ones computed from
+        the trip sheets; today counts up to now.
+
+        :return: {'vehicles': {vehicle_id: {'busy_hours', 'utilization'}},
+                  'fleet': {'busy_hours', 'available_hours', 'utilization'}}
+        """
+        tz = self._get_timezone()
+        now = fields.Datetime.now()
+        period_start = day_start(date_from, tz)
+        period_end = min(day_start(date_to + timedelta(days=1), tz), now)
+        available = max(0.0, (period_end - period_start).total_seconds() / 3600)
+
+        busy = defaultdict(float)
+        last = self._get_rollup_date() or date.min
+        if date_from <= last:
+            groups = self.sudo()._read_group(
+                [('date', '>=', date_from), ('date', '<=', min(date_to, last)), ('vehicle_id', 'in', vehicles.ids)],
+                ['vehicle_id'],
+                ['busy_hours:sum'],
+            )
+            for vehicle, hours in groups:
+                busy[vehicle.id] += hours
+        if date_to > last:
+            live = self._compute_busy(max(date_from, last + timedelta(days=1)), date_to, vehicles.ids)
+            for (vehicle_id, _day), (hours, _trips) in live.items():
+                busy[vehicle_id] += hours
+
+        def share(hours, total):
+            return round(hours / total * 100, 1) if total else 0
+
+        fleet_busy = sum(busy.values())
+        return {
+            'vehicles': {
+                vehicle.id: {
+                    'busy_hours': round(busy[vehicle.id], 2),
+                    'utilization': share(busy[vehicle.id], available),
+                }
+                for vehicle in vehicles
+            },
+            'fleet': {
+                'busy_hours': round(fleet_busy, 2),
+                'available_hours': round(available * len(vehicles), 2),
+                'utilization': share(fleet_busy, available * len(vehicles)),
+            },
+        }
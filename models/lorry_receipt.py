@@ -1,32 +1,48 @@
 # -*- coding: utf-8 -*-
-from odoo import models, fields, api
-from datetime import datetime
+from odoo import models, fields, api, tools, _
 
 class LorryReceipt(models.Model):
     _name = "lorry.receipt"
     _description = "Lorry Receipt (LR)"
-    _inherit = ['mail.thread', 'mail.activity.mixin']
+    _inherit = ['mail.thread', 'mail.activity.mixin', 'lms.state.machine.mixin', 'lms.numbering.mixin',
+                'lms.live.counter.mixin']
+    _lms_sequence_codes = ('lms.lorry.receipt',)
+    _lms_live_counters = {
+        ('dispatch', 'pending_lr'): ('status', ('draft',)),
+    }
+    _lms_transitions = {
+        'dispatch': {'from': ('draft',), 'to': 'dispatched',
+                     'message': "📦 LR %(name)s dispatched.",
+                     'error': "Only draft LRs can be dispatched."},
+        'deliver': {'from': ('dispatched', 'in_transit'), 'to': 'delivered',
+                    'message': "✅ LR %(name)s delivered successfully.",
+                    'error': "Only dispatched or in transit LRs can be delivered."},
+    }
 
     name = fields.Char(
         string="LR No",
         required=True,
         copy=False,
         readonly=True,
-        default=lambda self: self.env['ir.sequence'].next_by_code('lms.lorry.receipt')
+        default=lambda self: _('New')
     )
 
-    dispatch_id = fields.Many2one('route.dispatch', string="Dispatch", ondelete="cascade", tracking=True)
-    date = fields.Datetime(string="LR Date", default=fields.Datetime.now, tracking=True)
+    dispatch_id = fields.Many2one('route.dispatch', string="Dispatch", ondelete="cascade", index='btree_not_null', tracking=True)
+    date = fields.Datetime(string="LR Date", default=fields.Datetime.now, index=True, tracking=True)
 
     # Consignor & Consignee Info
     consignor = fields.Char(string="Consignor Name", tracking=True)
     consignee = fields.Char(string="Consignee Name", tracking=True)
     consignee_address = fields.Text(string="Consignee Address")
+    consignor_gstin = fields.Char(string="Consignor GSTIN", help="Leave empty for an unregistered consignor")
+    consignee_gstin = fields.Char(string="Consignee GSTIN", help="Leave empty for an unregistered consignee")
 
     # Route/Transport Info
-    source_location = fields.Char(string="Source")
-    destination_location = fields.Char(string="Destination")
-    vehicle_id = fields.Many2one('fleet.vehicle', string="Vehicle")
+    source_location_id = fields.Many2one('lms.location', string="Source Location", index=True)
+    destination_location_id = fields.Many2one('lms.location', string="Destination Location", index=True)
+    source_location = fields.Char(string="Source", compute="_compute_location_names", store=True, readonly=False)
+    destination_location = fields.Char(string="Destination", compute="_compute_location_names", store=True, readonly=False)
+    vehicle_id = fields.Many2one('fleet.vehicle', string="Vehicle", index='btree_not_null')
     driver_id = fields.Many2one('hr.employee', string="Driver")
 
     # Goods Info
@@ -52,6 +68,16 @@ class LorryReceipt(models.Model):
     delivery_date = fields.Datetime(string="Delivery Date")
     remarks = fields.Text(string="Remarks")
 
+    def init(self):
+        super().init()
+        tools.create_index(self.env.cr, 'lorry_receipt_lms_open_status_idx', self._table,
+                           ['status', 'date'], where="status IN ('draft', 'dispatched', 'in_transit')")
+        # draft LRs still waiting for a dispatch, the load planner's input
+        tools.create_index(self.env.cr, 'lorry_receipt_lms_unplanned_idx', self._table,
+                           ['date'], where="status = 'draft' AND dispatch_id IS NULL")
+        # the activity stream pages through the latest changes
+        tools.create_index(self.env.cr, 'lorry_receipt_lms_write_date_idx', self._table, ['write_date', 'id'])
+
     # Compute helper (for dashboard count etc.)
     @api.depends('status')
     def _compute_status_color(self):
@@ -66,18 +92,39 @@ class LorryReceipt(models.Model):
 
     status_color = fields.Char(string="Status Color", compute="_compute_status_color")
 
+    @api.depends('source_location_id.name', 'destination_location_id.name')
+    def _compute_location_names(self):
+        for rec in self:
+            rec.source_location = rec.source_location_id.name or rec.source_location
+            rec.destination_location = rec.destination_location_id.name or rec.destination_location
+
     # Button Actions
+    def _lms_transition_values(self, transition):
+        if transition == 'deliver':
+            return {'delivery_date': fields.Datetime.now()}
+        return super()._lms_transition_values(transition)
+
     def action_dispatch(self):
-        for rec in self:
-            rec.status = 'dispatched'
-            rec.dispatch_id = self.env['route.dispatch'].search([], limit=1)
-            rec.message_post(body=f"📦 LR {rec.name} dispatched.")
+        # LRs without a dispatch are loaded onto open dispatches first, the
+        # whole selection in one plan; large selections are then dispatched
+        # by a background job
+        unplanned = self.filtered(lambda rec: rec.status == 'draft' and not rec.dispatch_id)
+        if unplanned:
+            planner = self.env['lms.load.planner'].create({'lr_ids': [(6, 0, unplanned.ids)]})
+            planner._plan()
+            planner._apply_plan()
+        return self._lms_run_transition('dispatch')
+
+    def action_plan_loads(self):
+        """Open the load planner to preview the dispatch of the selected LRs"""
+        planner = self.env['lms.load.planner'].create({
+            'lr_ids': [(6, 0, self.filtered(lambda rec: rec.status == 'draft').ids)],
+        })
+        planner._plan()
+        return planner._reopen()
 
     def action_mark_delivered(self):
-        for rec in self:
-            rec.status = 'delivered'
-            rec.delivery_date = fields.Datetime.now()
-            rec.message_post(body=f"✅ LR {rec.name} delivered successfully.")
+        return self._lms_run_transition('deliver')
 
 # # -*- coding: utf-8 -*-
 # from odoo import models, fields
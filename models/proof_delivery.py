@@ -1,12 +1,30 @@
 # -*- coding: utf-8 -*-
-from odoo import models, fields, api, _
-from datetime import datetime
+from odoo import models, fields, tools, _
+from odoo.exceptions import UserError
+from odoo.tools.image import image_process
+
+# Binary fields served by the POD download and thumbnail routes
+POD_BINARY_FIELDS = ('pod_document', 'signature')
+THUMBNAIL_SIZE = (256, 256)
 
 class ProofOfDelivery(models.Model):
     _name = "proof.delivery"
     _description = "Proof of Delivery (POD)"
+    _inherit = ['lms.state.machine.mixin', 'lms.numbering.mixin', 'lms.live.counter.mixin']
+    _lms_sequence_codes = ('lms.proof.delivery', 'proof.delivery')
+    _lms_live_counters = {
+        ('dispatch', 'pending_pod'): ('status', ('draft',)),
+    }
     _rec_name = "name"
-    _order = "delivery_date desc"
+    _order = "delivery_date desc, id desc"
+    _lms_transitions = {
+        'deliver': {'from': ('draft',), 'to': 'delivered',
+                    'error': "Only draft PODs can be marked as delivered."},
+        'verify': {'from': ('delivered',), 'to': 'verified',
+                   'error': "Only delivered PODs can be verified."},
+        'cancel': {'from': ('draft', 'delivered'), 'to': 'cancelled',
+                   'error': "Verified or cancelled PODs cannot be cancelled."},
+    }
 
     # POD Reference (Auto Sequence)
     name = fields.Char(
@@ -14,22 +32,24 @@ class ProofOfDelivery(models.Model):
         required=True,
         copy=False,
         readonly=True,
-        default=lambda self: self.env['ir.sequence'].next_by_code('lms.proof.delivery')
+        default=lambda self: _('New')
     )
 
     # Relationships
-    dispatch_id = fields.Many2one('route.dispatch', string="Dispatch", ondelete="set null")
-    lorry_receipt_id = fields.Many2one('lorry.receipt', string="Lorry Receipt (LR)", ondelete="set null")
+    dispatch_id = fields.Many2one('route.dispatch', string="Dispatch", ondelete="set null", index='btree_not_null')
+    lorry_receipt_id = fields.Many2one('lorry.receipt', string="Lorry Receipt (LR)", ondelete="set null", index='btree_not_null')
 
     # Delivery Details
     received_by = fields.Char(string="Received By", required=True)
-    delivery_date = fields.Datetime(string="Delivery Date", default=lambda self: fields.Datetime.now())
+    delivery_date = fields.Datetime(string="Delivery Date", default=lambda self: fields.Datetime.now(), index=True)
     remarks = fields.Text(string="Remarks")
 
-    # Supporting Evidence
-    pod_document = fields.Binary(string="POD Document (e.g., Signed Copy)")
+    # Supporting Evidence (kept in the filestore, never in the proof_delivery table)
+    pod_document = fields.Binary(string="POD Document (e.g., Signed Copy)", attachment=True)
     pod_filename = fields.Char(string="File Name")
-    signature = fields.Binary(string="Receiver Signature")
+    signature = fields.Binary(string="Receiver Signature", attachment=True)
+    pod_document_thumbnail_url = fields.Char(string="Document Preview", compute="_compute_thumbnail_urls")
+    signature_thumbnail_url = fields.Char(string="Signature Preview", compute="_compute_thumbnail_urls")
 
     # Status Management
     status = fields.Selection([
@@ -42,34 +62,84 @@ class ProofOfDelivery(models.Model):
     verified_by = fields.Many2one('res.users', string="Verified By", readonly=True)
     verified_date = fields.Datetime(string="Verified Date", readonly=True)
 
+    def init(self):
+        super().init()
+        tools.create_index(self.env.cr, 'proof_delivery_lms_open_status_idx', self._table,
+                           ['status', 'delivery_date'], where="status IN ('draft', 'delivered')")
+        # the activity stream pages through the latest changes
+        tools.create_index(self.env.cr, 'proof_delivery_lms_write_date_idx', self._table, ['write_date', 'id'])
+
+    def _compute_thumbnail_urls(self):
+        # write_date busts the browser cache once a new file is uploaded
+        for rec in self:
+            unique = int(rec.write_date.timestamp()) if rec.write_date else 0
+            rec.pod_document_thumbnail_url = '/lms/pod/%s/pod_document/thumbnail?unique=%s' % (rec.id, unique)
+            rec.signature_thumbnail_url = '/lms/pod/%s/signature/thumbnail?unique=%s' % (rec.id, unique)
+
+    # ----------------------------------------------
+    # FILES
+    # ----------------------------------------------
+    def _get_binary_attachment(self, field_name):
+        """The filestore attachment holding ``field_name``, if any"""
+        self.ensure_one()
+        return self.env['ir.attachment'].sudo().search([
+            ('res_model', '=', self._name),
+            ('res_id', '=', self.id),
+            ('res_field', '=', field_name),
+        ], limit=1)
+
+    def _get_thumbnail_attachment(self, field_name):
+        """Return the thumbnail of ``field_name``, generating it on first request.
+
+        Thumbnails are cached as attachments of the POD, tagged with the
+        checksum of their source so a new upload regenerates them. Files that
+        are not images (e.g. PDF scans) have no thumbnail.
+        """
+        self.ensure_one()
+        source = self._get_binary_attachment(field_name)
+        if not source or not (source.mimetype or '').startswith('image/'):
+            return self.env['ir.attachment']
+
+        Attachment = self.env['ir.attachment'].sudo()
+        name = '%s_thumbnail' % field_name
+        thumbnail = Attachment.search([
+            ('res_model', '=', self._name),
+            ('res_id', '=', self.id),
+            ('res_field', '=', False),
+            ('name', '=', name),
+        ], limit=1)
+        if thumbnail and thumbnail.description == source.checksum:
+            return thumbnail
+
+        try:
+            data = image_process(source.raw, size=THUMBNAIL_SIZE)
+        except UserError:
+            return self.env['ir.attachment']
+        vals = {'raw': data, 'description': source.checksum}
+        if thumbnail:
+            thumbnail.write(vals)
+        else:
+            thumbnail = Attachment.create(dict(vals, name=name, res_model=self._name, res_id=self.id))
+        return thumbnail
+
     # ----------------------------------------------
     # LIFECYCLE ACTIONS
     # ----------------------------------------------
-    @api.model
-    def create(self, vals):
-        """Auto-generate sequence for POD"""
-        if vals.get('name', _('New')) == _('New'):
-            vals['name'] = self.env['ir.sequence'].next_by_code('proof.delivery') or _('New')
-        return super(ProofOfDelivery, self).create(vals)
+    def _lms_transition_values(self, transition):
+        if transition == 'deliver':
+            return {'delivery_date': fields.Datetime.now()}
+        if transition == 'verify':
+            return {'verified_by': self.env.user.id, 'verified_date': fields.Datetime.now()}
+        return super()._lms_transition_values(transition)
 
     def action_mark_delivered(self):
         """Mark POD as Delivered"""
-        for record in self:
-            record.write({
-                'status': 'delivered',
-                'delivery_date': fields.Datetime.now(),
-            })
+        return self._lms_run_transition('deliver')
 
     def action_verify(self):
         """Mark POD as Verified"""
-        for record in self:
-            record.write({
-                'status': 'verified',
-                'verified_by': self.env.user.id,
-                'verified_date': fields.Datetime.now(),
-            })
+        return self._lms_run_transition('verify')
 
     def action_cancel(self):
         """Cancel POD"""
-        for record in self:
-            record.write({'status': 'cancelled'})
+        return self._lms_run_transition('cancel')
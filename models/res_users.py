@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+from odoo import models, tools
+
+# LMS roles by priority, with the group granting each of them
+LMS_ROLE_GROUPS = [
+    ('manager', 'lms.group_lms_manager'),
+    ('warehouse', 'lms.group_lms_warehouse_manager'),
+    ('driver', 'lms.group_lms_driver'),
+]
+
+# Dashboard sections reachable per role (None means every section)
+LMS_ROLE_SECTIONS = {
+    'manager': None,
+    'driver': (
+        'dashboard',
+        'trip_sheet',
+        'route_dispatch',
+        'lr',
+        'pod',
+        'ewaybill',
+        'fleet_overview',
+        'vehicle_costs',
+        'odoometer',
+        'route_optimization',
+    ),
+    'warehouse': (
+        'dashboard',
+        'warehouse',
+        'packages',
+        'package_types',
+        'packaging',
+        'finance_overview',
+        'customer_invoices',
+        'customer_credit_notes',
+        'customer_payments',
+        'accounting_journals',
+        'accounting_journals_entries',
+        'vendor_payments',
+        'contract',
+        'overview',
+        'warehouse_analysis',
+        'rfq',
+    ),
+}
+
+# Dashboard sidebar menus reachable per role (None means every menu)
+LMS_ROLE_MENUS = {
+    'manager': None,
+    'driver': ('dispatch', 'operations'),
+    'warehouse': ('packaging', 'finance', 'reporting'),
+}
+
+
+class ResUsers(models.Model):
+    _inherit = 'res.users'
+
+    @tools.ormcache('self.id')
+    def _get_lms_role(self):
+        """LMS role of the user, resolved from the LMS security groups.
+
+        Cached per user; the cache is cleared by the registry whenever group
+        membership changes.
+        """
+        self.ensure_one()
+        for role, group_xmlid in LMS_ROLE_GROUPS:
+            if self.has_group(group_xmlid):
+                return role
+        # Users outside the LMS groups (e.g. administrators) keep full access
+        return 'manager'
+
+    def _lms_has_access(self, section):
+        """Whether the user's LMS role may open the given dashboard section"""
+        sections = LMS_ROLE_SECTIONS[self._get_lms_role()]
+        return sections is None or section in sections
+
+
+class ResGroups(models.Model):
+    _inherit = 'res.groups'
+
+    def write(self, vals):
+        res = super().write(vals)
+        if 'users' in vals or 'implied_ids' in vals:
+            # memberships changed, LMS roles are derived from them
+            self.env.registry.clear_cache()
+        return res
@@ -1,26 +1,46 @@
 # -*- coding: utf-8 -*-
-from odoo import models, fields, api
+from odoo import models, fields, api, tools, _
 from datetime import datetime
 
+from ..tools.route_solver import distance_matrix, solve_route
+
+# Fields the daily operations rollup is computed from; the locations drive the distance
+OPERATIONS_FIELDS = ('dispatch_date', 'vehicle_id', 'driver_id', 'status', 'distance_km', 'total_fuel', 'mileage',
+                     'source_location_id', 'destination_location_id')
+
 class RouteDispatch(models.Model):
     _name = "route.dispatch"
     _description = "Route Dispatch"
-    _inherit = ['mail.thread', 'mail.activity.mixin']  # Adds chatter + activities
+    _inherit = ['mail.thread', 'mail.activity.mixin', 'lms.state.machine.mixin', 'lms.numbering.mixin']  # Adds chatter + activities
+    _lms_sequence_codes = ('lms.route.dispatch',)
+    _lms_transitions = {
+        'start': {'from': ('draft',), 'to': 'in_transit',
+                  'message': "🚚 Dispatch %(name)s started.",
+                  'error': "Only draft dispatches can be started."},
+        'complete': {'from': ('in_transit',), 'to': 'completed',
+                     'message': "✅ Dispatch %(name)s completed.",
+                     'error': "Only dispatches in transit can be completed."},
+        'cancel': {'from': ('draft', 'in_transit'), 'to': 'cancelled',
+                   'message': "❌ Dispatch %(name)s cancelled.",
+                   'error': "Completed or cancelled dispatches cannot be cancelled."},
+    }
 
     # Basic Info
     name = fields.Char(string="Dispatch No", required=True, copy=False, readonly=True,
-    default=lambda self: self.env['ir.sequence'].next_by_code('lms.route.dispatch'))
+    default=lambda self: _('New'))
 
     dispatch_date = fields.Datetime(string="Dispatch Date", default=fields.Datetime.now, tracking=True)
-    vehicle_id = fields.Many2one('fleet.vehicle', string="Vehicle", tracking=True)
+    vehicle_id = fields.Many2one('fleet.vehicle', string="Vehicle", index='btree_not_null', tracking=True)
     driver_id = fields.Many2one('hr.employee', string="Driver", tracking=True)
     route_id = fields.Many2one('stock.route', string="Route", tracking=True)
 
     # Route Details
-    source_location = fields.Char(string="Source Location")
-    destination_location = fields.Char(string="Destination Location")
-    distance_km = fields.Float(string="Distance (KM)")
-    estimated_time = fields.Float(string="Estimated Time (Hours)")
+    source_location_id = fields.Many2one('lms.location', string="Source", index=True)
+    destination_location_id = fields.Many2one('lms.location', string="Destination", index=True)
+    source_location = fields.Char(string="Source Location", compute="_compute_location_names", store=True, readonly=False)
+    destination_location = fields.Char(string="Destination Location", compute="_compute_location_names", store=True, readonly=False)
+    distance_km = fields.Float(string="Distance (KM)", compute="_compute_distance", store=True, readonly=False)
+    estimated_time = fields.Float(string="Estimated Time (Hours)", compute="_compute_distance", store=True, readonly=False)
 
     # Trip Status
     status = fields.Selection([
@@ -32,30 +52,170 @@ class RouteDispatch(models.Model):
 
     # Related documents
     # trip_sheet_id = fields.Many2one('lms.trip.sheet', string="Trip Sheet")
-    # lr_ids = fields.One2many('lms.lorry.receipt', 'dispatch_id', string="Lorry Receipts")
+    lr_ids = fields.One2many('lorry.receipt', 'dispatch_id', string="Lorry Receipts")
     # pod_ids = fields.One2many('lms.proof.delivery', 'dispatch_id', string="Proof of Delivery")
-    # ewaybill_ids = fields.One2many('lms.eway.bill', 'dispatch_id', string="E-Way Bills")
+    ewaybill_ids = fields.One2many('eway.bill', 'dispatch_id', string="E-Way Bills")
 
     # Performance & Fuel
     total_fuel = fields.Float(string="Fuel Consumed (L)")
     mileage = fields.Float(string="Mileage (KM/L)")
     remarks = fields.Text(string="Remarks")
 
+    # Stops
+    stop_ids = fields.One2many('route.dispatch.stop', 'dispatch_id', string="Stops", copy=True)
 
+    # Load
+    load_weight = fields.Float(string="Load (KG)", compute="_compute_load", store=True)
+    load_packages = fields.Integer(string="Packages", compute="_compute_load", store=True)
 
-    def action_start_dispatch(self):
+    def init(self):
+        super().init()
+        # vehicles busy on open dispatches, looked up by the load planner
+        tools.create_index(self.env.cr, 'route_dispatch_lms_open_vehicle_idx', self._table,
+                           ['vehicle_id', 'status'], where="status IN ('draft', 'in_transit')")
+        # the operations rollup reads the dispatches completed over a period
+        tools.create_index(self.env.cr, 'route_dispatch_lms_completed_date_idx', self._table,
+                           ['dispatch_date', 'vehicle_id'], where="status = 'completed'")
+        # the activity stream pages through the latest changes
+        tools.create_index(self.env.cr, 'route_dispatch_lms_write_date_idx', self._table, ['write_date', 'id'])
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        dispatches = super().create(vals_list)
+        self.env['lms.operations.daily']._queue_records(dispatches, 'dispatch_date')
+        return dispatches
+
+    def write(self, vals):
+        if set(vals).isdisjoint(OPERATIONS_FIELDS):
+            return super().write(vals)
+        Operations = self.env['lms.operations.daily']
+        Operations._queue_records(self, 'dispatch_date')
+        res = super().write(vals)
+        Operations._queue_records(self, 'dispatch_date')
+        return res
+
+    def unlink(self):
+        self.env['lms.operations.daily']._queue_records(self, 'dispatch_date')
+        return super().unlink()
+
+    @api.depends('lr_ids.total_weight', 'lr_ids.total_packages')
+    def _compute_load(self):
         for rec in self:
-            rec.status = 'in_transit'
-            rec.message_post(body=f"🚚 Dispatch {rec.name} started.")
+            rec.load_weight = sum(rec.lr_ids.mapped('total_weight'))
+            rec.load_packages = sum(rec.lr_ids.mapped('total_packages'))
 
-    def action_complete_dispatch(self):
+    @api.depends('source_location_id.name', 'destination_location_id.name')
+    def _compute_location_names(self):
+        for rec in self:
+            rec.source_location = rec.source_location_id.name or rec.source_location
+            rec.destination_location = rec.destination_location_id.name or rec.destination_location
+
+    @api.depends('source_location_id', 'destination_location_id')
+    def _compute_distance(self):
+        """Look the leg up in the distance matrix, keeping typed values when it is unknown"""
+        Distance = self.env['lms.location.distance']
         for rec in self:
-            rec.status = 'completed'
-            rec.message_post(body=f"✅ Dispatch {rec.name} completed.")
+            value = Distance._get_distance(rec.source_location_id, rec.destination_location_id)
+            if value:
+                rec.distance_km, rec.estimated_time = value
+            else:
+                rec.distance_km = rec.distance_km
+                rec.estimated_time = rec.estimated_time
+
+
+    def action_start_dispatch(self):
+        return self._lms_run_transition('start')
+
+    def action_complete_dispatch(self):
+        return self._lms_run_transition('complete')
 
     def action_cancel_dispatch(self):
+        return self._lms_run_transition('cancel')
+
+    # === Route optimization ===
+    def action_generate_ewaybills(self):
+        """Queue the e-way bills of the LRs of the dispatches, generated in the background"""
+        bills = self.env['eway.bill']._queue_generation(self.lr_ids)
+        return {
+            'type': 'ir.actions.client',
+            'tag': 'display_notification',
+            'params': {
+                'type': 'info' if bills else 'warning',
+                'title': _("E-Way Bills"),
+                'message': _("%s e-way bills queued for generation.", len(bills)) if bills
+                           else _("Every LR already has an e-way bill."),
+                'sticky': False,
+                'next': {'type': 'ir.actions.client', 'tag': 'soft_reload'},
+            },
+        }
+
+    def _get_route_settings(self):
+        get_param = self.env['ir.config_parameter'].sudo().get_param
+        return {
+            'time_budget': float(get_param('lms.route_optimization_time_budget') or 2.0),
+            'road_factor': float(get_param('lms.road_distance_factor') or 1.0),
+            'average_speed': float(get_param('lms.average_speed_kmh') or 40.0),
+            'stop_minutes': float(get_param('lms.stop_service_minutes') or 0.0),
+        }
+
+    def action_optimize_route(self):
+        """Reorder the stops of each dispatch and update its distance and time.
+
+        The first stop is the origin and stays first; stops without
+        coordinates are kept, in their current order, after the optimized ones.
+        """
+        settings = self._get_route_settings()
         for rec in self:
-            rec.status = 'cancelled'
-            rec.message_post(body=f"❌ Dispatch {rec.name} cancelled.")
+            stops = rec.stop_ids.sorted(lambda stop: (stop.sequence, stop.id))
+            located = stops.filtered(lambda stop: stop.latitude or stop.longitude)
+            if len(located) < 2:
+                continue
+            matrix = distance_matrix([(stop.latitude, stop.longitude) for stop in located])
+            order, length = solve_route(matrix, settings['time_budget'])
+
+            ordered = [located[index] for index in order] + list(stops - located)
+            for sequence, stop in enumerate(ordered, start=1):
+                if stop.sequence != sequence:
+                    stop.sequence = sequence
+
+            distance = length * settings['road_factor']
+            rec.write({
+                'distance_km': round(distance, 2),
+                'estimated_time': round(
+                    distance / settings['average_speed'] + len(stops) * settings['stop_minutes'] / 60, 2
+                ),
+            })
+        return True
+
+
+class RouteDispatchStop(models.Model):
+    _name = "route.dispatch.stop"
+    _description = "Route Dispatch Stop"
+    _order = "dispatch_id, sequence, id"
+
+    dispatch_id = fields.Many2one('route.dispatch', string="Dispatch", required=True, ondelete="cascade", index=True)
+    sequence = fields.Integer(string="Sequence", default=10)
+    name = fields.Char(string="Stop", required=True)
+    partner_id = fields.Many2one('res.partner', string="Contact")
+    lr_id = fields.Many2one('lorry.receipt', string="Lorry Receipt")
+    location_id = fields.Many2one('lms.location', string="Location")
+    latitude = fields.Float(string="Latitude", digits=(10, 7), compute="_compute_coordinates", store=True, readonly=False)
+    longitude = fields.Float(string="Longitude", digits=(10, 7), compute="_compute_coordinates", store=True, readonly=False)
+
+    @api.depends('partner_id', 'location_id.latitude', 'location_id.longitude')
+    def _compute_coordinates(self):
+        """Take the location's coordinates, else the partner's geolocation when base_geolocalize provides one"""
+        for stop in self:
+            partner = stop.partner_id
+            location = stop.location_id
+            if location.latitude or location.longitude:
+                stop.latitude = location.latitude
+                stop.longitude = location.longitude
+            elif partner and 'partner_latitude' in partner._fields and (partner.partner_latitude or partner.partner_longitude):
+                stop.latitude = partner.partner_latitude
+                stop.longitude = partner.partner_longitude
+            else:
+                stop.latitude = stop.latitude
+                stop.longitude = stop.longitude
 
 
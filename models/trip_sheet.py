@@ -1,25 +1,44 @@
 # -*- coding: utf-8 -*-
-from odoo import models, fields, api
-from datetime import datetime
+from odoo import models, fields, api, tools, _
+
+# Fields the vehicle utilization rollup is computed from
+UTILIZATION_FIELDS = ('vehicle_id', 'date_start', 'date_end', 'status')
+# Fields the daily operations rollup is computed from
+OPERATIONS_FIELDS = ('vehicle_id', 'driver_id', 'date_start', 'date_end', 'status', 'total_distance')
+
 
 class TripSheet(models.Model):
     _name = "trip.sheet"
     _description = "Trip Sheet"
-    _inherit = ['mail.thread', 'mail.activity.mixin']
+    _inherit = ['mail.thread', 'mail.activity.mixin', 'lms.state.machine.mixin', 'lms.numbering.mixin',
+                'lms.live.counter.mixin']
+    _lms_sequence_codes = ('lms.trip.sheet', 'trip.sheet')
+    _lms_live_counters = {
+        ('dispatch', 'active_trips'): ('status', ('in_progress',)),
+    }
     _order = "id desc"
+    _lms_transitions = {
+        'start': {'from': ('draft',), 'to': 'in_progress',
+                  'error': "Only draft trips can be started."},
+        'complete': {'from': ('in_progress',), 'to': 'completed',
+                     'error': "Only trips in progress can be completed."},
+        'cancel': {'from': ('draft', 'in_progress'), 'to': 'cancelled',
+                   'error': "Completed or cancelled trips cannot be cancelled."},
+    }
 
     name = fields.Char(
         string="Trip No",
         required=True,
         copy=False,
         readonly=True,
-        default=lambda self: self.env['ir.sequence'].next_by_code('trip.sheet')
+        default=lambda self: _('New')
     )
 
     vehicle_id = fields.Many2one(
         "fleet.vehicle",
         string="Vehicle",
         required=True,
+        index=True,
         tracking=True
     )
 
@@ -58,6 +77,44 @@ class TripSheet(models.Model):
         store=True
     )
 
+    def init(self):
+        super().init()
+        # open trips are a small slice of the table and what the dashboard counts
+        tools.create_index(self.env.cr, 'trip_sheet_lms_open_status_idx', self._table,
+                           ['status', 'date_start'], where="status IN ('draft', 'in_progress')")
+        # utilization reads the trips that ran over a period
+        tools.create_index(self.env.cr, 'trip_sheet_lms_busy_idx', self._table,
+                           ['date_start', 'vehicle_id'], where="status IN ('in_progress', 'completed')")
+        # the activity stream pages through the latest changes
+        tools.create_index(self.env.cr, 'trip_sheet_lms_write_date_idx', self._table, ['write_date', 'id'])
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        trips = super().create(vals_list)
+        trips._queue_rollups(utilization=True, operations=True)
+        return trips
+
+    def write(self, vals):
+        utilization = not set(vals).isdisjoint(UTILIZATION_FIELDS)
+        operations = not set(vals).isdisjoint(OPERATIONS_FIELDS)
+        if not (utilization or operations):
+            return super().write(vals)
+        # the days the trips leave and the days they move to
+        self._queue_rollups(utilization, operations)
+        res = super().write(vals)
+        self._queue_rollups(utilization, operations)
+        return res
+
+    def unlink(self):
+        self._queue_rollups(utilization=True, operations=True)
+        return super().unlink()
+
+    def _queue_rollups(self, utilization, operations):
+        if utilization:
+            self.env['lms.vehicle.utilization']._queue_trips(self)
+        if operations:
+            self.env['lms.operations.daily']._queue_records(self, 'date_start')
+
     @api.depends('date_start', 'date_end')
     def _compute_duration_hours(self):
         for record in self:
@@ -68,15 +125,16 @@ class TripSheet(models.Model):
                 record.duration_hours = 0.0
 
     # === Actions ===
+    def _lms_transition_values(self, transition):
+        if transition == 'complete':
+            return {'date_end': fields.Datetime.now()}
+        return super()._lms_transition_values(transition)
+
     def action_start(self):
-        for rec in self:
-            rec.status = 'in_progress'
+        return self._lms_run_transition('start')
 
     def action_complete(self):
-        for rec in self:
-            rec.status = 'completed'
-            rec.date_end = fields.Datetime.now()
+        return self._lms_run_transition('complete')
 
     def action_cancel(self):
-        for rec in self:
-            rec.status = 'cancelled'
+        return self._lms_run_transition('cancel')
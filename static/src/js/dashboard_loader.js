@@ -0,0 +1,39 @@
+/** @odoo-module **/
+
+import { Component, onWillStart, xml } from "@odoo/owl";
+import { loadBundle } from "@web/core/assets";
+import { rpc } from "@web/core/network/rpc";
+import { registry } from "@web/core/registry";
+
+// The dashboard, its templates and styles are only fetched when the action
+// opens; this file is all LMS adds to the backend bundle
+const DASHBOARD_BUNDLE = "lms.assets_dashboard";
+let startupReported = false;
+
+export class LmsDashboardAction extends Component {
+  static template = xml`<t t-component="Dashboard" t-props="props"/>`;
+  static props = ["*"];
+
+  setup() {
+    onWillStart(async () => {
+      const started = performance.now();
+      await loadBundle(DASHBOARD_BUNDLE);
+      this.Dashboard = registry.category("lazy_components").get("lms.Dashboard");
+      this.reportStartup(performance.now() - started);
+    });
+  }
+
+  reportStartup(bundleMs) {
+    const timings = { dashboard_bundle: bundleMs };
+    // once per page: how long the backend took to become interactive, to
+    // compare before and after assets leave web.assets_backend
+    const [navigation] = performance.getEntriesByType("navigation");
+    if (!startupReported && navigation) {
+      timings.backend_startup = navigation.domContentLoadedEventEnd;
+      startupReported = true;
+    }
+    rpc("/lms/metrics/client", { timings }, { silent: true }).catch(() => {});
+  }
+}
+
+registry.category("actions").add("lms_dashboard_client_action", LmsDashboardAction);
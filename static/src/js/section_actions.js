@@ -0,0 +1,50 @@
+/** @odoo-module **/
+
+import { makeContext } from "@web/core/context";
+import { user } from "@web/core/user";
+
+// Section actions of the session, fetched once and shared by every mount of
+// the dashboard
+let sectionActions = null;
+
+export function loadSectionActions(orm) {
+  if (!sectionActions) {
+    sectionActions = orm.call("lms.dashboard", "get_section_actions", []);
+    // a failed fetch is retried on the next section switch
+    sectionActions.catch(() => (sectionActions = null));
+  }
+  return sectionActions;
+}
+
+// Parameters of the views of a window action, the same for the prefetch and
+// the rendering so the view service answers the render from its cache
+export function sectionViewParams(action) {
+  const context = makeContext([user.context, action.context || {}]);
+  const views = (action.views || []).filter(([, type]) => type !== "search");
+  const searchViewId = action.search_view_id ? action.search_view_id[0] : false;
+  return {
+    resModel: action.res_model,
+    context,
+    views: [...views, [searchViewId, "search"]],
+    searchViewId,
+  };
+}
+
+export function prefetchSectionViews(viewService, actions) {
+  // one view at a time: this runs behind the user's first clicks
+  return Object.values(actions)
+    .filter((action) => action.type === "ir.actions.act_window")
+    .reduce(
+      (previous, action) =>
+        previous.then(() => {
+          const { resModel, context, views } = sectionViewParams(action);
+          return viewService
+            .loadViews(
+              { resModel, context, views },
+              { actionId: action.id, loadActionMenus: true, loadIrFilters: true }
+            )
+            .catch(() => {});
+        }),
+      Promise.resolve()
+    );
+}
@@ -0,0 +1,58 @@
+/** @odoo-module **/
+
+import { Component, onWillStart, useSubEnv } from "@odoo/owl";
+import { Domain } from "@web/core/domain";
+import { registry } from "@web/core/registry";
+import { useService } from "@web/core/utils/hooks";
+import { View, getDefaultConfig } from "@web/views/view";
+import { sectionViewParams } from "./section_actions";
+
+/**
+ * Window action of a dashboard section rendered in place, within the
+ * dashboard's web client. Records open in a form pushed on the breadcrumbs.
+ */
+export class LmsSectionView extends Component {
+  static template = "lms.SectionView";
+  static components = { View };
+  static props = { action: Object };
+
+  setup() {
+    this.actionService = useService("action");
+    const { action } = this.props;
+    const { resModel, context, views, searchViewId } = sectionViewParams(action);
+    useSubEnv({
+      config: {
+        ...getDefaultConfig(),
+        actionId: action.id,
+        views,
+        getDisplayName: () => action.display_name || action.name,
+      },
+    });
+    onWillStart(() => {
+      this.viewProps = {
+        resModel,
+        type: views[0][1],
+        views,
+        context,
+        domain: action.domain ? new Domain(action.domain).toList(context) : [],
+        searchViewId,
+        loadActionMenus: true,
+        loadIrFilters: true,
+        selectRecord: (resId) => this.openRecord(resModel, resId, context),
+        createRecord: () => this.openRecord(resModel, false, context),
+      };
+    });
+  }
+
+  openRecord(resModel, resId, context) {
+    return this.actionService.doAction({
+      type: "ir.actions.act_window",
+      res_model: resModel,
+      res_id: resId || undefined,
+      views: [[false, "form"]],
+      context,
+    });
+  }
+}
+
+registry.category("lazy_components").add("lms.SectionView", LmsSectionView);
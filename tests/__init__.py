@@ -0,0 +1,5 @@
+# -*- coding: utf-8 -*-
+
+from . import test_benchmark
+from . import test_eway_generation
+from . import test_query_plans
@@ -0,0 +1,157 @@
+# -*- coding: utf-8 -*-
+"""Load benchmarks of the LMS module, excluded from the standard test run.
+
+Run them on a dedicated database with::
+
+    odoo-bin -d bench -i lms --test-tags lms_benchmark --stop-after-init
+
+``LMS_BENCH_TIER`` picks the seeder tier (1k by default) and
+``LMS_BENCH_SEED`` its seed. Measurements are compared with the baseline in
+``benchmark_baseline.json`` and fail beyond the allowed growth; set
+``LMS_BENCH_UPDATE=1`` to record the current numbers as the new baseline of
+the tier instead, and ``LMS_BENCH_OUTPUT`` to also write them to another file.
+When the ``CI`` variable is set, measurements without a baseline fail too:
+record the baseline of the tier on the CI machine, where the timings are
+comparable, and commit it.
+"""
+import json
+import logging
+import os
+import time
+
+from lxml import etree
+
+from odoo.tests import TransactionCase, tagged
+
+from ..models.lms_dashboard import STAT_SECTIONS
+from ..tools.seeder import LMSSeeder
+
+_logger = logging.getLogger(__name__)
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), 'benchmark_baseline.json')
+
+# Allowed growth before a measurement counts as a regression
+TIME_TOLERANCE = 1.5  # ratio, wall time is noisy
+TIME_SLACK = 0.05  # seconds, ignore noise on very fast operations
+QUERY_TOLERANCE = 1.1  # ratio, query counts are deterministic
+
+# Transitions timed on every record of the source status: {model: [(action, source statuses)]}
+TRANSITIONS = {
+    'trip.sheet': [('action_start', 'draft'), ('action_complete', 'in_progress'), ('action_cancel', 'draft')],
+    'route.dispatch': [('action_start_dispatch', 'draft'), ('action_complete_dispatch', 'in_transit'),
+                       ('action_cancel_dispatch', 'draft')],
+    'lorry.receipt': [('action_dispatch', 'draft'), ('action_mark_delivered', 'in_transit')],
+    'proof.delivery': [('action_mark_delivered', 'draft'), ('action_verify', 'delivered'),
+                       ('action_cancel', 'draft')],
+    'eway.bill': [('action_activate', 'draft'), ('action_expire', 'active'), ('action_cancel', 'active')],
+    'logistics.contract': [('action_activate', 'draft'), ('action_terminate', 'active')],
+}
+
+LIST_VIEW_MODELS = ('trip.sheet', 'route.dispatch', 'lorry.receipt', 'proof.delivery', 'eway.bill',
+                    'logistics.contract')
+
+
+@tagged('lms_benchmark', '-standard', 'post_install', '-at_install')
+class TestBenchmark(TransactionCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.tier = os.environ.get('LMS_BENCH_TIER', '1k')
+        seed = int(os.environ.get('LMS_BENCH_SEED', '42'))
+        started = time.perf_counter()
+        cls.counts = LMSSeeder(cls.env, tier=cls.tier, seed=seed).run()
+        # transitions on large selections are otherwise only queued as background jobs
+        cls.env['ir.config_parameter'].sudo().set_param('lms.job_sync_limit', str(10 ** 9))
+        _logger.info("LMS benchmark: %s tier seeded in %.1fs", cls.tier, time.perf_counter() - started)
+        cls.results = {}
+        cls.update = bool(os.environ.get('LMS_BENCH_UPDATE'))
+        cls.baseline = {}
+        if os.path.exists(BASELINE_PATH):
+            with open(BASELINE_PATH) as baseline_file:
+                cls.baseline = json.load(baseline_file)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls._report()
+        super().tearDownClass()
+
+    def measure(self, name, func):
+        """Run ``func`` in a savepoint rolled back afterwards and record its cost"""
+        self.env.flush_all()
+        self.env.invalidate_all()
+        cr = self.env.cr
+        with cr.savepoint() as savepoint:
+            queries = cr.sql_log_count
+            started = time.perf_counter()
+            func()
+            self.env.flush_all()
+            elapsed = time.perf_counter() - started
+            queries = cr.sql_log_count - queries
+            savepoint.rollback()
+        self.env.invalidate_all()
+        self.results[name] = {'queries': queries, 'seconds': round(elapsed, 4)}
+        _logger.info("LMS benchmark %s: %d queries, %.3fs", name, queries, elapsed)
+        self.check_baseline(name, self.results[name])
+
+    def check_baseline(self, name, result):
+        """Fail when ``result`` grew past the tolerances over the baseline of the tier"""
+        if self.update:
+            return
+        expected = self.baseline.get(self.tier, {}).get(name)
+        with self.subTest(benchmark=name):
+            if not expected:
+                # a CI run without baseline would guard nothing
+                self.assertFalse(os.environ.get('CI'), "%s has no baseline in the %s tier, record one with "
+                                                       "LMS_BENCH_UPDATE=1" % (name, self.tier))
+                _logger.info("LMS benchmark %s: no baseline", name)
+                return
+            self.assertLessEqual(result['queries'], expected['queries'] * QUERY_TOLERANCE,
+                                 "%s regressed: %d queries, baseline %d" % (name, result['queries'], expected['queries']))
+            self.assertLessEqual(result['seconds'], expected['seconds'] * TIME_TOLERANCE + TIME_SLACK,
+                                 "%s regressed: %.3fs, baseline %.3fs" % (name, result['seconds'], expected['seconds']))
+
+    # === Benchmarks ===
+    def test_dashboard(self):
+        Dashboard = self.env['lms.dashboard']
+        self.measure('dashboard.live', lambda: Dashboard.get_dashboard_data(force_refresh=True))
+        # the seeder computed the snapshot, the second call is served from the worker cache
+        Dashboard.get_dashboard_data()
+        self.measure('dashboard.snapshot', Dashboard.get_dashboard_data)
+        self.measure('dashboard.section_stats', lambda: Dashboard.get_section_stats(list(STAT_SECTIONS)))
+
+    def test_transitions(self):
+        for model_name, transitions in TRANSITIONS.items():
+            Model = self.env[model_name]
+            for action, status in transitions:
+                records = Model.search([('status', '=', status)])
+                self.measure('%s.%s[%s]' % (model_name, action, status), getattr(records, action))
+
+    def test_list_views(self):
+        for model_name in LIST_VIEW_MODELS:
+            Model = self.env[model_name]
+            arch = Model.get_views([(False, 'list')])['views']['list']['arch']
+            specification = {}
+            for name in etree.fromstring(arch).xpath('/list/field/@name'):
+                field = Model._fields[name]
+                specification[name] = {'fields': {'display_name': {}}} if field.type == 'many2one' else {}
+            self.measure('%s.list' % model_name, lambda: Model.web_search_read(
+                [], specification, limit=80, count_limit=10001,
+            ))
+
+    # === Baseline ===
+    @classmethod
+    def _report(cls):
+        """Write the measurements out, and record them as the baseline of the tier when asked"""
+        output = os.environ.get('LMS_BENCH_OUTPUT')
+        if output:
+            with open(output, 'w') as output_file:
+                json.dump({cls.tier: cls.results}, output_file, indent=2, sort_keys=True)
+
+        if cls.update:
+            baseline = dict(cls.baseline)
+            baseline.setdefault(cls.tier, {}).update(cls.results)
+            with open(BASELINE_PATH, 'w') as baseline_file:
+                json.dump(baseline, baseline_file, indent=2, sort_keys=True)
+                baseline_file.write('\n')
+            _logger.info("LMS benchmark: baseline of the %s tier updated", cls.tier)
@@ -0,0 +1,167 @@
+# -*- coding: utf-8 -*-
+import threading
+import time
+from datetime import datetime, time as dt_time, timedelta
+from unittest.mock import patch
+
+from odoo.tests import TransactionCase, tagged
+
+from ..models.eway_bill import MAX_PORTAL_ATTEMPTS
+from ..tools.eway_portal import (
+    PORTAL_CLIENTS, MockPortal, gstin_checksum, is_valid_gstin, validate_batch, validity_days,
+)
+
+TRANSPORTER_GSTIN = '27AAPFU0939F1ZV'
+CONSIGNOR_GSTIN = '29AAGCB7383J1Z4'
+CONSIGNEE_GSTIN = '24AAACC1206D1ZM'
+
+
+class CountingPortal(MockPortal):
+    """MockPortal counting the calls it answers, transient errors included"""
+    calls = 0
+    _calls_lock = threading.Lock()
+
+    def generate(self, request, idempotency_key):
+        with self._calls_lock:
+            CountingPortal.calls += 1
+        return super().generate(request, idempotency_key)
+
+
+@tagged('post_install', '-at_install', 'lms_eway')
+class TestEwayGeneration(TransactionCase):
+    """E-way bills of dispatched LRs generated by the cron against MockPortal"""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.env.company.vat = TRANSPORTER_GSTIN
+        brand = cls.env['fleet.vehicle.model.brand'].create({'name': 'LMS Eway Brand'})
+        model = cls.env['fleet.vehicle.model'].create({'name': 'LMS Eway Model', 'brand_id': brand.id})
+        vehicle = cls.env['fleet.vehicle'].create({'model_id': model.id, 'license_plate': 'MH12AB1234'})
+        cls.dispatch = cls.env['route.dispatch'].create({
+            'vehicle_id': vehicle.id,
+            'source_location': 'Mumbai',
+            'destination_location': 'Pune',
+            'distance_km': 350,
+        })
+        cls.Bill = cls.env['eway.bill']
+
+    def setUp(self):
+        super().setUp()
+        CountingPortal.calls = 0
+        self.startPatcher(patch.dict(PORTAL_CLIENTS, {'counting': CountingPortal}))
+        self.set_portal(portal='counting', portal_latency=0, portal_failure_rate=0,
+                        portal_retries=3, portal_backoff=0.01, portal_rate=1000)
+
+    def set_portal(self, **settings):
+        params = self.env['ir.config_parameter'].sudo()
+        for key, value in settings.items():
+            params.set_param('lms.eway_%s' % key, str(value))
+
+    def create_lrs(self, count, **vals):
+        return self.env['lorry.receipt'].create([dict({
+            'dispatch_id': self.dispatch.id,
+            'consignor': 'Consignor %d' % index,
+            'consignee': 'Consignee %d' % index,
+            'consignor_gstin': CONSIGNOR_GSTIN,
+            'consignee_gstin': CONSIGNEE_GSTIN,
+            'total_weight': 1000,
+        }, **vals) for index in range(count)])
+
+    def generate(self, lrs):
+        bills = self.Bill._queue_generation(lrs)
+        self.Bill._cron_generate()
+        return bills
+
+    # === Local validation ===
+    def test_gstin_checksum(self):
+        for gstin in (TRANSPORTER_GSTIN, CONSIGNOR_GSTIN, CONSIGNEE_GSTIN):
+            self.assertTrue(is_valid_gstin(gstin), gstin)
+            self.assertEqual(gstin_checksum(gstin), gstin[14])
+        self.assertFalse(is_valid_gstin('27AAPFU0939F1ZA'), "wrong check character")
+        self.assertFalse(is_valid_gstin('27aapfu0939f1zv'), "lower case")
+        self.assertFalse(is_valid_gstin('27AAPFU0939F1Z'), "too short")
+        self.assertFalse(is_valid_gstin(False))
+
+    def test_validate_batch(self):
+        valid = {'transporter_gstin': TRANSPORTER_GSTIN, 'consignor_gstin': 'URP',
+                 'consignee_gstin': CONSIGNEE_GSTIN, 'distance_km': 350, 'vehicle_no': 'MH12AB1234'}
+        errors = validate_batch([
+            dict(valid, key='valid'),
+            dict(valid, key='bad_consignee', consignee_gstin='24AAACC1206D1ZX'),
+            dict(valid, key='no_transporter', transporter_gstin=False),
+            dict(valid, key='too_far', distance_km=4001),
+            dict(valid, key='no_distance', distance_km=0),
+            dict(valid, key='no_vehicle', vehicle_no=False),
+        ])
+        self.assertNotIn('valid', errors)
+        self.assertEqual(errors['bad_consignee'], ["Invalid consignee GSTIN 24AAACC1206D1ZX"])
+        self.assertEqual(errors['no_transporter'], ["Missing transporter GSTIN"])
+        self.assertEqual(len(errors['too_far']), 1)
+        self.assertEqual(len(errors['no_distance']), 1)
+        self.assertEqual(errors['no_vehicle'], ["Missing vehicle number"])
+
+    def test_invalid_bills_fail_locally(self):
+        lrs = self.create_lrs(2)
+        lrs[1].consignee_gstin = '24AAACC1206D1ZX'
+        bills = self.generate(lrs)
+        valid, invalid = bills.sorted(lambda bill: bill.lr_id.id)
+        self.assertEqual(valid.portal_state, 'generated')
+        self.assertEqual(invalid.portal_state, 'failed')
+        self.assertIn("Invalid consignee GSTIN", invalid.portal_error)
+        self.assertEqual(invalid.status, 'draft')
+        self.assertEqual(CountingPortal.calls, 1, "invalid requests never reach the portal")
+
+    # === Generation ===
+    def test_generate(self):
+        lrs = self.create_lrs(20)
+        bills = self.generate(lrs)
+        self.assertEqual(len(bills), 20)
+        self.assertEqual(set(bills.mapped('portal_state')), {'generated'})
+        self.assertEqual(set(bills.mapped('status')), {'active'})
+        self.assertEqual(len(set(bills.mapped('ewaybill_no'))), 20)
+        for bill in bills:
+            last_day = (bill.generated_date + timedelta(days=validity_days(350))).date()
+            self.assertEqual(bill.valid_upto, datetime.combine(last_day, dt_time.max).replace(microsecond=0))
+        self.assertFalse(self.Bill._queue_generation(lrs), "LRs with an open bill are not queued again")
+
+    def test_resubmission_is_idempotent(self):
+        bill = self.generate(self.create_lrs(1))
+        number = bill.ewaybill_no
+        # a run whose commit was lost submits the bill again
+        bill.write({'status': 'draft', 'ewaybill_no': False, 'portal_state': 'queued'})
+        self.Bill._cron_generate()
+        self.assertEqual(bill.portal_state, 'generated')
+        self.assertEqual(bill.ewaybill_no, number)
+
+    def test_transient_errors_are_retried(self):
+        self.set_portal(portal_failure_rate=0.5, portal_retries=12)
+        bills = self.generate(self.create_lrs(10))
+        self.assertEqual(set(bills.mapped('portal_state')), {'generated'})
+        self.assertGreater(CountingPortal.calls, 10, "some requests needed another attempt")
+
+    def test_failed_after_max_attempts(self):
+        self.set_portal(portal_failure_rate=1, portal_retries=0)
+        bills = self.generate(self.create_lrs(3))
+        self.assertEqual(set(bills.mapped('portal_state')), {'queued'}, "a run tries each bill once")
+        self.assertEqual(set(bills.mapped('portal_attempts')), {1})
+        for _run in range(MAX_PORTAL_ATTEMPTS - 1):
+            self.Bill._cron_generate()
+        self.assertEqual(set(bills.mapped('portal_state')), {'failed'})
+        self.assertEqual(set(bills.mapped('portal_attempts')), {MAX_PORTAL_ATTEMPTS})
+        self.assertEqual(set(bills.mapped('portal_error')), {"Portal temporarily unavailable"})
+
+        self.set_portal(portal_failure_rate=0)
+        bills.action_retry_generation()
+        self.Bill._cron_generate()
+        self.assertEqual(set(bills.mapped('portal_state')), {'generated'})
+
+    def test_throughput(self):
+        """500 consignments of a wave are generated in minutes against a slow portal"""
+        self.set_portal(portal_latency=0.05, portal_concurrency=8, portal_rate=100, batch_size=500)
+        lrs = self.create_lrs(500)
+        started = time.monotonic()
+        bills = self.generate(lrs)
+        elapsed = time.monotonic() - started
+        self.assertEqual(len(bills.filtered(lambda bill: bill.portal_state == 'generated')), 500)
+        self.assertLess(elapsed, 120)
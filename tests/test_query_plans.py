@@ -0,0 +1,168 @@
+# -*- coding: utf-8 -*-
+from datetime import timedelta
+
+from odoo import fields
+from odoo.tests import TransactionCase, tagged
+from odoo.tools import SQL
+
+
+@tagged('post_install', '-at_install', 'lms_query_plans')
+class TestQueryPlans(TransactionCase):
+    """The dashboard and list view queries must not scan whole tables.
+
+    Every LMS table is seeded with a history where open documents are a
+    small slice, like a production database after a few years, then each
+    hot query is EXPLAINed and must reach its table through an index.
+    """
+
+    ROWS = 50000
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cr = cls.env.cr
+        brand = cls.env['fleet.vehicle.model.brand'].create({'name': 'LMS Plan Brand'})
+        model = cls.env['fleet.vehicle.model'].create({'name': 'LMS Plan Model', 'brand_id': brand.id})
+        cls.vehicles = cls.env['fleet.vehicle'].create([
+            {'model_id': model.id, 'license_plate': 'PLAN-%02d' % index} for index in range(50)
+        ])
+        cls.env.flush_all()
+        vehicle_ids = cls.vehicles.ids
+        partner_id = cls.env.user.partner_id.id
+
+        cls._seed('route_dispatch', cls.ROWS // 5, {
+            'name': "'PLAN-DISP-' || g",
+            'status': _open_status("'draft'", "'in_transit'", "'completed'"),
+            'dispatch_date': "now() - g * interval '30 minutes'",
+            'vehicle_id': "CASE WHEN g %% 20 = 0 THEN (%s::int[])[1 + g %% 50] END" % _array(vehicle_ids),
+        })
+        cr.execute("SELECT min(id), max(id) FROM route_dispatch WHERE name LIKE %s", ['PLAN-DISP-%'])
+        first_dispatch, last_dispatch = cr.fetchone()
+        cls.dispatch_id = first_dispatch
+        dispatch_expr = "CASE WHEN g %% 10 = 0 THEN NULL ELSE %s + g %% %s END" % (
+            first_dispatch, last_dispatch - first_dispatch + 1,
+        )
+
+        cls._seed('trip_sheet', cls.ROWS, {
+            'name': "'PLAN-TS-' || g",
+            'vehicle_id': "(%s::int[])[1 + g %% 50]" % _array(vehicle_ids),
+            'driver_id': str(partner_id),
+            'status': _open_status("'draft'", "'in_progress'", "'completed'"),
+            'date_start': "now() - g * interval '10 minutes'",
+        })
+        cls._seed('lorry_receipt', cls.ROWS, {
+            'name': "'PLAN-LR-' || g",
+            'status': _open_status("'draft'", "'in_transit'", "'delivered'"),
+            'date': "now() - g * interval '10 minutes'",
+            'dispatch_id': dispatch_expr,
+            'vehicle_id': "CASE WHEN g %% 20 = 0 THEN (%s::int[])[1 + g %% 50] END" % _array(vehicle_ids),
+        })
+        cls._seed('proof_delivery', cls.ROWS, {
+            'name': "'PLAN-POD-' || g",
+            'received_by': "'Receiver'",
+            'status': _open_status("'draft'", "'delivered'", "'verified'"),
+            'delivery_date': "now() - g * interval '10 minutes'",
+            'dispatch_id': dispatch_expr,
+        })
+        cls._seed('eway_bill', cls.ROWS, {
+            'name': "'PLAN-EWB-' || g",
+            'ewaybill_no': "'EWB' || g",
+            'status': _open_status("'draft'", "'active'", "'expired'"),
+            'generated_date': "now() - g * interval '10 minutes'",
+            'valid_upto': "now() - g * interval '10 minutes' + interval '3 days'",
+            'dispatch_id': dispatch_expr,
+        })
+        cls._seed('logistics_contract', cls.ROWS, {
+            'name': "'PLAN-CONTR-' || g",
+            'partner_id': str(partner_id),
+            'contract_type': "'customer'",
+            'status': _open_status("'draft'", "'active'", "'expired'"),
+            'start_date': "current_date - (g / 10)",
+            'end_date': "current_date - (g / 10) + 365",
+        })
+
+        picking_type = cls.env.ref('stock.picking_type_out')
+        cls._seed('stock_picking', cls.ROWS, {
+            'name': "'PLAN/OUT/' || g",
+            'move_type': "'direct'",
+            'state': _open_status("'waiting'", "'assigned'", "'done'"),
+            'scheduled_date': "now() - g * interval '30 minutes'",
+            'picking_type_id': str(picking_type.id),
+            'location_id': str(cls.env.ref('stock.stock_location_stock').id),
+            'location_dest_id': str(cls.env.ref('stock.stock_location_customers').id),
+            'company_id': str(picking_type.company_id.id),
+        })
+
+        for table in ('route_dispatch', 'trip_sheet', 'lorry_receipt', 'proof_delivery',
+                      'eway_bill', 'logistics_contract', 'stock_picking'):
+            cr.execute(SQL("ANALYZE %s", SQL.identifier(table)))
+
+    @classmethod
+    def _seed(cls, table, count, columns):
+        cls.env.cr.execute("""
+            INSERT INTO {table} ({columns})
+            SELECT {values} FROM generate_series(1, {count}) AS g
+        """.format(table=table, columns=', '.join(columns), values=', '.join(columns.values()), count=count))
+
+    def assertIndexed(self, model_name, domain, order=None, limit=None):
+        """EXPLAIN the ORM query for ``domain`` and fail on sequential scans of the model's table"""
+        Model = self.env[model_name]
+        query = Model._search(domain, order=order, limit=limit)
+        self.env.cr.execute(SQL("EXPLAIN (FORMAT JSON) %s", query.select()))
+        plan = self.env.cr.fetchone()[0][0]['Plan']
+        scans = [
+            node for node in _plan_nodes(plan)
+            if node['Node Type'] == 'Seq Scan' and node.get('Relation Name') == Model._table
+        ]
+        self.assertFalse(scans, "%s %s falls back to a sequential scan:\n%s" % (model_name, domain, plan))
+
+    def test_dashboard_queries(self):
+        now = fields.Datetime.now()
+        company_domain = [('company_id', 'in', self.env.company.ids)]
+        self.assertIndexed('trip.sheet', [('status', '=', 'in_progress')])
+        self.assertIndexed('lorry.receipt', [('status', '=', 'draft')])
+        self.assertIndexed('proof.delivery', [('status', '=', 'draft')])
+        self.assertIndexed('stock.picking', [('state', 'in', ['assigned', 'confirmed', 'waiting'])] + company_domain)
+        self.assertIndexed('stock.picking', [
+            ('state', 'in', ['assigned', 'confirmed']),
+            ('scheduled_date', '<', now),
+        ] + company_domain)
+        self.assertIndexed('stock.picking', [
+            ('scheduled_date', '>=', now - timedelta(days=7)),
+            ('scheduled_date', '<', now),
+        ] + company_domain)
+
+    def test_list_view_queries(self):
+        now = fields.Datetime.now()
+        month_ago = now - timedelta(days=30)
+        vehicle_id = self.vehicles[0].id
+        self.assertIndexed('lorry.receipt', [('dispatch_id', '=', self.dispatch_id)])
+        self.assertIndexed('lorry.receipt', [('vehicle_id', '=', vehicle_id)])
+        self.assertIndexed('lorry.receipt', [('date', '>=', month_ago)], order='date desc', limit=80)
+        self.assertIndexed('lorry.receipt', [('status', '=', 'draft'), ('dispatch_id', '=', False)])
+        self.assertIndexed('proof.delivery', [('dispatch_id', '=', self.dispatch_id)])
+        self.assertIndexed('proof.delivery', [('delivery_date', '>=', month_ago)], limit=80)
+        self.assertIndexed('trip.sheet', [('vehicle_id', '=', vehicle_id)], limit=80)
+        self.assertIndexed('route.dispatch', [('vehicle_id', '=', vehicle_id), ('status', 'in', ('draft', 'in_transit'))])
+        self.assertIndexed('eway.bill', [('dispatch_id', '=', self.dispatch_id)])
+
+    def test_expiry_queries(self):
+        self.assertIndexed('eway.bill', [('status', '=', 'active'), ('valid_upto', '<', fields.Datetime.now())],
+                           order='id', limit=1000)
+        self.assertIndexed('logistics.contract', [('status', '=', 'active'), ('end_date', '<', fields.Date.today())],
+                           order='id', limit=1000)
+
+
+def _array(ids):
+    return "'{%s}'" % ','.join(str(id_) for id_ in ids)
+
+
+def _open_status(first, second, closed):
+    """Two open statuses on 2% of the rows each, the closed one everywhere else"""
+    return "CASE WHEN g %% 50 = 0 THEN %s WHEN g %% 50 = 1 THEN %s ELSE %s END" % (first, second, closed)
+
+
+def _plan_nodes(node):
+    yield node
+    for child in node.get('Plans', ()):
+        yield from _plan_nodes(child)
@@ -0,0 +1,197 @@
+# -*- coding: utf-8 -*-
+"""E-way bill generation against the GST portal.
+
+Requests are validated locally first, a whole batch in one pass, so the
+portal only sees well-formed consignments. Valid ones are submitted through
+a portal client with bounded concurrency, a shared rate limit and retries
+with exponential backoff on transient errors. Each request carries an
+idempotency key: a retried or resubmitted request gets the bill generated
+the first time instead of a duplicate.
+
+Clients are pluggable through ``PORTAL_CLIENTS``; ``MockPortal`` is a local
+stand-in with the portal's rules, for tests and demo databases.
+"""
+import hashlib
+import math
+import random
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, time as dt_time, timedelta
+
+GSTIN_RE = re.compile(r'^[0-9]{2}[A-Z]{5}[0-9]{4}[A-Z][1-9A-Z]Z[0-9A-Z]$')
+GSTIN_CHARSET = '0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ'
+# Unregistered consignors and consignees are declared as URP
+UNREGISTERED = 'URP'
+MAX_DISTANCE_KM = 4000
+# Validity of a regular consignment: one day per started 200 km
+KM_PER_VALIDITY_DAY = 200
+
+
+class PortalError(Exception):
+    """Refusal of the portal; ``retryable`` errors are worth another attempt"""
+
+    def __init__(self, message, retryable=False):
+        super().__init__(message)
+        self.retryable = retryable
+
+
+# === Local validation ===
+def gstin_checksum(gstin):
+    """Check character of the first 14 characters of a GSTIN (Luhn mod 36)"""
+    total = 0
+    for index, char in enumerate(gstin[:14]):
+        product = GSTIN_CHARSET.index(char) * (2 if index % 2 else 1)
+        total += product // 36 + product % 36
+    return GSTIN_CHARSET[(36 - total % 36) % 36]
+
+
+def is_valid_gstin(gstin):
+    return bool(gstin and GSTIN_RE.match(gstin) and gstin_checksum(gstin) == gstin[14])
+
+
+def validity_days(distance_km):
+    return max(1, math.ceil(distance_km / KM_PER_VALIDITY_DAY))
+
+
+def validate_batch(requests):
+    """Errors of each request, checked locally: {key: [messages]}
+
+    :param requests: list of dicts with ``key``, ``distance_km``,
+                     ``transporter_gstin``, ``consignor_gstin``,
+                     ``consignee_gstin`` and ``vehicle_no``
+    """
+    # GSTINs repeat across the consignments of a wave, each is checked once
+    gstins = {request[field] for request in requests
+              for field in ('transporter_gstin', 'consignor_gstin', 'consignee_gstin')
+              if request.get(field) and request[field] != UNREGISTERED}
+    valid = {gstin for gstin in gstins if is_valid_gstin(gstin)}
+    errors = {}
+    for request in requests:
+        messages = []
+        if not request.get('transporter_gstin'):
+            messages.append("Missing transporter GSTIN")
+        for field, label in (('transporter_gstin', "transporter"),
+                             ('consignor_gstin', "consignor"),
+                             ('consignee_gstin', "consignee")):
+            gstin = request.get(field)
+            if gstin and gstin != UNREGISTERED and gstin not in valid:
+                messages.append("Invalid %s GSTIN %s" % (label, gstin))
+        distance = request.get('distance_km') or 0
+        if not 0 < distance <= MAX_DISTANCE_KM:
+            messages.append("Distance must be between 1 and %d km, got %s" % (MAX_DISTANCE_KM, distance))
+        if not request.get('vehicle_no'):
+            messages.append("Missing vehicle number")
+        if messages:
+            errors[request['key']] = messages
+    return errors
+
+
+# === Submission ===
+class RateLimiter:
+    """Token bucket shared by the submitting threads: ``rate`` calls per second"""
+
+    def __init__(self, rate, burst=None):
+        self.rate = float(rate)
+        self.capacity = float(burst or max(1, rate))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+def submit_batch(client, requests, concurrency=8, rate=10, max_retries=3, backoff=0.5):
+    """Generate the e-way bills of ``requests`` through ``client``.
+
+    :return: {key: result dict, or the PortalError of the last attempt}
+    """
+    limiter = RateLimiter(rate)
+
+    def submit(request):
+        for attempt in range(max_retries + 1):
+            limiter.acquire()
+            try:
+                return client.generate(request, request['key'])
+            except PortalError as error:
+                if not error.retryable or attempt == max_retries:
+                    return error
+            # exponential backoff, jittered so throttled threads spread out
+            time.sleep(backoff * 2 ** attempt * (0.5 + random.random()))
+
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as executor:
+        return dict(zip((request['key'] for request in requests), executor.map(submit, requests)))
+
+
+# === Clients ===
+class PortalClient:
+    """Interface of the portal clients.
+
+    Clients are built with the ``lms.eway_*`` parameters, keyed without the
+    ``lms.eway_`` prefix.
+    """
+
+    def __init__(self, settings=None):
+        self.settings = settings or {}
+
+    def generate(self, request, idempotency_key):
+        """Generate the e-way bill of ``request``.
+
+        :return: {'ewaybill_no': str, 'generated_at': naive UTC datetime,
+                  'valid_upto': naive UTC datetime}
+        :raise PortalError: when the portal refuses or fails
+        """
+        raise NotImplementedError()
+
+
+class MockPortal(PortalClient):
+    """Local stand-in for the GST portal.
+
+    Applies the portal's validation and validity rules and answers the same
+    idempotency key with the same bill. The ``portal_latency`` (seconds) and
+    ``portal_failure_rate`` (share of transient errors) settings simulate a
+    real portal.
+    Generated bills are shared by the instances of a process.
+    """
+    _bills = {}
+    _lock = threading.Lock()
+
+    def generate(self, request, idempotency_key):
+        latency = float(self.settings.get('portal_latency') or 0)
+        if latency:
+            time.sleep(latency)
+        with self._lock:
+            if idempotency_key in self._bills:
+                return self._bills[idempotency_key]
+        if random.random() < float(self.settings.get('portal_failure_rate') or 0):
+            raise PortalError("Portal temporarily unavailable", retryable=True)
+        errors = validate_batch([dict(request, key=idempotency_key)])
+        if errors:
+            raise PortalError("; ".join(errors[idempotency_key]))
+        now = datetime.utcnow().replace(microsecond=0)
+        # valid until midnight of the last day, as the portal does
+        last_day = (now + timedelta(days=validity_days(request['distance_km']))).date()
+        number = int(hashlib.sha256(idempotency_key.encode()).hexdigest(), 16) % 10 ** 11
+        bill = {
+            'ewaybill_no': '1%011d' % number,
+            'generated_at': now,
+            'valid_upto': datetime.combine(last_day, dt_time.max).replace(microsecond=0),
+        }
+        with self._lock:
+            return self._bills.setdefault(idempotency_key, bill)
+
+
+PORTAL_CLIENTS = {
+    'mock': MockPortal,
+}
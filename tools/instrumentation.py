@@ -0,0 +1,141 @@
+# -*- coding: utf-8 -*-
+"""Per-section cost of the dashboard RPCs.
+
+A probe measures the wall time, the number of SQL queries and the SQL time
+spent in a block of code. Samples are kept per database and section in a
+bounded in-memory window, from which rolling percentiles are computed for
+the metrics endpoint. Each worker keeps its own window.
+
+The bytes each asset bundle takes from the module are reported alongside,
+to follow what the module adds to the backend bundle every page loads.
+"""
+import glob
+import math
+import os
+import threading
+import time
+from collections import deque
+
+from odoo.modules.module import get_manifest, get_module_path
+
+WINDOW_SIZE = 500
+PERCENTILES = (50, 90, 99)
+
+# {(dbname, section): deque of samples}, a sample is {'wall_ms', 'queries', 'sql_ms'}
+_SAMPLES = {}
+_SAMPLES_LOCK = threading.Lock()
+
+
+class SectionProbe:
+    """Context manager measuring the cost of a section on cursor ``cr``.
+
+    SQL time is only available in HTTP workers, where Odoo accumulates it
+    on the current thread; elsewhere ``sql_ms`` is None.
+    """
+
+    def __init__(self, cr, section):
+        self.cr = cr
+        self.section = section
+        self.sample = None
+
+    def __enter__(self):
+        thread = threading.current_thread()
+        self._queries = self.cr.sql_log_count
+        self._sql_time = getattr(thread, 'query_time', None)
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        wall = time.perf_counter() - self._started
+        sql_time = getattr(threading.current_thread(), 'query_time', None)
+        self.sample = {
+            'section': self.section,
+            'wall_ms': round(wall * 1000, 2),
+            'queries': self.cr.sql_log_count - self._queries,
+            'sql_ms': round((sql_time - self._sql_time) * 1000, 2) if self._sql_time is not None else None,
+        }
+        record(self.cr.dbname, self.section, self.sample)
+
+
+def record(dbname, section, sample):
+    """Add ``sample`` to the rolling window of ``section``"""
+    key = (dbname, section)
+    with _SAMPLES_LOCK:
+        window = _SAMPLES.get(key)
+        if window is None:
+            window = _SAMPLES[key] = deque(maxlen=WINDOW_SIZE)
+        window.append(sample)
+
+
+def _percentile(values, percent):
+    """Nearest-rank percentile of sorted ``values``"""
+    index = max(0, math.ceil(percent / 100 * len(values)) - 1)
+    return values[index]
+
+
+def percentiles(dbname):
+    """Rolling percentiles of every section of ``dbname``.
+
+    :return: {section: {'count': n, metric: {'p50': x, 'p90': y, 'p99': z}}}
+    """
+    with _SAMPLES_LOCK:
+        windows = {section: list(window) for (db, section), window in _SAMPLES.items() if db == dbname}
+    result = {}
+    for section, samples in sorted(windows.items()):
+        stats = {'count': len(samples)}
+        for metric in ('wall_ms', 'queries', 'sql_ms'):
+            values = sorted(sample[metric] for sample in samples if sample.get(metric) is not None)
+            if values:
+                stats[metric] = {'p%d' % percent: _percentile(values, percent) for percent in PERCENTILES}
+        result[section] = stats
+    return result
+
+
+def _label(value):
+    """``value`` escaped for a label of the Prometheus text format"""
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def prometheus(dbname):
+    """The percentiles of ``dbname`` in the Prometheus text exposition format"""
+    lines = []
+    stats = percentiles(dbname)
+    for metric, help_text in (('wall_ms', "Wall time"), ('queries', "SQL queries"), ('sql_ms', "SQL time")):
+        name = 'lms_dashboard_section_%s' % metric
+        lines.append('# HELP %s %s per dashboard section, rolling window' % (name, help_text))
+        lines.append('# TYPE %s summary' % name)
+        for section, values in stats.items():
+            for quantile, value in sorted(values.get(metric, {}).items()):
+                lines.append('%s{section="%s",quantile="%s"} %s' % (name, _label(section), int(quantile[1:]) / 100, value))
+            if metric in values:
+                lines.append('%s_count{section="%s"} %d' % (name, _label(section), values['count']))
+    return '\n'.join(lines) + '\n'
+
+
+def asset_sizes(module):
+    """Bytes of the files ``module`` adds to each asset bundle: {bundle: bytes}"""
+    manifest = get_manifest(module)
+    root = os.path.dirname(get_module_path(module))
+    sizes = {}
+    for bundle, paths in (manifest.get('assets') or {}).items():
+        total = 0
+        for path in paths:
+            if not isinstance(path, str):
+                # ('include', ...) and other directives add no file of the module
+                continue
+            for file in glob.glob(os.path.join(root, path)):
+                if os.path.isfile(file):
+                    total += os.path.getsize(file)
+        sizes[bundle] = total
+    return sizes
+
+
+def asset_prometheus(module):
+    """The asset sizes of ``module`` in the Prometheus text exposition format"""
+    lines = [
+        '# HELP lms_asset_bytes Bytes of the module files in each asset bundle',
+        '# TYPE lms_asset_bytes gauge',
+    ]
+    for bundle, size in sorted(asset_sizes(module).items()):
+        lines.append('lms_asset_bytes{bundle="%s"} %d' % (_label(bundle), size))
+    return '\n'.join(lines) + '\n'
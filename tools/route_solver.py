@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*-
+"""Offline multi-stop route ordering.
+
+Stops are ordered as an open path starting at the first stop: a nearest
+neighbour construction is improved with 2-opt and Or-opt moves until no move
+helps or the time budget runs out. Distances are great-circle kilometres.
+"""
+import math
+import time
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+EARTH_RADIUS_KM = 6371.0088
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """Great-circle distance in kilometres between two points in degrees"""
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def distance_matrix(coords):
+    """Square matrix (list of lists, km) of the distances between ``coords``
+
+    :param coords: list of (latitude, longitude) in degrees
+    """
+    if numpy is None:
+        return [[haversine_km(a[0], a[1], b[0], b[1]) for b in coords] for a in coords]
+    points = numpy.radians(numpy.asarray(coords, dtype=float).reshape(-1, 2))
+    lat = points[:, 0]
+    lon = points[:, 1]
+    a = (numpy.sin((lat[:, None] - lat[None, :]) / 2) ** 2
+         + numpy.cos(lat)[:, None] * numpy.cos(lat)[None, :] * numpy.sin((lon[:, None] - lon[None, :]) / 2) ** 2)
+    return (2 * EARTH_RADIUS_KM * numpy.arcsin(numpy.sqrt(numpy.clip(a, 0.0, 1.0)))).tolist()
+
+
+def path_length(matrix, order):
+    return sum(matrix[order[i]][order[i + 1]] for i in range(len(order) - 1))
+
+
+def nearest_neighbour(matrix, start=0):
+    """Open path visiting every node, always moving to the closest unvisited one"""
+    unvisited = set(range(len(matrix))) - {start}
+    order = [start]
+    while unvisited:
+        row = matrix[order[-1]]
+        closest = min(unvisited, key=row.__getitem__)
+        unvisited.remove(closest)
+        order.append(closest)
+    return order
+
+
+def two_opt(matrix, order, deadline):
+    """Reverse segments while it shortens the path; the first node stays fixed"""
+    n = len(order)
+    improved = True
+    while improved and time.monotonic() < deadline:
+        improved = False
+        for i in range(1, n - 1):
+            a, b = order[i - 1], order[i]
+            d_ab = matrix[a][b]
+            for k in range(i + 1, n):
+                c = order[k]
+                if k + 1 < n:
+                    d = order[k + 1]
+                    delta = matrix[a][c] + matrix[b][d] - d_ab - matrix[c][d]
+                else:
+                    delta = matrix[a][c] - d_ab
+                if delta < -1e-9:
+                    order[i:k + 1] = reversed(order[i:k + 1])
+                    improved = True
+                    b = order[i]
+                    d_ab = matrix[a][b]
+            if time.monotonic() >= deadline:
+                break
+    return order
+
+
+def or_opt(matrix, order, deadline, max_segment=3):
+    """Move segments of up to ``max_segment`` nodes, possibly reversed, elsewhere"""
+    improved = True
+    while improved and time.monotonic() < deadline:
+        improved = False
+        for length in range(1, max_segment + 1):
+            i = 1
+            while i + length <= len(order):
+                if time.monotonic() >= deadline:
+                    return order
+                move = _best_segment_move(matrix, order, i, length)
+                if move:
+                    position, reverse = move
+                    segment = order[i:i + length]
+                    rest = order[:i] + order[i + length:]
+                    if reverse:
+                        segment.reverse()
+                    order[:] = rest[:position] + segment + rest[position:]
+                    improved = True
+                else:
+                    i += 1
+    return order
+
+
+def _best_segment_move(matrix, order, i, length):
+    """Best (insert position in the remaining path, reversed) for order[i:i+length], if it gains"""
+    n = len(order)
+    first, last = order[i], order[i + length - 1]
+    prev = order[i - 1]
+    after = order[i + length] if i + length < n else None
+    removal_gain = matrix[prev][first] + (matrix[last][after] - matrix[prev][after] if after is not None else 0.0)
+
+    rest = order[:i] + order[i + length:]
+    best_delta, best_move = -1e-9, None
+    for position in range(1, len(rest) + 1):
+        if position == i:
+            continue
+        x = rest[position - 1]
+        y = rest[position] if position < len(rest) else None
+        for reverse in (False, True):
+            head, tail = (last, first) if reverse else (first, last)
+            cost = matrix[x][head] + (matrix[tail][y] - matrix[x][y] if y is not None else 0.0)
+            delta = cost - removal_gain
+            if delta < best_delta:
+                best_delta, best_move = delta, (position, reverse)
+    return best_move
+
+
+def solve_route(matrix, time_budget=2.0):
+    """Order the nodes of ``matrix`` as an open path starting at node 0
+
+    :return: (order, length in the matrix unit)
+    """
+    if len(matrix) < 3:
+        order = list(range(len(matrix)))
+        return order, path_length(matrix, order)
+    deadline = time.monotonic() + time_budget
+    order = nearest_neighbour(matrix)
+    while time.monotonic() < deadline:
+        length = path_length(matrix, order)
+        two_opt(matrix, order, deadline)
+        or_opt(matrix, order, deadline)
+        if path_length(matrix, order) >= length - 1e-9:
+            break
+    return order, path_length(matrix, order)
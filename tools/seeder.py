@@ -0,0 +1,337 @@
+# -*- coding: utf-8 -*-
+"""Deterministic synthetic data for load testing the LMS module.
+
+The seeder fills a database with vehicles, drivers, customers, trip sheets,
+dispatches, LRs, PODs, e-way bills, contracts, pickings and invoices in
+volumes derived from a tier. Documents are spread over a history where
+recent ones are mostly open and old ones mostly closed; the same tier and
+seed always produce the same rows.
+
+Master data goes through the ORM, the documents are bulk inserted with
+``execute_values``. Invoices are inserted as headers without lines: enough
+for the dashboard, not for accounting reports. The stored computed fields
+of the LMS documents, the utilization and operations rollups, the alerts and
+the dashboard snapshots are then built as using the application would have
+left them. From an Odoo shell::
+
+    from odoo.addons.lms.tools.seeder import LMSSeeder
+    LMSSeeder(env, tier='100k', seed=42).run()
+    env.cr.commit()
+"""
+import logging
+import random
+from datetime import datetime, timedelta
+
+from psycopg2.extras import execute_values
+
+from odoo import fields
+
+from ..models.lms_utilization import ROLLUP_CHUNK_DAYS
+
+_logger = logging.getLogger(__name__)
+
+# Number of LRs per tier, every other volume is derived from it
+TIERS = {
+    '1k': 1000,
+    '10k': 10000,
+    '100k': 100000,
+    '1m': 1000000,
+}
+
+# Volume of each document type relative to the number of LRs
+RATIOS = {
+    'vehicles': 0.01,
+    'drivers': 0.01,
+    'customers': 0.02,
+    'dispatches': 0.1,
+    'trips': 0.2,
+    'pods': 0.8,
+    'eway_bills': 0.5,
+    'contracts': 0.05,
+    'pickings': 1.0,
+    'invoices': 0.5,
+}
+
+# Seeded tables of LMS models, whose stored computed fields are computed after the insert.
+# Pickings and invoices are left alone: their computes would reset the seeded amounts and states.
+SEEDED_MODELS = {
+    'route_dispatch': 'route.dispatch',
+    'trip_sheet': 'trip.sheet',
+    'lorry_receipt': 'lorry.receipt',
+    'proof_delivery': 'proof.delivery',
+    'eway_bill': 'eway.bill',
+    'logistics_contract': 'logistics.contract',
+}
+
+HISTORY_DAYS = 730
+RECENT_DAYS = 7
+BATCH_SIZE = 5000
+
+# Status weights of recent and of older documents
+STATUSES = {
+    'trip_sheet': ({'draft': 3, 'in_progress': 5, 'completed': 2},
+                   {'completed': 92, 'cancelled': 8}),
+    'route_dispatch': ({'draft': 3, 'in_transit': 5, 'completed': 2},
+                       {'completed': 93, 'cancelled': 7}),
+    'lorry_receipt': ({'draft': 3, 'dispatched': 2, 'in_transit': 4, 'delivered': 1},
+                      {'delivered': 95, 'cancelled': 5}),
+    'proof_delivery': ({'draft': 4, 'delivered': 4, 'verified': 2},
+                       {'verified': 90, 'delivered': 5, 'cancelled': 5}),
+    'eway_bill': ({'draft': 2, 'active': 8},
+                  {'expired': 90, 'cancelled': 10}),
+    'stock_picking': ({'waiting': 2, 'confirmed': 3, 'assigned': 4, 'done': 1},
+                      {'done': 95, 'cancel': 5}),
+    'account_move': ({'draft': 2, 'posted': 8},
+                     {'posted': 97, 'cancel': 3}),
+}
+
+
+class LMSSeeder:
+    """Fill the database of ``env`` with a synthetic LMS history"""
+
+    def __init__(self, env, tier='1k', seed=0, now=None):
+        if tier not in TIERS:
+            raise ValueError("Unknown tier %r, expected one of %s" % (tier, ', '.join(TIERS)))
+        self.env = env
+        self.size = TIERS[tier]
+        self.rng = random.Random(seed)
+        self.now = (now or fields.Datetime.now()).replace(microsecond=0)
+        self.company = env.company
+        self.prefix = 'BENCH'
+        # {table: (ids, columns)} of the bulk inserts
+        self.inserted = {}
+
+    def count(self, kind):
+        return max(int(self.size * RATIOS[kind]), 10)
+
+    def run(self):
+        """Seed every model and return {table: number of rows inserted}"""
+        counts = {}
+        self.vehicle_ids = self._create_vehicles()
+        self.driver_ids = self._create_partners('Driver', self.count('drivers'))
+        self.customer_ids = self._create_partners('Customer', self.count('customers'), customer_rank=1)
+        self.env.flush_all()
+
+        self.dispatch_ids = self._seed_dispatches()
+        counts['route_dispatch'] = len(self.dispatch_ids)
+        counts['trip_sheet'] = len(self._seed_trip_sheets())
+        self.lr_ids = self._seed_lorry_receipts()
+        counts['lorry_receipt'] = len(self.lr_ids)
+        counts['proof_delivery'] = len(self._seed_proofs_of_delivery())
+        counts['eway_bill'] = len(self._seed_eway_bills())
+        counts['logistics_contract'] = len(self._seed_contracts())
+        counts['stock_picking'] = len(self._seed_pickings())
+        counts['account_move'] = len(self._seed_invoices())
+
+        for table, model_name in SEEDED_MODELS.items():
+            self._recompute(model_name, *self.inserted[table])
+        self._rebuild_rollups()
+
+        for table in counts:
+            self.env.cr.execute('ANALYZE "%s"' % table)
+        self.env.invalidate_all()
+        self.env['lms.alert.rule'].search([])._evaluate()
+        self.env['lms.dashboard.snapshot']._cron_refresh_snapshots()
+        _logger.info("LMS seeder: %s", counts)
+        return counts
+
+    # === Helpers ===
+    def _age(self):
+        """Random age of a document, a quarter of them in the recent window"""
+        if self.rng.random() < 0.25:
+            return timedelta(seconds=self.rng.randrange(RECENT_DAYS * 86400))
+        return timedelta(seconds=self.rng.randrange(RECENT_DAYS * 86400, HISTORY_DAYS * 86400))
+
+    def _status(self, table, age):
+        recent, old = STATUSES[table]
+        weights = recent if age < timedelta(days=RECENT_DAYS) else old
+        return self.rng.choices(list(weights), weights=list(weights.values()))[0]
+
+    def _insert(self, table, columns, rows):
+        """Bulk insert ``rows`` and return their ids in order"""
+        columns = list(columns) + ['create_uid', 'create_date', 'write_uid', 'write_date']
+        audit = (self.env.uid, self.now, self.env.uid, self.now)
+        query = 'INSERT INTO "%s" (%s) VALUES %%s RETURNING id' % (table, ', '.join('"%s"' % c for c in columns))
+        ids = []
+        for start in range(0, len(rows), BATCH_SIZE):
+            batch = [tuple(row) + audit for row in rows[start:start + BATCH_SIZE]]
+            ids += [row[0] for row in execute_values(self.env.cr._obj, query, batch, page_size=BATCH_SIZE, fetch=True)]
+        _logger.info("LMS seeder: %s rows inserted in %s", len(ids), table)
+        self.inserted[table] = (ids, columns)
+        return ids
+
+    def _recompute(self, model_name, ids, columns):
+        """Compute the stored fields the bulk insert of ``ids`` left empty, as creating them would"""
+        Model = self.env[model_name].with_context(active_test=False)
+        to_compute = [field for field in Model._fields.values()
+                      if field.store and field.compute and field.name not in columns]
+        for start in range(0, len(ids), BATCH_SIZE):
+            records = Model.browse(ids[start:start + BATCH_SIZE])
+            for field in to_compute:
+                self.env.add_to_compute(field, records)
+            self.env.flush_all()
+            self.env.invalidate_all()
+        _logger.info("LMS seeder: %s computed on %s", ', '.join(field.name for field in to_compute), model_name)
+
+    def _rebuild_rollups(self):
+        """Roll up the seeded history as the utilization and operations crons would have"""
+        Utilization = self.env['lms.vehicle.utilization']
+        yesterday = datetime.now(Utilization._get_timezone()).date() - timedelta(days=1)
+        # the longest trips end a few days after they start
+        chunk_start = yesterday - timedelta(days=HISTORY_DAYS + RECENT_DAYS)
+        while chunk_start <= yesterday:
+            chunk_end = min(yesterday, chunk_start + timedelta(days=ROLLUP_CHUNK_DAYS - 1))
+            Utilization._rollup(chunk_start, chunk_end)
+            chunk_start = chunk_end + timedelta(days=1)
+        self.env['ir.config_parameter'].sudo().set_param(
+            'lms.utilization_rollup_date', fields.Date.to_string(yesterday))
+        self.env['lms.operations.daily']._rebuild()
+        _logger.info("LMS seeder: utilization and operations rolled up")
+
+    def _name(self, kind, index):
+        return '%s-%s-%07d' % (self.prefix, kind, index)
+
+    # === Master data ===
+    def _create_vehicles(self):
+        brand = self.env['fleet.vehicle.model.brand'].create({'name': '%s Trucks' % self.prefix})
+        model = self.env['fleet.vehicle.model'].create({'name': '%s Hauler' % self.prefix, 'brand_id': brand.id})
+        statuses = self.rng.choices(['active', 'idle', 'maintenance'], weights=[80, 12, 8], k=self.count('vehicles'))
+        vehicles = self.env['fleet.vehicle'].with_context(tracking_disable=True).create([{
+            'model_id': model.id,
+            'license_plate': self._name('TRK', index),
+            'vehicle_status': status,
+            'lms_capacity_weight': self.rng.choice([5000, 9000, 16000, 25000]),
+        } for index, status in enumerate(statuses)])
+        return vehicles.ids
+
+    def _create_partners(self, label, count, **extra):
+        partners = self.env['res.partner'].with_context(tracking_disable=True).create([
+            dict(extra, name='%s %s %05d' % (self.prefix, label, index)) for index in range(count)
+        ])
+        return partners.ids
+
+    # === Documents ===
+    def _seed_dispatches(self):
+        rows = []
+        for index in range(self.count('dispatches')):
+            age = self._age()
+            rows.append((
+                self._name('DISP', index), self.now - age, self._status('route_dispatch', age),
+                self.rng.choice(self.vehicle_ids), round(self.rng.uniform(20, 1500), 1),
+            ))
+        return self._insert('route_dispatch', ['name', 'dispatch_date', 'status', 'vehicle_id', 'distance_km'], rows)
+
+    def _seed_trip_sheets(self):
+        rows = []
+        for index in range(self.count('trips')):
+            age = self._age()
+            status = self._status('trip_sheet', age)
+            start = self.now - age
+            end = start + timedelta(hours=self.rng.uniform(2, 72)) if status == 'completed' else None
+            rows.append((
+                self._name('TS', index), self.rng.choice(self.vehicle_ids), self.rng.choice(self.driver_ids),
+                start, end, status, round((end - start).total_seconds() / 3600, 2) if end else 0.0,
+            ))
+        return self._insert('trip_sheet', ['name', 'vehicle_id', 'driver_id', 'date_start', 'date_end',
+                                           'status', 'duration_hours'], rows)
+
+    def _seed_lorry_receipts(self):
+        rows = []
+        for index in range(self.size):
+            age = self._age()
+            status = self._status('lorry_receipt', age)
+            planned = status != 'draft' or self.rng.random() < 0.3
+            rows.append((
+                self._name('LR', index), self.now - age, status,
+                self.rng.choice(self.dispatch_ids) if planned else None,
+                self.rng.choice(self.vehicle_ids) if planned else None,
+                self.rng.randint(1, 60), round(self.rng.uniform(10, 4000), 1),
+                round(self.rng.uniform(500, 50000), 2), self.rng.choice(['to_pay', 'paid', 'tbb']),
+                self.now - age + timedelta(days=2) if status == 'delivered' else None,
+            ))
+        return self._insert('lorry_receipt', ['name', 'date', 'status', 'dispatch_id', 'vehicle_id', 'total_packages',
+                                              'total_weight', 'freight_amount', 'payment_mode', 'delivery_date'], rows)
+
+    def _seed_proofs_of_delivery(self):
+        rows = []
+        for index in range(self.count('pods')):
+            age = self._age()
+            rows.append((
+                self._name('POD', index), 'Receiver %d' % self.rng.randrange(1000), self.now - age,
+                self._status('proof_delivery', age), self.rng.choice(self.lr_ids), self.rng.choice(self.dispatch_ids),
+            ))
+        return self._insert('proof_delivery', ['name', 'received_by', 'delivery_date', 'status',
+                                               'lorry_receipt_id', 'dispatch_id'], rows)
+
+    def _seed_eway_bills(self):
+        rows = []
+        for index in range(self.count('eway_bills')):
+            age = self._age()
+            status = self._status('eway_bill', age)
+            generated = self.now - age
+            valid_upto = generated + timedelta(days=self.rng.randint(1, 15))
+            rows.append((
+                self._name('EWB', index), '%012d' % self.rng.randrange(10 ** 12), generated, valid_upto, status,
+                status == 'expired' or valid_upto < self.now, self.rng.choice(self.dispatch_ids),
+            ))
+        return self._insert('eway_bill', ['name', 'ewaybill_no', 'generated_date', 'valid_upto', 'status',
+                                          'is_expired', 'dispatch_id'], rows)
+
+    def _seed_contracts(self):
+        rows = []
+        today = self.now.date()
+        for index in range(self.count('contracts')):
+            start = today - timedelta(days=self.rng.randrange(HISTORY_DAYS))
+            end = start + timedelta(days=self.rng.choice([90, 180, 365, 730]))
+            status = 'expired' if end < today else self.rng.choices(['active', 'draft', 'terminated'], [85, 10, 5])[0]
+            rows.append((
+                self._name('CONTR', index), self.rng.choice(self.customer_ids),
+                self.rng.choice(['customer', 'vendor', 'transporter', 'lease', 'fuel']),
+                start, end, round(self.rng.uniform(1e4, 5e6), 2), status, status == 'expired',
+            ))
+        return self._insert('logistics_contract', ['name', 'partner_id', 'contract_type', 'start_date', 'end_date',
+                                                   'amount', 'status', 'is_expired'], rows)
+
+    def _seed_pickings(self):
+        picking_type = self.env.ref('stock.picking_type_out')
+        source = self.env.ref('stock.stock_location_stock').id
+        destination = self.env.ref('stock.stock_location_customers').id
+        rows = []
+        for index in range(self.count('pickings')):
+            age = self._age()
+            state = self._status('stock_picking', age)
+            scheduled = self.now - age + timedelta(days=self.rng.randint(0, 5))
+            rows.append((
+                self._name('OUT', index), 'direct', state, scheduled, picking_type.id, source, destination,
+                self.company.id, self.rng.choice(self.customer_ids),
+                state in ('assigned', 'confirmed') and scheduled < self.now,
+            ))
+        return self._insert('stock_picking', ['name', 'move_type', 'state', 'scheduled_date', 'picking_type_id',
+                                              'location_id', 'location_dest_id', 'company_id', 'partner_id',
+                                              'is_delayed'], rows)
+
+    def _seed_invoices(self):
+        journal = self.env['account.journal'].search([
+            ('type', '=', 'sale'), ('company_id', '=', self.company.id),
+        ], limit=1)
+        if not journal:
+            _logger.info("LMS seeder: no sale journal, invoices skipped")
+            return []
+        currency_id = journal.currency_id.id or self.company.currency_id.id
+        rows = []
+        for index in range(self.count('invoices')):
+            age = self._age()
+            state = self._status('account_move', age)
+            amount = round(self.rng.uniform(1000, 250000), 2)
+            paid = state == 'posted' and (age > timedelta(days=45) or self.rng.random() < 0.3)
+            date = (self.now - age).date()
+            rows.append((
+                self._name('INV', index), 'out_invoice', state, date, date, date + timedelta(days=30),
+                journal.id, currency_id, self.company.id, self.rng.choice(self.customer_ids),
+                amount, amount, 0.0 if paid else amount, 0.0 if paid else amount,
+                'paid' if paid else 'not_paid', 'no',
+            ))
+        return self._insert('account_move', ['name', 'move_type', 'state', 'date', 'invoice_date', 'invoice_date_due',
+                                             'journal_id', 'currency_id', 'company_id', 'partner_id',
+                                             'amount_total', 'amount_total_signed', 'amount_residual',
+                                             'amount_residual_signed', 'payment_state', 'auto_post'], rows)
@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+"""Busy time of vehicles from their trip intervals.
+
+Intervals are (start, end) naive UTC datetimes. Overlapping trips of a
+vehicle are merged first, so a vehicle is never busier than the clock,
+then the merged time is split on the local day boundaries of a timezone.
+"""
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+
+import pytz
+
+
+def merge_intervals(intervals):
+    """Sorted list of the disjoint intervals covering ``intervals``"""
+    merged = []
+    for start, end in sorted(interval for interval in intervals if interval[1] > interval[0]):
+        if merged and start <= merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1] = (merged[-1][0], end)
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def day_start(day, tz):
+    """Naive UTC datetime of the local midnight starting ``day`` in ``tz``"""
+    return tz.localize(datetime.combine(day, time.min)).astimezone(pytz.utc).replace(tzinfo=None)
+
+
+def local_day(moment, tz):
+    """Local date in ``tz`` of the naive UTC datetime ``moment``"""
+    return pytz.utc.localize(moment).astimezone(tz).date()
+
+
+def busy_hours_by_day(intervals, tz, date_from=None, date_to=None):
+    """Busy hours per local day of one vehicle.
+
+    :param intervals: the (start, end) trips of the vehicle
+    :param date_from, date_to: optional bounds (dates, inclusive) of the days returned
+    :return: {date: hours}
+    """
+    hours = defaultdict(float)
+    for start, end in merge_intervals(intervals):
+        day = local_day(start, tz)
+        while start < end:
+            boundary = min(end, day_start(day + timedelta(days=1), tz))
+            if (date_from is None or day >= date_from) and (date_to is None or day <= date_to):
+                hours[day] += (boundary - start).total_seconds() / 3600
+            start = boundary
+            day += timedelta(days=1)
+    return dict(hours)
+
+
+def trips_by_day(intervals, tz, date_from=None, date_to=None):
+    """Number of trips running on each local day: {date: count}"""
+    counts = defaultdict(int)
+    for start, end in intervals:
+        if end <= start:
+            continue
+        first = local_day(start, tz)
+        last = local_day(end - timedelta(microseconds=1), tz)
+        if date_from is not None:
+            first = max(first, date_from)
+        if date_to is not None:
+            last = min(last, date_to)
+        for offset in range((last - first).days + 1):
+            counts[first + timedelta(days=offset)] += 1
+    return dict(counts)
@@ -0,0 +1,4 @@
+# -*- coding: utf-8 -*-
+
+from . import load_planner
+from . import lms_import
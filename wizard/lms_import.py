@@ -0,0 +1,282 @@
+# -*- coding: utf-8 -*-
+import base64
+import csv
+import io
+import logging
+import time
+from itertools import islice
+
+from odoo import models, fields, _
+from odoo.exceptions import UserError
+
+try:
+    import openpyxl
+except ImportError:
+    openpyxl = None
+
+_logger = logging.getLogger(__name__)
+
+DEFAULT_CHUNK_SIZE = 1000
+
+# Accepted columns per target model: {header: (kind, field name)}.
+# ``kind`` tells how the cell is converted; relations are resolved per chunk.
+IMPORT_COLUMNS = {
+    'lorry.receipt': {
+        'date': ('datetime', 'date'),
+        'consignor': ('char', 'consignor'),
+        'consignee': ('char', 'consignee'),
+        'consignee_address': ('char', 'consignee_address'),
+        'source': ('location', 'source_location'),
+        'destination': ('location', 'destination_location'),
+        'vehicle': ('vehicle', 'vehicle_id'),
+        'driver': ('driver', 'driver_id'),
+        'dispatch': ('dispatch', 'dispatch_id'),
+        'goods_description': ('char', 'goods_description'),
+        'packages': ('integer', 'total_packages'),
+        'weight': ('float', 'total_weight'),
+        'freight': ('float', 'freight_amount'),
+        'payment_mode': ('selection', 'payment_mode'),
+        'remarks': ('char', 'remarks'),
+    },
+    'proof.delivery': {
+        'lr': ('lr', 'lorry_receipt_id'),
+        'dispatch': ('dispatch', 'dispatch_id'),
+        'received_by': ('char', 'received_by'),
+        'delivery_date': ('datetime', 'delivery_date'),
+        'remarks': ('char', 'remarks'),
+    },
+}
+
+# Alternative spellings of the headers above, compared in lower case
+HEADER_ALIASES = {
+    'lr no': 'lr', 'lr_no': 'lr', 'lorry_receipt': 'lr', 'lorry receipt': 'lr',
+    'source_location': 'source', 'from': 'source',
+    'destination_location': 'destination', 'to': 'destination',
+    'vehicle_no': 'vehicle', 'vehicle no': 'vehicle', 'license_plate': 'vehicle',
+    'dispatch_no': 'dispatch', 'dispatch no': 'dispatch',
+    'total_packages': 'packages', 'total_weight': 'weight', 'weight (kg)': 'weight',
+    'freight_amount': 'freight', 'lr_date': 'date', 'lr date': 'date',
+    'received by': 'received_by', 'delivery date': 'delivery_date',
+}
+
+
+class LMSImportWizard(models.TransientModel):
+    _name = 'lms.import.wizard'
+    _description = 'LMS Manifest Import'
+
+    import_model = fields.Selection([
+        ('lorry.receipt', 'Lorry Receipts'),
+        ('proof.delivery', 'Proofs of Delivery'),
+    ], string="Import", required=True, default='lorry.receipt')
+    file = fields.Binary(string="File", required=True)
+    filename = fields.Char(string="File Name")
+    chunk_size = fields.Integer(string="Rows per Batch", default=DEFAULT_CHUNK_SIZE)
+    state = fields.Selection([('draft', 'Draft'), ('done', 'Done')], default='draft')
+    imported_count = fields.Integer(string="Imported", readonly=True)
+    error_count = fields.Integer(string="Rejected", readonly=True)
+    duration = fields.Float(string="Duration (s)", readonly=True)
+    error_ids = fields.One2many('lms.import.wizard.error', 'wizard_id', string="Rejected Rows", readonly=True)
+
+    # === Parsing ===
+    def _read_rows(self):
+        """Yield the rows of the file as tuples of cells, the header first.
+
+        XLSX files are read in read-only mode and CSV files line by line, so
+        only the current chunk of rows is ever materialized.
+        """
+        self.ensure_one()
+        data = base64.b64decode(self.file)
+        if (self.filename or '').lower().endswith('.xlsx'):
+            if openpyxl is None:
+                raise UserError(_("Reading XLSX files requires the openpyxl library."))
+            workbook = openpyxl.load_workbook(io.BytesIO(data), read_only=True, data_only=True)
+            try:
+                yield from workbook.active.iter_rows(values_only=True)
+            finally:
+                workbook.close()
+        else:
+            text = io.TextIOWrapper(io.BytesIO(data), encoding='utf-8-sig', newline='')
+            sample = text.read(4096)
+            text.seek(0)
+            try:
+                dialect = csv.Sniffer().sniff(sample, delimiters=',;\t|')
+            except csv.Error:
+                dialect = csv.excel
+            yield from csv.reader(text, dialect)
+
+    def _map_header(self, header):
+        """Return {column index: column key} for the known columns of ``header``"""
+        columns = IMPORT_COLUMNS[self.import_model]
+        mapping = {}
+        for index, title in enumerate(header):
+            key = str(title or '').strip().lower()
+            key = HEADER_ALIASES.get(key, key.replace(' ', '_'))
+            if key in columns:
+                mapping[index] = key
+        if not mapping:
+            raise UserError(_("None of the columns of %(file)s can be imported.", file=self.filename or _("the file")))
+        return mapping
+
+    # === Lookups ===
+    def _build_lookups(self, rows):
+        """Resolve the relations referenced by a chunk with one query per model"""
+        values = {}
+        columns = IMPORT_COLUMNS[self.import_model]
+        for _row_number, row in rows:
+            for key, value in row.items():
+                if value and columns[key][0] in ('vehicle', 'driver', 'dispatch', 'lr', 'location'):
+                    values.setdefault(columns[key][0], set()).add(str(value).strip())
+
+        lookups = {}
+        if values.get('vehicle'):
+            names = list(values['vehicle'])
+            vehicles = self.env['fleet.vehicle'].search(['|', ('license_plate', 'in', names), ('name', 'in', names)])
+            lookups['vehicle'] = {vehicle.name: vehicle.id for vehicle in vehicles}
+            lookups['vehicle'].update({vehicle.license_plate: vehicle.id for vehicle in vehicles if vehicle.license_plate})
+        if values.get('driver'):
+            drivers = self.env['hr.employee'].search([('name', 'in', list(values['driver']))])
+            lookups['driver'] = {driver.name: driver.id for driver in drivers}
+        if values.get('dispatch'):
+            dispatches = self.env['route.dispatch'].search([('name', 'in', list(values['dispatch']))])
+            lookups['dispatch'] = {dispatch.name: dispatch for dispatch in dispatches}
+        if values.get('lr'):
+            lrs = self.env['lorry.receipt'].search([('name', 'in', list(values['lr']))])
+            lookups['lr'] = {lr.name: lr for lr in lrs}
+        if values.get('location'):
+            lookups['location'] = self.env['lms.location']._match_names(values['location'])
+        return lookups
+
+    def _convert_row(self, row, lookups):
+        """Turn a parsed row into create values, raising ValueError on bad cells"""
+        columns = IMPORT_COLUMNS[self.import_model]
+        Model = self.env[self.import_model]
+        vals = {}
+        for key, value in row.items():
+            kind, field_name = columns[key]
+            if value in (None, ''):
+                continue
+            if kind == 'char':
+                vals[field_name] = str(value).strip()
+            elif kind == 'integer':
+                vals[field_name] = int(float(value))
+            elif kind == 'float':
+                vals[field_name] = float(value)
+            elif kind == 'datetime':
+                vals[field_name] = fields.Datetime.to_datetime(value)
+            elif kind == 'selection':
+                selection = dict(Model._fields[field_name]._description_selection(self.env))
+                code = next((code for code, label in selection.items()
+                             if str(value).strip().lower() in (code, label.lower())), None)
+                if code is None:
+                    raise ValueError(_("Unknown %(field)s %(value)r.", field=key, value=value))
+                vals[field_name] = code
+            elif kind == 'location':
+                vals[field_name] = str(value).strip()
+                location = lookups['location'].get(vals[field_name])
+                if location:
+                    vals[field_name + '_id'] = location.id
+            else:
+                record = lookups.get(kind, {}).get(str(value).strip())
+                if not record:
+                    raise ValueError(_("Unknown %(field)s %(value)r.", field=key, value=value))
+                vals[field_name] = record if isinstance(record, int) else record.id
+                if kind == 'dispatch' and self.import_model == 'lorry.receipt' and 'vehicle_id' not in vals:
+                    vals['vehicle_id'] = record.vehicle_id.id
+                if kind == 'lr' and 'dispatch_id' not in vals:
+                    vals['dispatch_id'] = record.dispatch_id.id
+        return vals
+
+    # === Import ===
+    def _create_chunk(self, rows):
+        """Create the records of a chunk in one batch.
+
+        When the batch fails, its rows are retried one by one so that only
+        the faulty rows are rejected.
+
+        :return: (number of records created, [(row number, error message)])
+        """
+        Model = self.env[self.import_model].with_context(
+            tracking_disable=True, mail_create_nolog=True, mail_notrack=True,
+        )
+        lookups = self._build_lookups(rows)
+        errors = []
+        valid = []
+        for row_number, row in rows:
+            try:
+                valid.append((row_number, self._convert_row(row, lookups)))
+            except (ValueError, TypeError) as error:
+                errors.append((row_number, str(error)))
+
+        try:
+            with self.env.cr.savepoint():
+                Model.create([vals for _row_number, vals in valid])
+            return len(valid), errors
+        except Exception:
+            _logger.info("Batch import of %s failed, retrying its rows one by one", self.import_model, exc_info=True)
+
+        created = 0
+        for row_number, vals in valid:
+            try:
+                with self.env.cr.savepoint():
+                    Model.create(vals)
+                created += 1
+            except Exception as error:
+                errors.append((row_number, str(error)))
+        return created, errors
+
+    def _import(self):
+        self.ensure_one()
+        started = time.monotonic()
+        rows = self._read_rows()
+        header = next(rows, None)
+        if header is None:
+            raise UserError(_("The file is empty."))
+        mapping = self._map_header(header)
+        chunk_size = max(self.chunk_size, 1)
+
+        # blank lines are skipped, row numbers still match the file
+        parsed = (
+            (row_number, row)
+            for row_number, cells in enumerate(rows, start=2)
+            for row in [{key: cells[index] for index, key in mapping.items() if index < len(cells)}]
+            if any(value not in (None, '') for value in row.values())
+        )
+        imported, errors = 0, []
+        while chunk := list(islice(parsed, chunk_size)):
+            created, chunk_errors = self._create_chunk(chunk)
+            imported += created
+            errors += chunk_errors
+            _logger.info("%s import: %s rows imported, %s rejected so far", self.import_model, imported, len(errors))
+
+        self.env['lms.import.wizard.error'].create([
+            {'wizard_id': self.id, 'row_number': row_number, 'message': message}
+            for row_number, message in errors
+        ])
+        self.write({
+            'state': 'done',
+            'imported_count': imported,
+            'error_count': len(errors),
+            'duration': round(time.monotonic() - started, 2),
+        })
+        return imported
+
+    def action_import(self):
+        self._import()
+        return {
+            'type': 'ir.actions.act_window',
+            'name': _("Import Manifest"),
+            'res_model': self._name,
+            'res_id': self.id,
+            'view_mode': 'form',
+            'target': 'new',
+        }
+
+
+class LMSImportWizardError(models.TransientModel):
+    _name = 'lms.import.wizard.error'
+    _description = 'LMS Manifest Import Error'
+    _order = 'row_number'
+
+    wizard_id = fields.Many2one('lms.import.wizard', required=True, ondelete='cascade')
+    row_number = fields.Integer(string="Row")
+    message = fields.Char(string="Error")
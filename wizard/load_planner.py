@@ -0,0 +1,247 @@
+# -*- coding: utf-8 -*-
+from collections import defaultdict
+
+from odoo import models, fields, api, _
+
+from ..models.lms_location import normalize_location_name
+
+DEFAULT_CAPACITY_WEIGHT = 10000.0
+
+
+class _LoadBin:
+    """A dispatch being filled by the planner, existing or still to be created"""
+    __slots__ = ('dispatch', 'vehicle', 'source', 'destination', 'capacity_weight',
+                 'capacity_packages', 'weight', 'packages', 'lr_ids')
+
+    def __init__(self, destination, capacity_weight, capacity_packages,
+                 dispatch=None, vehicle=None, source=None, weight=0.0, packages=0):
+        self.dispatch = dispatch
+        self.vehicle = vehicle
+        self.source = source
+        self.destination = destination
+        self.capacity_weight = capacity_weight
+        self.capacity_packages = capacity_packages
+        self.weight = weight
+        self.packages = packages
+        self.lr_ids = []
+
+    def fits(self, weight, packages):
+        if self.weight + weight > self.capacity_weight:
+            return False
+        return not self.capacity_packages or self.packages + packages <= self.capacity_packages
+
+    def add(self, lr_id, weight, packages):
+        self.lr_ids.append(lr_id)
+        self.weight += weight
+        self.packages += packages
+
+
+class LMSLoadPlanner(models.TransientModel):
+    _name = 'lms.load.planner'
+    _description = 'LR Load Planner'
+
+    lr_ids = fields.Many2many('lorry.receipt', string="Lorry Receipts")
+    create_dispatches = fields.Boolean(
+        string="Create Dispatches",
+        default=lambda self: self.env['route.dispatch'].has_access('create'),
+        help="Open new dispatches, on free vehicles when available, once open dispatches are full",
+    )
+    line_ids = fields.One2many('lms.load.planner.line', 'planner_id', string="Planned Loads")
+    unplanned_lr_ids = fields.Many2many(
+        'lorry.receipt', 'lms_load_planner_unplanned_rel', 'planner_id', 'lr_id',
+        string="Unplanned LRs",
+    )
+    planned_count = fields.Integer(string="Planned LRs", compute="_compute_counts")
+    new_dispatch_count = fields.Integer(string="New Dispatches", compute="_compute_counts")
+
+    @api.depends('line_ids.lr_ids', 'line_ids.is_new')
+    def _compute_counts(self):
+        for planner in self:
+            planner.planned_count = sum(len(line.lr_ids) for line in planner.line_ids)
+            planner.new_dispatch_count = len(planner.line_ids.filtered('is_new'))
+
+    # === Planning ===
+    def _get_default_capacity(self):
+        value = self.env['ir.config_parameter'].sudo().get_param('lms.default_dispatch_capacity_kg')
+        return float(value) if value else DEFAULT_CAPACITY_WEIGHT
+
+    def _plan(self):
+        """Assign the pending LRs to dispatches with first-fit decreasing.
+
+        LRs are grouped by destination and placed heaviest first into the
+        first open dispatch to the same destination with room left, by weight
+        and packages against the vehicle capacity. When none fits, a new
+        dispatch is opened on the largest free vehicle. LRs that fit no
+        dispatch nor free vehicle are left unplanned. Nothing is written to
+        the LRs until _apply_plan.
+        """
+        self.ensure_one()
+        self.line_ids.unlink()
+        default_capacity = self._get_default_capacity()
+        lrs = self.lr_ids.filtered(lambda lr: lr.status == 'draft' and not lr.dispatch_id)
+
+        items_by_destination = defaultdict(list)
+        for lr in lrs:
+            items_by_destination[normalize_location_name(lr.destination_location)].append(lr)
+
+        Dispatch = self.env['route.dispatch']
+        bins_by_destination = defaultdict(list)
+        for dispatch in Dispatch.search([('status', '=', 'draft')], order='dispatch_date, id'):
+            destination = normalize_location_name(dispatch.destination_location)
+            if destination not in items_by_destination:
+                continue
+            vehicle = dispatch.vehicle_id
+            bins_by_destination[destination].append(_LoadBin(
+                destination,
+                vehicle.lms_capacity_weight or default_capacity,
+                vehicle.lms_capacity_packages,
+                dispatch=dispatch,
+                vehicle=vehicle,
+                weight=dispatch.load_weight,
+                packages=dispatch.load_packages,
+            ))
+
+        free_vehicles = []
+        # users who cannot create dispatches only fill the open ones
+        if self.create_dispatches and Dispatch.has_access('create'):
+            busy_vehicles = Dispatch._read_group(
+                [('status', 'in', ('draft', 'in_transit')), ('vehicle_id', '!=', False)],
+                ['vehicle_id'],
+            )
+            free_vehicles = self.env['fleet.vehicle'].search([
+                ('id', 'not in', [vehicle.id for (vehicle,) in busy_vehicles]),
+                ('vehicle_status', '!=', 'maintenance'),
+            ]).sorted(lambda vehicle: vehicle.lms_capacity_weight or default_capacity, reverse=True)
+            free_vehicles = list(free_vehicles)
+
+        unplanned = []
+        for destination, items in items_by_destination.items():
+            bins = bins_by_destination[destination]
+            items.sort(key=lambda lr: (lr.total_weight, lr.total_packages), reverse=True)
+            for lr in items:
+                weight, packages = lr.total_weight, lr.total_packages
+                target = next((load for load in bins if load.fits(weight, packages)), None)
+                if target is None and free_vehicles:
+                    # the largest free vehicle, LRs it cannot carry stay unplanned
+                    vehicle = free_vehicles[0]
+                    target = _LoadBin(
+                        destination,
+                        vehicle.lms_capacity_weight or default_capacity,
+                        vehicle.lms_capacity_packages,
+                        vehicle=vehicle,
+                        source=lr.source_location,
+                    )
+                    if target.fits(weight, packages):
+                        free_vehicles.pop(0)
+                        bins.append(target)
+                    else:
+                        target = None
+                if target is None:
+                    unplanned.append(lr.id)
+                    continue
+                target.add(lr.id, weight, packages)
+
+        lines = []
+        for destination, items in items_by_destination.items():
+            label = items[0].destination_location
+            for load in bins_by_destination[destination]:
+                if not load.lr_ids:
+                    continue
+                lines.append({
+                    'planner_id': self.id,
+                    'dispatch_id': load.dispatch.id if load.dispatch else False,
+                    'is_new': not load.dispatch,
+                    'vehicle_id': load.vehicle.id if load.vehicle else False,
+                    'source_location': load.source or (load.dispatch and load.dispatch.source_location),
+                    'destination_location': load.dispatch.destination_location if load.dispatch else label,
+                    'lr_ids': [(6, 0, load.lr_ids)],
+                    'load_weight': load.weight,
+                    'load_packages': load.packages,
+                    'capacity_weight': load.capacity_weight,
+                    'capacity_packages': load.capacity_packages,
+                })
+        self.env['lms.load.planner.line'].create(lines)
+        self.unplanned_lr_ids = [(6, 0, unplanned)]
+        return True
+
+    def _apply_plan(self):
+        """Create the new dispatches and attach the LRs, one write per dispatch"""
+        self.ensure_one()
+        new_lines = self.line_ids.filtered('is_new')
+        dispatches = self.env['route.dispatch'].create([{
+            'vehicle_id': line.vehicle_id.id,
+            'source_location': line.source_location,
+            'destination_location': line.destination_location,
+        } for line in new_lines])
+        for line, dispatch in zip(new_lines, dispatches):
+            line.dispatch_id = dispatch
+
+        for line in self.line_ids:
+            lrs = line.lr_ids.filtered(lambda lr: lr.status == 'draft' and not lr.dispatch_id)
+            vals = {'dispatch_id': line.dispatch_id.id}
+            if line.dispatch_id.vehicle_id:
+                vals['vehicle_id'] = line.dispatch_id.vehicle_id.id
+            lrs.write(vals)
+        return self.line_ids.dispatch_id
+
+    # === Buttons ===
+    def _reopen(self):
+        return {
+            'type': 'ir.actions.act_window',
+            'name': _("Load Planner"),
+            'res_model': self._name,
+            'res_id': self.id,
+            'view_mode': 'form',
+            'target': 'new',
+        }
+
+    def action_replan(self):
+        self._plan()
+        return self._reopen()
+
+    def action_confirm(self):
+        dispatches = self._apply_plan()
+        result = self.line_ids.lr_ids._lms_run_transition('dispatch')
+        if result is not True:
+            return result
+        return {
+            'type': 'ir.actions.act_window',
+            'name': _("Planned Dispatches"),
+            'res_model': 'route.dispatch',
+            'view_mode': 'list,form',
+            'domain': [('id', 'in', dispatches.ids)],
+        }
+
+
+class LMSLoadPlannerLine(models.TransientModel):
+    _name = 'lms.load.planner.line'
+    _description = 'LR Load Planner Line'
+
+    planner_id = fields.Many2one('lms.load.planner', required=True, ondelete='cascade')
+    dispatch_id = fields.Many2one('route.dispatch', string="Dispatch")
+    is_new = fields.Boolean(string="New Dispatch")
+    vehicle_id = fields.Many2one('fleet.vehicle', string="Vehicle")
+    source_location = fields.Char(string="Source")
+    destination_location = fields.Char(string="Destination")
+    lr_ids = fields.Many2many(
+        'lorry.receipt', 'lms_load_planner_line_lr_rel', 'line_id', 'lr_id',
+        string="Lorry Receipts",
+    )
+    lr_count = fields.Integer(string="LRs", compute="_compute_lr_count")
+    load_weight = fields.Float(string="Load (KG)")
+    load_packages = fields.Integer(string="Packages")
+    capacity_weight = fields.Float(string="Capacity (KG)")
+    capacity_packages = fields.Integer(string="Package Capacity")
+    overloaded = fields.Boolean(string="Overloaded", compute="_compute_overloaded")
+
+    @api.depends('lr_ids')
+    def _compute_lr_count(self):
+        for line in self:
+            line.lr_count = len(line.lr_ids)
+
+    @api.depends('load_weight', 'capacity_weight', 'load_packages', 'capacity_packages')
+    def _compute_overloaded(self):
+        for line in self:
+            line.overloaded = line.load_weight > line.capacity_weight or bool(
+                line.capacity_packages and line.load_packages > line.capacity_packages
+            )